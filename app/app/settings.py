@@ -47,6 +47,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
+    'core.nplusone.NPlusOneMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -82,12 +84,19 @@ WSGI_APPLICATION = 'app.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
-
+        # Seconds to keep a connection open between requests, 0 with POOL
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'HEALTH_CHECKS': os.environ.get('DB_HEALTH_CHECKS', '1') == '1',
+        # Connections shared by the threads of a process, 0 disables it
+        'POOL': {
+            'MAX_SIZE': int(os.environ.get('DB_POOL_SIZE', 0)),
+            'TIMEOUT': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        } if int(os.environ.get('DB_POOL_SIZE', 0)) else None,
     }
 }
 
@@ -111,6 +120,34 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing, PASSWORD_HASHER picks the hasher of new and rehashed
+# passwords: pbkdf2, argon2 (needs argon2-cffi) or bcrypt (needs bcrypt).
+# The others still verify existing hashes, which are upgraded on login.
+PASSWORD_HASHER_CLASSES = {
+    'pbkdf2': 'core.hashers.TunedPBKDF2PasswordHasher',
+    'argon2': 'core.hashers.TunedArgon2PasswordHasher',
+    'bcrypt': 'core.hashers.TunedBCryptSHA256PasswordHasher',
+}
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2')
+PASSWORD_HASHERS = [PASSWORD_HASHER_CLASSES[PASSWORD_HASHER]] + [
+    hasher for name, hasher in PASSWORD_HASHER_CLASSES.items()
+    if name != PASSWORD_HASHER
+]
+PASSWORD_HASHING = {
+    # None keeps Django's default iterations
+    'PBKDF2_ITERATIONS': int(os.environ.get('PBKDF2_ITERATIONS', 0)) or None,
+    'ARGON2_TIME_COST': int(os.environ.get('ARGON2_TIME_COST', 2)),
+    'ARGON2_MEMORY_COST': int(os.environ.get('ARGON2_MEMORY_COST', 512)),
+    'ARGON2_PARALLELISM': int(os.environ.get('ARGON2_PARALLELISM', 2)),
+    'BCRYPT_ROUNDS': int(os.environ.get('BCRYPT_ROUNDS', 12)),
+    # Passwords hashed at once per process and seconds to wait for a slot
+    'WORKERS': int(os.environ.get('PASSWORD_HASHING_WORKERS', os.cpu_count())),
+    'TIMEOUT': float(os.environ.get('PASSWORD_HASHING_TIMEOUT', 5)),
+}
+
+AUTHENTICATION_BACKENDS = ['user.backends.HashLimitedModelBackend']
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/3.0/topics/i18n/
 
@@ -135,5 +172,139 @@ MEDIA_ROOT = '/vol/web/media'
 MEDIA_ROOT = '/vol/web/media'
 
 
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': int(os.environ.get('TOKEN_CACHE_MAX_SIZE', 10000)),
+    'TTL': int(os.environ.get('TOKEN_CACHE_TTL', 30)),
+    # alias in CACHES shared by all processes, None keeps it in-process only
+    'SHARED_CACHE': os.environ.get('TOKEN_CACHE_SHARED_ALIAS'),
+    'SHARED_TTL': int(os.environ.get('TOKEN_CACHE_SHARED_TTL', 300)),
+}
+
+# Lifetime in seconds of API tokens and of the keys that rotate them
+AUTH_TOKEN = {
+    'TTL': int(os.environ.get('AUTH_TOKEN_TTL', 60 * 60)),
+    'REFRESH_TTL': int(
+        os.environ.get('AUTH_TOKEN_REFRESH_TTL', 30 * 24 * 60 * 60)
+    ),
+}
+
+# In-process Bloom filter of revoked tokens, sized for CAPACITY keys at
+# the ERROR_RATE of false positives, which only cost a database lookup.
+# New revocations are loaded every REFRESH_INTERVAL seconds.
+TOKEN_REVOCATION = {
+    'CAPACITY': int(os.environ.get('TOKEN_REVOCATION_CAPACITY', 100000)),
+    'ERROR_RATE': float(os.environ.get('TOKEN_REVOCATION_ERROR_RATE', 0.001)),
+    'REFRESH_INTERVAL': float(
+        os.environ.get('TOKEN_REVOCATION_REFRESH_INTERVAL', 5)
+    ),
+}
+
+REST_FRAMEWORK = {
+    # orjson is used when installed, else the stdlib json module
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'core.renderers.NDJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.parsers.FastJSONParser',
+        'core.parsers.NDJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    # Attempts are counted in the default cache, configure a shared
+    # backend when running several workers or each one allows the rate
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': os.environ.get('LOGIN_IP_THROTTLE_RATE', '30/min'),
+        'login_account': os.environ.get(
+            'LOGIN_ACCOUNT_THROTTLE_RATE', '10/min'
+        ),
+    },
+}
+
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 100))
+
+# Render recipe lists and details from value rows instead of serializers
+RECIPE_FAST_READ = os.environ.get('RECIPE_FAST_READ', '1') == '1'
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Keys follow the data versions stored in the database, so a local
+    # memory cache per process is never stale, a shared backend only
+    # raises the hit ratio when running several processes
+    'responses': {
+        'BACKEND': os.environ.get(
+            'RESPONSE_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('RESPONSE_CACHE_LOCATION', 'responses'),
+        'TIMEOUT': int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 60)),
+    },
+}
+
+# Cached list responses of the recipe API, keyed by user and data version
+RESPONSE_CACHE = {
+    'ENABLED': os.environ.get('RESPONSE_CACHE_ENABLED', '1') == '1',
+    'CACHE': 'responses',
+}
+
+# Per view request timings exposed at /metrics, SAMPLE_RATE is the share
+# of requests timed and 0 turns the instrumentation off
+PERFORMANCE_METRICS = {
+    'ENABLED': os.environ.get('PERFORMANCE_METRICS', '1') == '1',
+    'SAMPLE_RATE': float(os.environ.get('PERFORMANCE_SAMPLE_RATE', 1.0)),
+    'SERVER_TIMING': os.environ.get('SERVER_TIMING', '0') == '1',
+    'TOKEN': os.environ.get('METRICS_TOKEN', ''),
+}
+
+# Development check for relations loaded lazily in a loop, requests that
+# make THRESHOLD queries of the same shape are logged or, with RAISE,
+# fail with an error
+NPLUSONE = {
+    'ENABLED': os.environ.get('NPLUSONE_DETECTION', '0') == '1',
+    'THRESHOLD': int(os.environ.get('NPLUSONE_THRESHOLD', 3)),
+    'RAISE': os.environ.get('NPLUSONE_RAISE', '0') == '1',
+}
+
+# Background generation of resized recipe images
+RECIPE_IMAGE_QUEUE = {
+    'BACKEND': os.environ.get(
+        'RECIPE_IMAGE_QUEUE', 'recipe.images.ThreadPoolImageQueue'
+    ),
+    'OPTIONS': {
+        'workers': int(os.environ.get('RECIPE_IMAGE_WORKERS', 2)),
+    },
+}
+RECIPE_IMAGE_RENDITIONS = {
+    'thumbnail': 150,
+    'medium': 600,
+    'large': 1200,
+}
+RECIPE_IMAGE_FORMATS = ('webp', 'jpeg')
+# Partial chunked uploads, kept outside MEDIA_ROOT so they are never served
+RECIPE_IMAGE_UPLOAD_DIR = os.environ.get(
+    'RECIPE_IMAGE_UPLOAD_DIR', '/vol/web/uploads'
+)
+# Seconds to finish a chunked upload, prune_uploads deletes older ones
+RECIPE_IMAGE_UPLOAD_TTL = int(
+    os.environ.get('RECIPE_IMAGE_UPLOAD_TTL', 24 * 60 * 60)
+)
+RECIPE_IMAGE_MAX_SIZE = int(
+    os.environ.get('RECIPE_IMAGE_MAX_SIZE', 20 * 1024 * 1024)
+)
+
+# Limits of the bulk create/update/delete endpoints
+BULK_MAX_ITEMS = int(os.environ.get('BULK_MAX_ITEMS', 10000))
+BULK_BATCH_SIZE = int(os.environ.get('BULK_BATCH_SIZE', 1000))
+
+# Changes returned by one incremental sync response
+SYNC_PAGE_SIZE = int(os.environ.get('SYNC_PAGE_SIZE', 1000))
+
+# Recipes read per query while streaming a catalog export
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 2000))
+
+
 # core is the app and User is the user model which replaces default
 AUTH_USER_MODEL = 'core.User'
@@ -0,0 +1,392 @@
+"""Benchmark the hot paths of the recipe API in process
+
+Seeds synthetic users in a throwaway test database of the configured
+backend, so it runs against SQLite or a Postgres container alike, and
+measures latency percentiles, throughput and queries per request:
+
+    python -m benchmarks.api --recipes 500 --output results.json
+    python -m benchmarks.api --compare results.json
+
+Comparing exits with status 1 when a scenario got slower than the
+threshold or makes more queries than in the baseline.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+
+SCENARIOS = (
+    'recipe_list',
+    'recipe_detail',
+    'recipe_create',
+    'recipe_update',
+    'tag_list',
+    'ingredient_list',
+    'token_issue',
+    'image_upload',
+)
+PASSWORD = 'benchmark1234'
+
+
+class DiscardImageQueue:
+    """Drops image jobs, the renditions are generated off the request"""
+
+    def submit(self, func, *args):
+        pass
+
+
+def percentile(values, fraction):
+    """Return the value below which the fraction of sorted values lie"""
+    index = min(int(len(values) * fraction), len(values) - 1)
+
+    return values[index]
+
+
+def seed(options):
+    """Create the users and their catalogs with bulk inserts"""
+    from django.contrib.auth import get_user_model
+
+    from core.models import AuthToken, Ingredient, Recipe, Tag
+
+    rng = random.Random(options.seed)
+    users = []
+    for i in range(options.users):
+        user = get_user_model().objects.create_user(
+            f'user{i}@benchmark.com',
+            PASSWORD
+        )
+        users.append(user)
+        user.token = AuthToken.objects.issue(user)
+
+        related = {}
+        for name, model, count in (
+            ('tags', Tag, options.tags),
+            ('ingredients', Ingredient, options.ingredients),
+        ):
+            model.objects.bulk_create(
+                model(user=user, name=f'{model.__name__} {j}')
+                for j in range(count)
+            )
+            related[name] = list(
+                model.objects.filter(user=user).values_list('id', flat=True)
+            )
+
+        Recipe.objects.bulk_create(
+            (
+                Recipe(
+                    user=user,
+                    title=f'Recipe {j}',
+                    time_in_minutes=rng.randint(5, 120),
+                    price=rng.randint(100, 5000) / 100
+                )
+                for j in range(options.recipes)
+            )
+        )
+        recipe_ids = list(
+            Recipe.objects.filter(user=user).values_list('id', flat=True)
+        )
+        for name, ids in related.items():
+            field = Recipe._meta.get_field(name)
+            through = field.remote_field.through
+            target = f'{field.m2m_reverse_field_name()}_id'
+            through.objects.bulk_create(
+                (
+                    through(recipe_id=recipe_id, **{target: target_id})
+                    for recipe_id in recipe_ids
+                    for target_id in rng.sample(
+                        ids, min(options.related, len(ids))
+                    )
+                )
+            )
+
+    return users
+
+
+def sample_image():
+    """Return a small PNG upload"""
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (640, 480), (200, 120, 40)).save(buffer, format='PNG')
+    buffer.seek(0)
+    buffer.name = 'benchmark.png'
+
+    return buffer
+
+
+def scenario_requests(name, user, rng):
+    """Return a function making one request of the scenario"""
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    from core.models import Ingredient, Recipe, Tag
+
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {user.token.key}')
+    recipe_ids = list(
+        Recipe.objects.filter(user=user).values_list('id', flat=True)
+    )
+    tag_ids = list(Tag.objects.filter(user=user).values_list('id', flat=True))
+    ingredient_ids = list(
+        Ingredient.objects.filter(user=user).values_list('id', flat=True)
+    )
+
+    def detail_url(action='recipe-detail'):
+        return reverse(f'recipe:{action}', args=[rng.choice(recipe_ids)])
+
+    if name == 'recipe_list':
+        return lambda: client.get(reverse('recipe:recipe-list'))
+    elif name == 'recipe_detail':
+        return lambda: client.get(detail_url())
+    elif name == 'recipe_create':
+        return lambda: client.post(reverse('recipe:recipe-list'), {
+            'title': 'Benchmark recipe',
+            'time_in_minutes': 30,
+            'price': '9.99',
+            'tags': rng.sample(tag_ids, min(3, len(tag_ids))),
+            'ingredients': rng.sample(
+                ingredient_ids, min(3, len(ingredient_ids))
+            ),
+        }, format='json')
+    elif name == 'recipe_update':
+        return lambda: client.patch(
+            detail_url(),
+            {'title': f'Renamed {rng.random()}'},
+            format='json'
+        )
+    elif name == 'tag_list':
+        return lambda: client.get(reverse('recipe:tag-list'))
+    elif name == 'ingredient_list':
+        return lambda: client.get(reverse('recipe:ingredient-list'))
+    elif name == 'token_issue':
+        anonymous = APIClient()
+        return lambda: anonymous.post(reverse('user:token'), {
+            'email': user.email,
+            'password': PASSWORD,
+        })
+    elif name == 'image_upload':
+        return lambda: client.post(
+            detail_url('recipe-upload-image'),
+            {'image': sample_image()},
+            format='multipart'
+        )
+
+    raise ValueError(f'Unknown scenario {name}')
+
+
+def run_scenario(name, users, options):
+    """Time the requests of a scenario, spread over the users"""
+    from django.db import connection
+
+    from core.middleware import QueryTimer
+
+    rng = random.Random(options.seed)
+    requests = [scenario_requests(name, user, rng) for user in users]
+    for i in range(options.warmup):
+        requests[i % len(requests)]()
+
+    latencies = []
+    queries = QueryTimer()
+    start = time.perf_counter()
+    with connection.execute_wrapper(queries):
+        for i in range(options.requests):
+            request_start = time.perf_counter()
+            response = requests[i % len(requests)]()
+            latencies.append(time.perf_counter() - request_start)
+            if response.status_code >= 400:
+                raise RuntimeError(
+                    f'{name} failed with {response.status_code}: '
+                    f'{response.content[:200]!r}'
+                )
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'requests_per_second': len(latencies) / elapsed,
+        'mean_ms': statistics.mean(latencies) * 1000,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p90_ms': percentile(latencies, 0.9) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'queries_per_request': queries.count / len(latencies),
+        'query_ms_per_request': queries.duration * 1000 / len(latencies),
+    }
+
+
+def git_commit():
+    """Return the checked out commit, None outside a git work tree"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            capture_output=True,
+            check=True,
+            text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(options):
+    """Seed a test database, run the scenarios and return the results"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+    import django
+    django.setup()
+
+    from unittest.mock import patch
+
+    from django.db import connection
+    from django.test.utils import override_settings, \
+        setup_test_environment, teardown_test_environment
+    from rest_framework.throttling import SimpleRateThrottle
+
+    media = tempfile.TemporaryDirectory()
+    overrides = override_settings(
+        MEDIA_ROOT=media.name,
+        RECIPE_IMAGE_UPLOAD_DIR=os.path.join(media.name, 'uploads'),
+        RECIPE_IMAGE_QUEUE={'BACKEND': 'benchmarks.api.DiscardImageQueue'},
+        RESPONSE_CACHE={
+            'ENABLED': options.response_cache,
+            'CACHE': 'responses',
+        },
+        PERFORMANCE_METRICS={
+            'ENABLED': False,
+            'SAMPLE_RATE': 0,
+            'SERVER_TIMING': False,
+            'TOKEN': '',
+        },
+    )
+    # one client logs in over and over, which the login limits refuse
+    throttles = patch.object(SimpleRateThrottle, 'THROTTLE_RATES', {
+        scope: None for scope in SimpleRateThrottle.THROTTLE_RATES
+    })
+
+    setup_test_environment()
+    database = connection.creation.create_test_db(
+        verbosity=0,
+        autoclobber=True,
+        keepdb=False
+    )
+    try:
+        with overrides, throttles:
+            users = seed(options)
+            scenarios = {
+                name: run_scenario(name, users, options)
+                for name in options.scenarios
+            }
+    finally:
+        connection.creation.destroy_test_db(database, verbosity=0)
+        teardown_test_environment()
+        media.cleanup()
+
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'date': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'options': {
+                key: value for key, value in vars(options).items()
+                if key not in ('output', 'compare')
+            },
+        },
+        'scenarios': scenarios,
+    }
+
+
+def compare(baseline, results, threshold):
+    """Print the change of every scenario, return the regressed ones"""
+    regressions = []
+    print(
+        f"{'scenario':<16} {'p50 ms':>9} {'change':>8} "
+        f"{'queries':>8} {'baseline':>9}"
+    )
+    for name, result in results['scenarios'].items():
+        before = baseline['scenarios'].get(name)
+        if before is None:
+            continue
+        change = result['p50_ms'] / before['p50_ms'] - 1
+        print(
+            f"{name:<16} {result['p50_ms']:>9.2f} {change:>+8.1%} "
+            f"{result['queries_per_request']:>8.1f} "
+            f"{before['queries_per_request']:>9.1f}"
+        )
+        if change > threshold or (
+            result['queries_per_request'] > before['queries_per_request']
+        ):
+            regressions.append(name)
+
+    return regressions
+
+
+def report(results):
+    print(
+        f"{'scenario':<16} {'req/s':>9} {'p50 ms':>8} {'p90 ms':>8} "
+        f"{'p99 ms':>8} {'queries':>8}"
+    )
+    for name, result in results['scenarios'].items():
+        print(
+            f"{name:<16} {result['requests_per_second']:>9.1f} "
+            f"{result['p50_ms']:>8.2f} {result['p90_ms']:>8.2f} "
+            f"{result['p99_ms']:>8.2f} {result['queries_per_request']:>8.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=5)
+    parser.add_argument('--recipes', type=int, default=200,
+                        help='Recipes per user')
+    parser.add_argument('--tags', type=int, default=20,
+                        help='Tags per user')
+    parser.add_argument('--ingredients', type=int, default=30,
+                        help='Ingredients per user')
+    parser.add_argument('--related', type=int, default=3,
+                        help='Tags and ingredients per recipe')
+    parser.add_argument('--requests', type=int, default=200,
+                        help='Measured requests per scenario')
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--scenario', action='append', dest='scenarios',
+                        choices=SCENARIOS,
+                        help='Scenario to run, all of them by default')
+    parser.add_argument('--response-cache', action='store_true',
+                        help='Serve repeated lists from the response cache')
+    parser.add_argument('--output', help='Write the results as JSON')
+    parser.add_argument('--compare',
+                        help='Compare against the JSON of an earlier run')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='Allowed p50 slowdown when comparing')
+    options = parser.parse_args()
+    options.scenarios = options.scenarios or list(SCENARIOS)
+
+    results = run(options)
+    report(results)
+
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump(results, output, indent=2)
+
+    if options.compare:
+        with open(options.compare) as baseline:
+            regressions = compare(
+                json.load(baseline),
+                results,
+                options.threshold
+            )
+        if regressions:
+            print(f"Regressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
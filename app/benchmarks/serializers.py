@@ -0,0 +1,130 @@
+"""Compare the recipe serializers against the fast value row path
+
+Measures only the Python side, building the representation of recipes
+that were already fetched from a throwaway test database:
+
+    python -m benchmarks.serializers --recipes 1000 --related 5
+"""
+import argparse
+import os
+import timeit
+from decimal import Decimal
+
+
+def build_inputs(count, related):
+    """Seed the recipes and return them as prefetched models and rows"""
+    from django.contrib.auth import get_user_model
+    from django.db.models import Prefetch
+
+    from core.models import Ingredient, Recipe, Tag
+    from recipe.fastpath import RELATED_FIELDS, fetch_related_ids, \
+        recipe_rows
+
+    user = get_user_model().objects.create_user(
+        'serializers@benchmark.com',
+        'benchmark1234'
+    )
+    Recipe.objects.bulk_create(
+        (
+            Recipe(
+                user=user,
+                title=f'Recipe {i}',
+                time_in_minutes=i % 120,
+                price=Decimal(i % 1000) / 10,
+                link=''
+            )
+            for i in range(count)
+        )
+    )
+    recipe_ids = list(
+        Recipe.objects.order_by('id').values_list('id', flat=True)
+    )
+    for name, model in (('ingredients', Ingredient), ('tags', Tag)):
+        model.objects.bulk_create(
+            model(user=user, name=f'{model.__name__} {i}')
+            for i in range(related)
+        )
+        ids = list(model.objects.values_list('id', flat=True))
+        field = Recipe._meta.get_field(name)
+        through = field.remote_field.through
+        target = f'{field.m2m_reverse_field_name()}_id'
+        through.objects.bulk_create(
+            (
+                through(recipe_id=recipe_id, **{target: target_id})
+                for recipe_id in recipe_ids
+                for target_id in ids
+            )
+        )
+
+    queryset = Recipe.objects.order_by('id')
+    recipes = list(queryset.prefetch_related(
+        Prefetch('ingredients', Ingredient.objects.order_by('id')),
+        Prefetch('tags', Tag.objects.order_by('id')),
+    ))
+    rows = list(recipe_rows(queryset))
+    # Fetch the related ids up front where the row query doesn't
+    if rows and 'tags_ids' not in rows[0]:
+        for name in RELATED_FIELDS:
+            linked = fetch_related_ids(name, recipe_ids)
+            for row in rows:
+                row[f'{name}_ids'] = linked[row['id']]
+
+    return recipes, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--recipes', type=int, default=1000)
+    parser.add_argument('--related', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=5)
+    options = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+    import django
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment, \
+        teardown_test_environment
+    from rest_framework.renderers import JSONRenderer
+    from recipe.fastpath import recipe_list_data
+    from recipe.serializers import RecipeSerializer
+
+    setup_test_environment()
+    database = connection.creation.create_test_db(
+        verbosity=0,
+        autoclobber=True,
+        keepdb=False
+    )
+    try:
+        recipes, rows = build_inputs(options.recipes, options.related)
+    finally:
+        connection.creation.destroy_test_db(database, verbosity=0)
+        teardown_test_environment()
+    renderer = JSONRenderer()
+
+    slow = renderer.render(RecipeSerializer(recipes, many=True).data)
+    fast = renderer.render(recipe_list_data(rows))
+    assert slow == fast, 'fast path output differs from the serializer'
+
+    timings = {
+        'serializer': min(timeit.repeat(
+            lambda: RecipeSerializer(recipes, many=True).data,
+            number=1,
+            repeat=options.repeat
+        )),
+        'fast path': min(timeit.repeat(
+            lambda: recipe_list_data(rows),
+            number=1,
+            repeat=options.repeat
+        )),
+    }
+
+    for name, seconds in timings.items():
+        print(f'{name:<12} {seconds * 1000:>9.2f} ms')
+    speedup = timings['serializer'] / timings['fast path']
+    print(f'speedup      {speedup:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""Compare requests/sec of the dev server against the production server
+
+Run from the app directory against a migrated database, with the token of
+a user that owns some recipes:
+
+    python -m benchmarks.serving --token <token> --serve-args="--workers 4"
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+
+SERVERS = {
+    'runserver': ['runserver', '{address}', '--noreload'],
+    'serve': ['serve', '--bind', '{address}'],
+}
+
+
+def free_port():
+    """Return a TCP port nothing listens on"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    """Block until the server accepts connections"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+
+    raise RuntimeError(f'Server on port {port} did not start')
+
+
+def run_load(port, path, token, concurrency, duration):
+    """Hammer the path from keep-alive connections for duration seconds"""
+    headers = {'Authorization': f'Token {token}'} if token else {}
+    deadline = time.monotonic() + duration
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker():
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        own_latencies = []
+        own_errors = 0
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                conn.request('GET', path, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 400:
+                    own_errors += 1
+            except (OSError, http.client.HTTPException):
+                own_errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port)
+            own_latencies.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            latencies.extend(own_latencies)
+            errors.append(own_errors)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': sum(errors),
+        'requests_per_second': len(latencies) / duration,
+        'p50_ms': statistics.median(latencies) * 1000 if latencies else None,
+        'p99_ms': latencies[int(len(latencies) * 0.99)] * 1000
+        if latencies else None,
+    }
+
+
+def benchmark_server(name, extra_args, options):
+    """Start one server, load it and stop it again"""
+    port = free_port()
+    address = f'127.0.0.1:{port}'
+    command = [sys.executable, 'manage.py'] + [
+        arg.format(address=address) for arg in SERVERS[name]
+    ] + extra_args
+    server = subprocess.Popen(
+        command,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_for_port(port)
+        # warm up imports and connections before measuring
+        run_load(port, options.path, options.token, options.concurrency, 1)
+        return run_load(
+            port,
+            options.path,
+            options.token,
+            options.concurrency,
+            options.duration
+        )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--path', default='/api/recipe/recipe/')
+    parser.add_argument('--token', default=os.environ.get('BENCHMARK_TOKEN'))
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=int, default=10)
+    parser.add_argument('--serve-args', default='')
+    parser.add_argument('--output', help='Write the results as JSON')
+    options = parser.parse_args()
+
+    results = {
+        'runserver': benchmark_server('runserver', [], options),
+        'serve': benchmark_server(
+            'serve', options.serve_args.split(), options
+        ),
+    }
+
+    print(f"{'server':<10} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} errors")
+    for name, result in results.items():
+        print(
+            f"{name:<10} {result['requests_per_second']:>9.1f} "
+            f"{result['p50_ms'] or 0:>8.1f} {result['p99_ms'] or 0:>8.1f} "
+            f"{result['errors']}"
+        )
+
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
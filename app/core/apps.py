@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        """Expose the database connection statistics as metrics"""
+        from core.db.stats import collect_metrics
+        from core.metrics import registry
+
+        registry.register_collector(collect_metrics)
@@ -0,0 +1,136 @@
+import threading
+import time
+
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.creation import DatabaseCreation
+
+from core.db import stats
+from core.db.pool import ConnectionPool, PoolTimeout
+
+
+_pools_lock = threading.Lock()
+
+
+class PooledDatabaseCreation(DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle pooled connections would keep the test database in use
+        stats.close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """Postgres backend with connection health checks and optional pooling
+
+    Extra settings next to the regular ones:
+
+    * HEALTH_CHECKS: check a persistent connection with a cheap query
+      before it's first used in a request, instead of failing the request
+      when the server closed it in the meantime.
+    * POOL: {'MAX_SIZE': ..., 'TIMEOUT': ...} shares up to MAX_SIZE
+      connections between the threads of the process, closing a
+      connection then returns it to the pool. CONN_MAX_AGE is ignored,
+      connections go back to the pool at the end of each request.
+    """
+    creation_class = PooledDatabaseCreation
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+        if self.pool_config:
+            # A thread keeping its connection starves the others
+            self.settings_dict['CONN_MAX_AGE'] = 0
+
+    @property
+    def pool_config(self):
+        return self.settings_dict.get('POOL')
+
+    def get_pool(self, conn_params):
+        """Return the process wide pool of this database"""
+        key = (self.alias, conn_params.get('database'))
+        with _pools_lock:
+            pool = stats.pools.get(key)
+            if pool is None:
+                check = self.check_pooled if self.health_checks else None
+                pool = ConnectionPool(
+                    lambda: base.Database.connect(**conn_params),
+                    max_size=self.pool_config.get('MAX_SIZE', 10),
+                    timeout=self.pool_config.get('TIMEOUT', 10),
+                    check=check
+                )
+                stats.pools[key] = pool
+
+        return pool
+
+    @staticmethod
+    def check_pooled(connection):
+        try:
+            connection.cursor().execute('SELECT 1')
+        except base.Database.Error:
+            return False
+
+        return True
+
+    @property
+    def health_checks(self):
+        return self.settings_dict.get('HEALTH_CHECKS', False)
+
+    def get_new_connection(self, conn_params):
+        start = time.perf_counter()
+        if not self.pool_config:
+            connection = super().get_new_connection(conn_params)
+        else:
+            try:
+                connection = self.get_pool(conn_params).acquire()
+            except PoolTimeout as e:
+                raise base.Database.OperationalError(str(e)) from e
+            isolation_level = self.settings_dict['OPTIONS'].get(
+                'isolation_level'
+            )
+            self.isolation_level = isolation_level
+            if isolation_level is None:
+                self.isolation_level = connection.isolation_level
+            elif isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=isolation_level)
+
+        self.health_check_done = True
+        stats.record_connection_setup(
+            self.alias,
+            time.perf_counter() - start
+        )
+
+        return connection
+
+    def _close(self):
+        if self.connection is None or not self.pool_config:
+            return super()._close()
+
+        pool = self.get_pool(self.get_connection_params())
+        # Closing inside an atomic block keeps the wrapper referencing the
+        # connection, so it must really be closed instead of shared
+        discard = self.errors_occurred or self.in_atomic_block
+        if not discard:
+            try:
+                # Leave no transaction open for the next borrower
+                self.connection.rollback()
+            except base.Database.Error:
+                discard = True
+        pool.release(self.connection, discard=discard)
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        # Called at the start and end of each request
+        self.health_check_done = False
+
+    def _cursor(self, name=None):
+        if (
+            self.health_checks and
+            not self.health_check_done and
+            self.connection is not None and
+            not self.in_atomic_block
+        ):
+            self.health_check_done = True
+            if not self.is_usable():
+                self.close()
+
+        return super()._cursor(name)
@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection became free in time"""
+
+
+class ConnectionPool:
+    """Thread safe pool of reusable database connections
+
+    Connections are opened lazily up to max_size, idle ones are handed out
+    most recently used first so the pool shrinks back to warm connections.
+    """
+
+    def __init__(self, connect, max_size, timeout=10, check=None):
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check = check
+        self._idle = deque()
+        self._size = 0
+        self._condition = threading.Condition()
+        self.connects = 0
+        self.connect_time = 0.0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.timeouts = 0
+
+    def acquire(self):
+        """Return an idle connection or open a new one while there's room"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._condition:
+                if not self._idle and self._size >= self.max_size:
+                    self._wait(deadline)
+                if self._idle:
+                    connection = self._idle.pop()
+                else:
+                    connection = None
+                    self._size += 1
+
+            if connection is None:
+                return self._open()
+            if self._is_usable(connection):
+                return connection
+            self.release(connection, discard=True)
+
+    def _wait(self, deadline):
+        """Wait for a connection to be released, called with the lock held"""
+        self.waits += 1
+        start = time.monotonic()
+        while not self._idle and self._size >= self.max_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.timeouts += 1
+                raise PoolTimeout(
+                    f'No connection available within {self.timeout}s'
+                )
+            self._condition.wait(remaining)
+        self.wait_time += time.monotonic() - start
+
+    def _open(self):
+        """Open a connection for a slot reserved by acquire"""
+        start = time.perf_counter()
+        try:
+            connection = self.connect()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            self.connects += 1
+            self.connect_time += time.perf_counter() - start
+
+        return connection
+
+    def _is_usable(self, connection):
+        if getattr(connection, 'closed', False):
+            return False
+
+        return self.check is None or self.check(connection)
+
+    def release(self, connection, discard=False):
+        """Return a connection to the pool, or close it when discarded"""
+        if discard:
+            try:
+                connection.close()
+            except Exception:
+                pass
+        with self._condition:
+            if discard:
+                self._size -= 1
+            else:
+                self._idle.append(connection)
+            self._condition.notify()
+
+    def close(self):
+        """Close every idle connection"""
+        with self._condition:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+        for connection in idle:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def stats(self):
+        """Return the utilization and connect timings of the pool"""
+        with self._condition:
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'connects': self.connects,
+                'connect_time': self.connect_time,
+                'waits': self.waits,
+                'wait_time': self.wait_time,
+                'timeouts': self.timeouts,
+            }
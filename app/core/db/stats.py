@@ -0,0 +1,74 @@
+import threading
+
+from django.db import connections
+
+
+_lock = threading.Lock()
+_setup = {}
+pools = {}
+
+
+def record_connection_setup(alias, seconds):
+    """Record how long a database connection took to become usable"""
+    with _lock:
+        stats = _setup.setdefault(alias, {
+            'connections': 0,
+            'setup_time': 0.0,
+            'setup_time_max': 0.0,
+        })
+        stats['connections'] += 1
+        stats['setup_time'] += seconds
+        stats['setup_time_max'] = max(stats['setup_time_max'], seconds)
+
+
+def database_stats():
+    """Return connection setup timings and pool utilization per alias"""
+    with _lock:
+        result = {alias: dict(stats) for alias, stats in _setup.items()}
+
+    for (alias, database), pool in list(pools.items()):
+        if connections.databases[alias].get('NAME') != database:
+            continue
+        result.setdefault(alias, {})['pool'] = pool.stats()
+
+    return result
+
+
+def close_pools():
+    """Close the idle connections of every pool"""
+    for pool in list(pools.values()):
+        pool.close()
+
+
+def collect_metrics():
+    """Return the connection and pool statistics as metrics"""
+    stats = database_stats()
+    setup = (
+        ('connections', 'counter', 'Database connections opened'),
+        ('setup_time', 'counter', 'Seconds spent opening connections'),
+        ('setup_time_max', 'gauge', 'Slowest connection setup in seconds'),
+    )
+    for key, kind, help_text in setup:
+        yield f'app_db_{key}', kind, help_text, [
+            ({'alias': alias}, values[key])
+            for alias, values in stats.items() if key in values
+        ]
+
+    pools = {
+        alias: values['pool']
+        for alias, values in stats.items() if 'pool' in values
+    }
+    pool_metrics = (
+        ('max_size', 'gauge'),
+        ('size', 'gauge'),
+        ('idle', 'gauge'),
+        ('in_use', 'gauge'),
+        ('connects', 'counter'),
+        ('waits', 'counter'),
+        ('wait_time', 'counter'),
+        ('timeouts', 'counter'),
+    )
+    for key, kind in pool_metrics:
+        yield f'app_db_pool_{key}', kind, f'Connection pool {key}', [
+            ({'alias': alias}, pool[key]) for alias, pool in pools.items()
+        ]
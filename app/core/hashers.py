@@ -0,0 +1,96 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.dispatch import receiver
+from django.test.signals import setting_changed
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class TunedPBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """PBKDF2 with the iterations set in PASSWORD_HASHING
+
+    Passwords hashed with another cost are rehashed on the next login.
+    """
+
+    @property
+    def iterations(self):
+        return (
+            settings.PASSWORD_HASHING['PBKDF2_ITERATIONS'] or
+            hashers.PBKDF2PasswordHasher.iterations
+        )
+
+
+class TunedArgon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """Argon2 with the costs set in PASSWORD_HASHING, needs argon2-cffi"""
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_HASHING['ARGON2_TIME_COST']
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_HASHING['ARGON2_MEMORY_COST']
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_HASHING['ARGON2_PARALLELISM']
+
+
+class TunedBCryptSHA256PasswordHasher(hashers.BCryptSHA256PasswordHasher):
+    """bcrypt with the rounds set in PASSWORD_HASHING, needs bcrypt"""
+
+    @property
+    def rounds(self):
+        return settings.PASSWORD_HASHING['BCRYPT_ROUNDS']
+
+
+class HashingBusy(APIException):
+    """Raised when every hashing slot stayed taken for too long"""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many logins at once, try again shortly.'
+    default_code = 'hashing_busy'
+
+
+_slots = None
+_slots_lock = threading.Lock()
+
+
+def get_hashing_slots():
+    """Return the semaphore bounding the concurrent password hashes"""
+    global _slots
+    with _slots_lock:
+        if _slots is None:
+            _slots = threading.BoundedSemaphore(
+                settings.PASSWORD_HASHING['WORKERS']
+            )
+
+    return _slots
+
+
+@receiver(setting_changed)
+def reset_hashing_slots(setting, **kwargs):
+    """Rebuild the semaphore when the settings are overridden in tests"""
+    global _slots
+    if setting == 'PASSWORD_HASHING':
+        _slots = None
+
+
+@contextmanager
+def hashing_slot():
+    """Hash passwords in the block within the bounded hashing capacity
+
+    Password hashes are deliberately CPU bound, so a login storm would
+    otherwise starve every other request of the process. Requests that
+    can't get a slot within PASSWORD_HASHING['TIMEOUT'] fail with a 503.
+    """
+    slots = get_hashing_slots()
+    if not slots.acquire(timeout=settings.PASSWORD_HASHING['TIMEOUT']):
+        raise HashingBusy()
+    try:
+        yield
+    finally:
+        slots.release()
@@ -0,0 +1,98 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from recipe.importer import RecipeImporter, RowError, file_format
+
+
+class Command(BaseCommand):
+    """Django command to bulk import recipes from CSV or NDJSON files
+
+    The files use the format of the recipe export endpoint.
+    """
+    help = 'Import recipes of a user from CSV or NDJSON files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+')
+        parser.add_argument(
+            '--user',
+            required=True,
+            help='Email of the user owning the imported recipes',
+        )
+        parser.add_argument(
+            '--format',
+            choices=('csv', 'ndjson'),
+            help='Format of all files, guessed from the extension otherwise',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.BULK_BATCH_SIZE,
+            help='Recipes inserted per transaction',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Files imported in parallel, each with its own connection',
+        )
+
+    def import_file(self, importer, path, file_format):
+        """Import one file and report its throughput"""
+        start = time.monotonic()
+        count = importer.import_file(path, file_format)
+        self.report(path, count, time.monotonic() - start)
+
+        return count
+
+    def import_in_thread(self, *args):
+        """Import a file in a worker thread with its own connection"""
+        try:
+            return self.import_file(*args)
+        finally:
+            connection.close()
+
+    def report(self, label, count, elapsed):
+        rate = count / elapsed if elapsed else count
+        self.stdout.write(
+            f'{label}: {count} recipes in {elapsed:.2f}s ({rate:.0f}/s)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user with email {options['user']}")
+        if options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError('Batch size and workers must be positive')
+
+        try:
+            files = [
+                (path, options['format'] or file_format(path))
+                for path in options['files']
+            ]
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        importer = RecipeImporter(user, options['batch_size'])
+        start = time.monotonic()
+        try:
+            if options['workers'] == 1:
+                counts = [
+                    self.import_file(importer, path, format_name)
+                    for path, format_name in files
+                ]
+            else:
+                with ThreadPoolExecutor(options['workers']) as executor:
+                    counts = list(executor.map(
+                        lambda args: self.import_in_thread(importer, *args),
+                        files
+                    ))
+        except (OSError, RowError) as exc:
+            raise CommandError(exc)
+
+        self.report('Total', sum(counts), time.monotonic() - start)
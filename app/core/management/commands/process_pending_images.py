@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Recipe
+from recipe.images import get_image_queue, process_recipe_image
+
+
+class Command(BaseCommand):
+    """Django command to queue the recipe images waiting for renditions
+
+    Image jobs live in the memory of the process that received the
+    upload, so the ones not yet run when it restarts leave their recipes
+    pending. Run it after deploys or periodically, e.g. from cron.
+    """
+    help = 'Queue the recipe images still waiting to be processed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stuck',
+            action='store_true',
+            help='Retry images left processing by a stopped worker too, '
+                 'only while no worker is processing images',
+        )
+
+    def handle(self, *args, **options):
+        if options['stuck']:
+            Recipe.objects.filter(
+                image_status=Recipe.IMAGE_PROCESSING
+            ).update(image_status=Recipe.IMAGE_PENDING)
+
+        recipe_ids = list(Recipe.objects.filter(
+            image_status=Recipe.IMAGE_PENDING
+        ).values_list('id', flat=True))
+        queue = get_image_queue()
+        for recipe_id in recipe_ids:
+            queue.submit(process_recipe_image, recipe_id)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Queued {len(recipe_ids)} pending images'
+        ))
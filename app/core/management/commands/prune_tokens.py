@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import AuthToken, RevokedToken
+
+
+class Command(BaseCommand):
+    """Django command to delete the tokens that can't be used anymore
+
+    Tokens go once their refresh key expired, revocations once the key
+    they revoke would have expired anyway. Rows are deleted in batches
+    to keep the locks short, run it periodically, e.g. from cron.
+    """
+    help = 'Delete expired tokens and revocations'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows deleted per statement',
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        tokens = self.prune(
+            AuthToken.objects.filter(refresh_expires_at__lte=now),
+            options['batch_size']
+        )
+        revocations = self.prune(
+            RevokedToken.objects.filter(expires_at__lte=now),
+            options['batch_size']
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {tokens} expired tokens and {revocations} revocations'
+        ))
+
+    def prune(self, queryset, batch_size):
+        """Delete the rows of the queryset batch by batch"""
+        deleted = 0
+        while True:
+            ids = list(queryset.values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            deleted += queryset.model.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from core.models import ImageUploadSession
+from recipe.uploads import discard_upload, upload_expiry
+
+
+class Command(BaseCommand):
+    """Django command to delete the chunked image uploads never completed
+
+    Sessions older than RECIPE_IMAGE_UPLOAD_TTL seconds can't receive
+    chunks anymore and are deleted with the chunks received so far, run
+    it periodically, e.g. from cron.
+    """
+    help = 'Delete abandoned chunked image uploads'
+
+    def handle(self, *args, **options):
+        sessions = ImageUploadSession.objects.filter(
+            created_at__lte=upload_expiry()
+        )
+        deleted = 0
+        for session in sessions.iterator():
+            discard_upload(session)
+            deleted += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} abandoned uploads'
+        ))
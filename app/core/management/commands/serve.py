@@ -0,0 +1,128 @@
+import importlib.util
+import multiprocessing
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def env_int(name, default):
+    """Read an integer default from the environment"""
+    return int(os.environ.get(name, default))
+
+
+class Command(BaseCommand):
+    """Django command to serve the app with a multi worker gunicorn server
+
+    Send SIGHUP to the master process to gracefully reload the workers.
+    """
+    help = 'Serve the application with gunicorn'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--bind',
+            default=os.environ.get(
+                'SERVER_BIND', f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+            ),
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=env_int(
+                'SERVER_WORKERS', multiprocessing.cpu_count() * 2 + 1
+            ),
+            help='Number of worker processes',
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=env_int('SERVER_THREADS', 1),
+            help='Threads per worker, more than 1 uses the gthread worker',
+        )
+        parser.add_argument(
+            '--keep-alive',
+            type=int,
+            default=env_int('SERVER_KEEP_ALIVE', 5),
+            help='Seconds to keep idle client connections open',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=int,
+            default=env_int('SERVER_TIMEOUT', 30),
+            help='Seconds before a silent worker is restarted',
+        )
+        parser.add_argument(
+            '--graceful-timeout',
+            type=int,
+            default=env_int('SERVER_GRACEFUL_TIMEOUT', 30),
+            help='Seconds workers get to finish requests on reload/stop',
+        )
+        parser.add_argument(
+            '--max-requests',
+            type=int,
+            default=env_int('SERVER_MAX_REQUESTS', 0),
+            help='Recycle a worker after this many requests, 0 disables',
+        )
+        parser.add_argument(
+            '--no-preload',
+            action='store_false',
+            dest='preload',
+            help='Import the app in every worker instead of the master',
+        )
+        parser.add_argument(
+            '--reload',
+            action='store_true',
+            help='Restart workers when the code changes, for development',
+        )
+        parser.add_argument(
+            '--asgi',
+            action='store_true',
+            help='Serve app.asgi with uvicorn workers',
+        )
+
+    def get_arguments(self, options):
+        """Translate the command options to gunicorn arguments"""
+        app = 'app.wsgi:application'
+        worker_class = 'gthread' if options['threads'] > 1 else 'sync'
+        if options['asgi']:
+            app = 'app.asgi:application'
+            worker_class = 'uvicorn.workers.UvicornWorker'
+
+        arguments = [
+            '--bind', options['bind'],
+            '--workers', str(options['workers']),
+            '--threads', str(options['threads']),
+            '--worker-class', worker_class,
+            '--keep-alive', str(options['keep_alive']),
+            '--timeout', str(options['timeout']),
+            '--graceful-timeout', str(options['graceful_timeout']),
+            '--max-requests', str(options['max_requests']),
+            '--max-requests-jitter', str(options['max_requests'] // 10),
+            '--access-logfile', '-',
+        ]
+        # heartbeat files in memory instead of on a possibly slow disk
+        if os.path.isdir('/dev/shm'):
+            arguments += ['--worker-tmp-dir', '/dev/shm']
+        # changed code is only picked up when workers import it themselves
+        if options['reload']:
+            arguments.append('--reload')
+        elif options['preload']:
+            arguments.append('--preload')
+
+        return arguments + [app]
+
+    def handle(self, *args, **options):
+        if importlib.util.find_spec('gunicorn') is None:
+            raise CommandError('gunicorn is required to serve the app')
+        if options['asgi'] and importlib.util.find_spec('uvicorn') is None:
+            raise CommandError('uvicorn is required to serve with --asgi')
+
+        arguments = self.get_arguments(options)
+        self.stdout.write(f"Serving with gunicorn {' '.join(arguments)}")
+        self.stdout.flush()
+
+        # Replace this process so gunicorn's master gets the signals
+        os.execv(
+            sys.executable,
+            [sys.executable, '-m', 'gunicorn'] + arguments
+        )
@@ -1,20 +1,114 @@
+import os
+import random
 import time
+from concurrent.futures import ThreadPoolExecutor
+
 from django.db import connections
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 
 class Command(BaseCommand):
-    """Djangp command to pause execution until database is available"""
+    """Django command to pause execution until the databases are available
 
-    def handle(self, *args, **kwargs):
-        self.stdout.write("Waiting for database...")
-        db_conn = None
-        while not db_conn:
+    Every database is probed with a real query, failed probes are retried
+    with exponential backoff until the timeout runs out.
+    """
+    help = 'Wait until the databases accept queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            action='append',
+            dest='databases',
+            help='Alias of a database to wait for, all of them by default',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=float(os.environ.get('WAIT_FOR_DB_TIMEOUT', 60)),
+            help='Seconds to wait before giving up',
+        )
+        parser.add_argument(
+            '--initial-delay',
+            type=float,
+            default=0.1,
+            help='Seconds before the first retry',
+        )
+        parser.add_argument(
+            '--max-delay',
+            type=float,
+            default=5,
+            help='Longest pause between two retries',
+        )
+
+    def check_database(self, alias):
+        """Connect to the database and run a trivial query"""
+        connection = connections[alias]
+        try:
+            connection.ensure_connection()
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except OperationalError:
+            # Don't reuse a connection that may be half open
+            connection.close()
+            raise
+
+    def wait_for(self, alias, options):
+        """Probe a database until it answers, return the attempts made"""
+        start = time.monotonic()
+        deadline = start + options['timeout']
+        delay = options['initial_delay']
+        attempt = 1
+        while True:
             try:
-                db_conn = connections['default']
-            except OperationalError:
-                self.stdout.write('database not available, wait 1 second')
-                time.sleep(1)
+                self.check_database(alias)
+                break
+            except OperationalError as exc:
+                # Full jitter keeps restarting containers from probing
+                # in lockstep
+                pause = random.uniform(0, delay)
+                if time.monotonic() + pause > deadline:
+                    raise CommandError(
+                        f"Database '{alias}' not available after "
+                        f'{attempt} attempts: {exc}'
+                    )
+                self.stdout.write(
+                    f"Database '{alias}' not available, "
+                    f'retrying in {pause:.2f}s'
+                )
+                time.sleep(pause)
+                delay = min(delay * 2, options['max_delay'])
+                attempt += 1
+
+        self.stdout.write(
+            f"Database '{alias}' available after {attempt} attempts in "
+            f'{time.monotonic() - start:.2f}s'
+        )
+
+        return attempt
+
+    def wait_in_thread(self, alias, options):
+        """Wait for a database in a worker thread with its own connection"""
+        try:
+            return self.wait_for(alias, options)
+        finally:
+            connections[alias].close()
+
+    def handle(self, *args, **options):
+        aliases = options['databases'] or list(connections)
+        self.stdout.write("Waiting for database...")
+        start = time.monotonic()
+
+        if len(aliases) == 1:
+            self.wait_for(aliases[0], options)
+        else:
+            with ThreadPoolExecutor(len(aliases)) as executor:
+                list(executor.map(
+                    lambda alias: self.wait_in_thread(alias, options),
+                    aliases
+                ))
 
-        self.stdout.write(self.style.SUCCESS("Database available"))
+        self.stdout.write(self.style.SUCCESS(
+            f'Database available in {time.monotonic() - start:.2f}s'
+        ))
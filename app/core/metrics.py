@@ -0,0 +1,146 @@
+import bisect
+import threading
+from collections import defaultdict
+
+
+# name -> (help text, bucket upper bounds) of the per view histograms
+HISTOGRAMS = {
+    'app_request_duration_seconds': (
+        'Wall time of the requests',
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    ),
+    'app_request_db_queries': (
+        'Database queries made by the requests',
+        (0, 1, 2, 3, 5, 10, 20, 50, 100, 200),
+    ),
+    'app_request_db_duration_seconds': (
+        'Time the requests spent in database queries',
+        (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+    ),
+    'app_request_serializer_duration_seconds': (
+        'Time spent building the response data, lazy queries included',
+        (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+    ),
+    'app_request_render_duration_seconds': (
+        'Time spent rendering the response data to bytes',
+        (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+    ),
+    'app_response_size_bytes': (
+        'Size of the response bodies, streamed ones excluded',
+        (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+    ),
+}
+
+
+class Histogram:
+    """Cumulative bucket counts of observed values"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        """Return (le, cumulative count) pairs, ending with +Inf"""
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            yield bound, total
+
+
+class MetricsRegistry:
+    """Thread safe per view histograms of the sampled requests
+
+    Every process aggregates its own requests, so with several server
+    workers each scrape sees the requests of the worker that answers.
+    """
+
+    def __init__(self):
+        self.histograms = defaultdict(dict)
+        self.collectors = []
+        self._lock = threading.Lock()
+
+    def observe(self, name, view, value):
+        with self._lock:
+            histograms = self.histograms[name]
+            if view not in histograms:
+                histograms[view] = Histogram(HISTOGRAMS[name][1])
+            histograms[view].observe(value)
+
+    def register_collector(self, collector):
+        """Add a function returning (name, type, help, samples) metrics
+
+        Samples are (labels, value) pairs.
+        """
+        if collector not in self.collectors:
+            self.collectors.append(collector)
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name, histograms in sorted(self.histograms.items()):
+                lines.append(f'# HELP {name} {HISTOGRAMS[name][0]}')
+                lines.append(f'# TYPE {name} histogram')
+                for view, histogram in sorted(histograms.items()):
+                    for bound, count in histogram.samples():
+                        labels = format_labels({'view': view, 'le': bound})
+                        lines.append(f'{name}_bucket{labels} {count}')
+                    labels = format_labels({'view': view})
+                    lines.append(f'{name}_sum{labels} {histogram.sum}')
+                    lines.append(f'{name}_count{labels} {histogram.count}')
+
+        for collector in self.collectors:
+            for name, kind, help_text, samples in collector():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in samples:
+                    lines.append(f'{name}{format_labels(labels)} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+    """Format a label set, escaped as the exposition format requires"""
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(
+            key,
+            str(value).replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n')
+        )
+        for key, value in labels.items()
+    )
+
+    return '{' + pairs + '}'
+
+
+def view_label(view_func, method):
+    """Name a view after its class and action, e.g. RecipeViewSet.list
+
+    Views that are not viewsets are named after the handler method.
+    """
+    view_class = getattr(view_func, 'cls', None) or getattr(
+        view_func, 'view_class', None
+    )
+    if view_class is None:
+        return f'{view_func.__module__}.{view_func.__qualname__}'
+
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(method.lower(), method.lower())
+
+    return f'{view_class.__name__}.{action}'
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,146 @@
+import random
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+from core.metrics import registry, view_label
+
+
+class QueryTimer:
+    """Execute wrapper counting the queries of a request and their time"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class RequestMetrics:
+    """Timings collected while a sampled request is handled"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.view = 'unresolved'
+        self.queries = QueryTimer()
+        self.serializer_duration = 0.0
+        self.render_start = None
+        self.render_duration = 0.0
+
+    def rendered(self, response):
+        self.render_duration = time.perf_counter() - self.render_start
+
+
+@contextmanager
+def timed_serialization(request):
+    """Add the time spent in the block to the request's serializer time
+
+    Does nothing for requests that are not sampled or without request.
+    """
+    metrics = getattr(request, '_performance_metrics', None)
+    if metrics is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serializer_duration += time.perf_counter() - start
+
+
+class PerformanceMiddleware:
+    """Record per view timings of a sample of the requests
+
+    Sampled requests are timed as a whole, their database queries are
+    counted and timed, and the time spent building the response data in
+    serializers, rendering it to bytes and its size are recorded in the
+    metrics registry under the view's name. Requests that are not
+    sampled only cost a random number.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def is_sampled(self):
+        config = settings.PERFORMANCE_METRICS
+        rate = config['SAMPLE_RATE'] if config['ENABLED'] else 0
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    def __call__(self, request):
+        if not self.is_sampled():
+            return self.get_response(request)
+
+        metrics = request._performance_metrics = RequestMetrics()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(metrics.queries)
+                )
+            response = self.get_response(request)
+        duration = time.perf_counter() - metrics.start
+
+        self.record(metrics, response, duration)
+        if settings.PERFORMANCE_METRICS['SERVER_TIMING']:
+            response['Server-Timing'] = server_timing(metrics, duration)
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = getattr(request, '_performance_metrics', None)
+        if metrics is not None:
+            metrics.view = view_label(view_func, request.method)
+
+    def process_template_response(self, request, response):
+        """Time the rendering, which happens after the view returned"""
+        metrics = getattr(request, '_performance_metrics', None)
+        if metrics is not None:
+            metrics.render_start = time.perf_counter()
+            response.add_post_render_callback(metrics.rendered)
+
+        return response
+
+    def record(self, metrics, response, duration):
+        view = metrics.view
+        registry.observe('app_request_duration_seconds', view, duration)
+        registry.observe('app_request_db_queries', view, metrics.queries.count)
+        registry.observe(
+            'app_request_db_duration_seconds',
+            view,
+            metrics.queries.duration
+        )
+        registry.observe(
+            'app_request_serializer_duration_seconds',
+            view,
+            metrics.serializer_duration
+        )
+        registry.observe(
+            'app_request_render_duration_seconds',
+            view,
+            metrics.render_duration
+        )
+        if not response.streaming:
+            registry.observe(
+                'app_response_size_bytes',
+                view,
+                len(response.content)
+            )
+
+
+def server_timing(metrics, duration):
+    """Format the request's timings as a Server-Timing header"""
+    return ', '.join((
+        f'db;dur={metrics.queries.duration * 1000:.1f};'
+        f'desc="{metrics.queries.count} queries"',
+        f'serialize;dur={metrics.serializer_duration * 1000:.1f}',
+        f'render;dur={metrics.render_duration * 1000:.1f}',
+        f'total;dur={duration * 1000:.1f}',
+    ))
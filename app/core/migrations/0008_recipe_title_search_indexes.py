@@ -0,0 +1,39 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+SEARCH_INDEX = (
+    "CREATE INDEX core_recipe_title_search_idx ON core_recipe "
+    "USING gin (to_tsvector('english'::regconfig, COALESCE(title, '')))"
+)
+TRIGRAM_INDEX = (
+    "CREATE INDEX core_recipe_title_trgm_idx ON core_recipe "
+    "USING gin (UPPER(title::text) gin_trgm_ops)"
+)
+
+
+def create_indexes(apps, schema_editor):
+    """Create the title search indexes, they only exist on Postgres"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(SEARCH_INDEX)
+    schema_editor.execute(TRIGRAM_INDEX)
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS core_recipe_title_search_idx')
+    schema_editor.execute('DROP INDEX IF EXISTS core_recipe_title_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_recipe_pagination_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 3.0.14 on 2026-10-17 23:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def record_existing_objects(apps, schema_editor):
+    """Record existing objects as the first change of their owners"""
+    Change = apps.get_model('core', 'Change')
+    SyncState = apps.get_model('core', 'SyncState')
+
+    users = set()
+    for model in ('Recipe', 'Tag', 'Ingredient'):
+        rows = apps.get_model('core', model).objects.values_list(
+            'id', 'user_id'
+        )
+        Change.objects.bulk_create(
+            (
+                Change(
+                    user_id=user_id,
+                    model=model.lower(),
+                    object_id=object_id,
+                    sequence=1
+                )
+                for object_id, user_id in rows.iterator()
+            ),
+            batch_size=1000
+        )
+        users.update(rows.values_list('user_id', flat=True).distinct())
+
+    SyncState.objects.bulk_create(
+        [SyncState(user_id=user_id, sequence=1) for user_id in users],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncState',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('sequence', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=20)),
+                ('object_id', models.IntegerField()),
+                ('sequence', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(fields=['user', 'sequence'], name='core_change_user_id_d0f23d_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='change',
+            unique_together={('model', 'object_id')},
+        ),
+        migrations.RunPython(
+            record_existing_objects,
+            migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,106 @@
+from django.db import migrations
+from django.db.models import Count, F, Min
+from django.db.models.functions import Lower
+
+
+# model, recipe field and name of the unique index
+ATTR_MODELS = (
+    ('Tag', 'tags', 'core_tag_user_lower_name_uniq'),
+    ('Ingredient', 'ingredients', 'core_ingredient_user_lower_name_uniq'),
+)
+
+
+def record_changes(apps, user_id, model_name, ids, deleted=False):
+    """Record merged objects in the change log of their owner"""
+    Change = apps.get_model('core', 'Change')
+    SyncState = apps.get_model('core', 'SyncState')
+
+    state, _ = SyncState.objects.get_or_create(user_id=user_id)
+    SyncState.objects.filter(pk=state.pk).update(sequence=F('sequence') + 1)
+    sequence = state.sequence + 1
+
+    changes = Change.objects.filter(model=model_name, object_id__in=ids)
+    changes.update(sequence=sequence, deleted=deleted)
+    existing = set(changes.values_list('object_id', flat=True))
+    Change.objects.bulk_create([
+        Change(
+            user_id=user_id,
+            model=model_name,
+            object_id=object_id,
+            sequence=sequence,
+            deleted=deleted
+        )
+        for object_id in set(ids) - existing
+    ])
+
+
+def merge_duplicates(apps, schema_editor):
+    """Merge objects of a user whose names only differ in case
+
+    The oldest object is kept and the recipes linked to the others are
+    linked to it instead.
+    """
+    Recipe = apps.get_model('core', 'Recipe')
+    for model_name, field_name, _ in ATTR_MODELS:
+        model = apps.get_model('core', model_name)
+        field = Recipe._meta.get_field(field_name)
+        through = field.remote_field.through
+        source = f'{field.m2m_field_name()}_id'
+        target = f'{field.m2m_reverse_field_name()}_id'
+
+        objects = model.objects.annotate(key=Lower('name'))
+        groups = objects.values('user_id', 'key').annotate(
+            keep=Min('id'),
+            count=Count('id')
+        ).filter(count__gt=1)
+        for group in groups:
+            duplicates = list(objects.filter(
+                user_id=group['user_id'],
+                key=group['key']
+            ).exclude(id=group['keep']).values_list('id', flat=True))
+
+            rows = through.objects.filter(**{f'{target}__in': duplicates})
+            recipe_ids = set(rows.values_list(source, flat=True))
+            linked = set(through.objects.filter(**{
+                target: group['keep']
+            }).values_list(source, flat=True))
+            through.objects.bulk_create([
+                through(**{source: recipe_id, target: group['keep']})
+                for recipe_id in recipe_ids - linked
+            ])
+            rows.delete()
+            model.objects.filter(id__in=duplicates).delete()
+
+            record_changes(
+                apps, group['user_id'], model_name.lower(), duplicates,
+                deleted=True
+            )
+            if recipe_ids:
+                record_changes(apps, group['user_id'], 'recipe', recipe_ids)
+
+
+def create_indexes(apps, schema_editor):
+    """Create the unique indexes, expression indexes work on any backend"""
+    for model_name, _, index_name in ATTR_MODELS:
+        table = apps.get_model('core', model_name)._meta.db_table
+        schema_editor.execute(
+            f'CREATE UNIQUE INDEX {index_name} ON {table} '
+            f'(user_id, lower(name))'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    for _, _, index_name in ATTR_MODELS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {index_name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_sync_changes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+
+# through table, index name and columns in the order they are looked up
+REVERSE_INDEXES = (
+    ('core_recipe_tags', 'core_recipe_tags_tag_recipe_idx',
+     ('tag_id', 'recipe_id')),
+    ('core_recipe_ingredients', 'core_recipe_ingr_ingredient_recipe_idx',
+     ('ingredient_id', 'recipe_id')),
+)
+
+
+def create_indexes(apps, schema_editor):
+    """Index the through tables from the tag and ingredient side
+
+    Filtering recipes by tag or ingredient and listing the assigned ones
+    then reads the recipe ids from the index alone, the default index
+    only covers the tag or ingredient column.
+    """
+    for table, index_name, columns in REVERSE_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX {index_name} ON {table} ({", ".join(columns)})'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    for _, index_name, _ in REVERSE_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {index_name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_unique_attr_names'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 3.0.14 on 2026-10-17 23:33
+
+import core.models
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+from datetime import timedelta
+
+from django.utils import timezone
+
+
+def copy_legacy_tokens(apps, schema_editor):
+    """Keep the DRF tokens working until a refresh key would expire
+
+    Their clients never received the refresh key, so the tokens get the
+    long refresh TTL instead of the access TTL and clients log in again
+    once it ran out.
+    """
+    Token = apps.get_model('authtoken', 'Token')
+    AuthToken = apps.get_model('core', 'AuthToken')
+
+    expires_at = timezone.now() + timedelta(
+        seconds=settings.AUTH_TOKEN['REFRESH_TTL']
+    )
+    AuthToken.objects.bulk_create(
+        (
+            AuthToken(
+                key=token.key,
+                refresh_key=core.models.generate_token_key(),
+                user_id=token.user_id,
+                family=uuid.uuid4(),
+                expires_at=expires_at,
+                refresh_expires_at=expires_at
+            )
+            for token in Token.objects.iterator()
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authtoken', '0002_auto_20160226_1747'),
+        ('core', '0014_recipe_relation_reverse_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedToken',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=40)),
+                ('refresh_key', models.CharField(db_index=True, max_length=40)),
+                ('family', models.UUIDField()),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AuthToken',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(default=core.models.generate_token_key, max_length=40, unique=True)),
+                ('refresh_key', models.CharField(default=core.models.generate_token_key, max_length=40, unique=True)),
+                ('family', models.UUIDField(db_index=True, default=uuid.uuid4)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+                ('refresh_expires_at', models.DateTimeField(db_index=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='auth_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(
+            copy_legacy_tokens,
+            migrations.RunPython.noop
+        ),
+    ]
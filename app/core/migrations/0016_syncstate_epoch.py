@@ -0,0 +1,32 @@
+# Generated by Django 3.0.14 on 2026-10-17 23:48
+
+from django.db import migrations, models
+import uuid
+
+
+def generate_epochs(apps, schema_editor):
+    """Give every existing counter its own epoch"""
+    SyncState = apps.get_model('core', 'SyncState')
+    for pk in SyncState.objects.values_list('pk', flat=True).iterator():
+        SyncState.objects.filter(pk=pk).update(epoch=uuid.uuid4())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_auth_tokens'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncstate',
+            name='epoch',
+            field=models.UUIDField(null=True),
+        ),
+        migrations.RunPython(generate_epochs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='syncstate',
+            name='epoch',
+            field=models.UUIDField(default=uuid.uuid4),
+        ),
+    ]
@@ -2,9 +2,14 @@ from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
                                         PermissionsMixin
 from django.conf import settings
+from django.utils import timezone
+from datetime import timedelta
+import secrets
 import uuid
 import os
 
+from core.hashers import hashing_slot
+
 
 def recipe_image_file_path(instance, filename):
     """generate file path for a new recipe image"""
@@ -14,6 +19,18 @@ def recipe_image_file_path(instance, filename):
     return os.path.join('uploads/recipe/', filename)
 
 
+def recipe_image_blob_path(digest, ext):
+    """generate the content addressed path of a recipe image
+
+    Files are sharded into two levels of subdirectories by their hash so
+    that no single directory grows too large. The extension is the one
+    of the detected image format, never the client's file name.
+    """
+    return os.path.join(
+        'uploads/recipe/', digest[:2], digest[2:4], f'{digest}.{ext}'
+    )
+
+
 class UserManager(BaseUserManager):
     """extends default create_user that takes email instead of username"""
     def create_user(self, email, password=None, **extra_fields):
@@ -22,7 +39,8 @@ class UserManager(BaseUserManager):
             raise ValueError('User must have an email address')
 
         user = self.model(email=self.normalize_email(email), **extra_fields)
-        user.set_password(password)
+        with hashing_slot():
+            user.set_password(password)
         user.save(using=self._db)
 
         return user
@@ -51,35 +69,65 @@ class User(AbstractBaseUser, PermissionsMixin):
 
 
 class Tag(models.Model):
-    """Tag that will be used for recipe"""
+    """Tag that will be used for recipe
+
+    Names are unique per user ignoring case, the unique index on
+    (user_id, lower(name)) is created by migration 0013.
+    """
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-name', 'id']),
+        ]
 
     def __str__(self):
         return self.name
 
 
 class Ingredient(models.Model):
-    """ingredients to be used in a recipe"""
+    """ingredients to be used in a recipe
+
+    Names are unique per user ignoring case like the tag names.
+    """
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    updated_at = models.DateTimeField(auto_now=True)
     # recipe = models.ForeignKey(
     #     Tag,
     #     on_delete=models.CASCADE
     # )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-name', 'id']),
+        ]
+
     def __str__(self):
         return self.name
 
 
 class Recipe(models.Model):
     """recipe object """
+    IMAGE_PENDING = 'pending'
+    IMAGE_PROCESSING = 'processing'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUS_CHOICES = (
+        (IMAGE_PENDING, 'Pending'),
+        (IMAGE_PROCESSING, 'Processing'),
+        (IMAGE_READY, 'Ready'),
+        (IMAGE_FAILED, 'Failed'),
+    )
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE)
@@ -90,6 +138,165 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image_status = models.CharField(
+        max_length=20,
+        choices=IMAGE_STATUS_CHOICES,
+        blank=True
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id']),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class RecipeImageRendition(models.Model):
+    """resized copy of a recipe image generated in the background"""
+    recipe = models.ForeignKey(
+        'Recipe',
+        on_delete=models.CASCADE,
+        related_name='image_renditions'
+    )
+    name = models.CharField(max_length=50)
+    format = models.CharField(max_length=10)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    file = models.FileField(max_length=255)
+
+    def __str__(self):
+        return f'{self.recipe} {self.name} {self.format}'
+
+
+class ImageBlob(models.Model):
+    """content addressed image file shared by every recipe using it"""
+    digest = models.CharField(max_length=64, primary_key=True)
+    name = models.CharField(max_length=255, unique=True)
+    ref_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.name
+
+
+class ImageUploadSession(models.Model):
+    """resumable upload of a recipe image sent in several chunks"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+    recipe = models.ForeignKey(
+        'Recipe',
+        on_delete=models.CASCADE,
+        related_name='image_uploads'
+    )
+    filename = models.CharField(max_length=255)
+    size = models.PositiveIntegerField(null=True)
+    offset = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.recipe} {self.filename}'
+
+
+class SyncState(models.Model):
+    """per user counter ordering the changes of the user's objects"""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True
+    )
+    sequence = models.BigIntegerField(default=0)
+    # new for every counter, so the versions of a recreated one differ
+    epoch = models.UUIDField(default=uuid.uuid4)
+
+    def __str__(self):
+        return f'{self.user} {self.sequence}'
+
+
+class Change(models.Model):
+    """latest change of a synced object, a tombstone once it's deleted"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE
+    )
+    model = models.CharField(max_length=20)
+    object_id = models.IntegerField()
+    sequence = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = ('model', 'object_id')
+        indexes = [
+            models.Index(fields=['user', 'sequence']),
+        ]
+
+    def __str__(self):
+        return f'{self.model} {self.object_id} {self.sequence}'
+
+
+def generate_token_key():
+    """generate a random 40 character token key like DRF's tokens"""
+    return secrets.token_hex(20)
+
+
+class AuthTokenManager(models.Manager):
+    """creates tokens with the lifetimes configured in AUTH_TOKEN"""
+
+    def issue(self, user, family=None):
+        """Creates and returns a new token of the user
+
+        Rotated tokens keep the family of the token they replace.
+        """
+        now = timezone.now()
+
+        return self.create(
+            user=user,
+            family=family or uuid.uuid4(),
+            expires_at=now + timedelta(seconds=settings.AUTH_TOKEN['TTL']),
+            refresh_expires_at=now + timedelta(
+                seconds=settings.AUTH_TOKEN['REFRESH_TTL']
+            )
+        )
+
+
+class AuthToken(models.Model):
+    """expiring API token, rotated with its single use refresh key"""
+    key = models.CharField(
+        max_length=40,
+        unique=True,
+        default=generate_token_key
+    )
+    refresh_key = models.CharField(
+        max_length=40,
+        unique=True,
+        default=generate_token_key
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='auth_tokens'
+    )
+    family = models.UUIDField(default=uuid.uuid4, db_index=True)
+    created = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    refresh_expires_at = models.DateTimeField(db_index=True)
+
+    objects = AuthTokenManager()
+
+    def __str__(self):
+        return f'{self.user} {self.expires_at}'
+
+
+class RevokedToken(models.Model):
+    """keys of a revoked token, kept until its refresh key would expire
+
+    The ids order the revocations, so every process can load the ones
+    it has not seen yet into its revocation filter.
+    """
+    key = models.CharField(max_length=40)
+    refresh_key = models.CharField(max_length=40, db_index=True)
+    family = models.UUIDField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.key
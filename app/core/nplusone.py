@@ -0,0 +1,165 @@
+import logging
+import os
+import re
+import sys
+from collections import defaultdict, namedtuple
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+from rest_framework.serializers import Serializer
+
+
+logger = logging.getLogger(__name__)
+
+STRING = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDERS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+WHITESPACE = re.compile(r'\s+')
+RELATED_DESCRIPTORS = os.path.join('fields', 'related_descriptors.py')
+
+Issue = namedtuple('Issue', ('fingerprint', 'count', 'field', 'location',
+                             'sql'))
+
+
+class NPlusOneError(AssertionError):
+    """Raised when a request repeats a query shape too often"""
+
+
+def fingerprint(sql):
+    """Return the shape of a query, with its literal values removed
+
+    Lists of values become a single placeholder, so loading relations of
+    one object at a time and in batches of different size don't mix.
+    """
+    sql = STRING.sub('?', sql)
+    sql = NUMBER.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = PLACEHOLDERS.sub('(...)', sql)
+
+    return WHITESPACE.sub(' ', sql).strip()
+
+
+def is_app_code(frame):
+    """Whether a frame runs this project's code, not a library"""
+    filename = frame.f_code.co_filename
+    # execute wrappers like this module's only pass the query on
+    is_wrapper = 'execute' in frame.f_locals and 'context' in frame.f_locals
+
+    return (
+        filename.startswith(settings.BASE_DIR) and
+        'site-packages' not in filename and
+        not is_wrapper
+    )
+
+
+def query_origin():
+    """Return where a query loading a relation lazily comes from
+
+    Returns the serializer field, e.g. RecipeSerializer.tags when a
+    serializer reads a relation that was not prefetched, and the
+    innermost frame of the project's code, or None for queries that
+    don't load a relation.
+    """
+    field = None
+    location = None
+    lazy = False
+    frame = sys._getframe(2)
+    while frame is not None:
+        code = frame.f_code
+        if code.co_filename.endswith(RELATED_DESCRIPTORS):
+            lazy = True
+        if field is None and code.co_name == 'to_representation':
+            serializer = frame.f_locals.get('self')
+            current = frame.f_locals.get('field')
+            if isinstance(serializer, Serializer) and current is not None:
+                field = f'{type(serializer).__name__}.{current.field_name}'
+        if location is None and is_app_code(frame):
+            location = f'{code.co_filename}:{frame.f_lineno} in {code.co_name}'
+        frame = frame.f_back
+
+    if not lazy and field is None:
+        return None
+
+    return field, location
+
+
+class QueryRecorder:
+    """Execute wrapper grouping the lazy relation queries by their shape"""
+
+    def __init__(self):
+        self.queries = defaultdict(list)
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.lstrip()[:6].upper() == 'SELECT':
+            origin = query_origin()
+            if origin is not None:
+                self.queries[fingerprint(sql)].append((sql, origin))
+
+        return execute(sql, params, many, context)
+
+    def issues(self, threshold):
+        """Return the query shapes made at least threshold times"""
+        issues = []
+        for shape, queries in self.queries.items():
+            if len(queries) < threshold:
+                continue
+            sql, (field, location) = queries[-1]
+            issues.append(Issue(shape, len(queries), field, location, sql))
+
+        return issues
+
+
+def format_issues(issues):
+    lines = []
+    for issue in issues:
+        lines.append(
+            f'{issue.count} queries of the same shape'
+            f"{f' from {issue.field}' if issue.field else ''}"
+            f"{f' at {issue.location}' if issue.location else ''}:"
+        )
+        lines.append(f'    {issue.sql}')
+
+    return '\n'.join(lines)
+
+
+@contextmanager
+def detect_queries():
+    """Record the queries of all connections in the block"""
+    recorder = QueryRecorder()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield recorder
+
+
+class NPlusOneMiddleware:
+    """Report queries repeated with the same shape within a request
+
+    Such queries usually come from relations accessed lazily in a loop.
+    Enabled with NPLUSONE['ENABLED'], the issues are logged or raised as
+    NPlusOneError when NPLUSONE['RAISE'] is set.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = settings.NPLUSONE
+        if not config['ENABLED']:
+            return self.get_response(request)
+
+        with detect_queries() as recorder:
+            response = self.get_response(request)
+
+        issues = recorder.issues(config['THRESHOLD'])
+        if issues:
+            message = f'{request.method} {request.path}\n' + format_issues(
+                issues
+            )
+            if config['RAISE']:
+                raise NPlusOneError(message)
+            logger.warning('N+1 queries in %s', message)
+
+        return response
@@ -0,0 +1,49 @@
+import codecs
+
+from django.conf import settings
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+from core.renderers import FastJSONRenderer, NDJSONRenderer, loads
+
+
+class FastJSONParser(JSONParser):
+    """Parses JSON with orjson when it is installed"""
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return loads(stream.read())
+        except ValueError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+class NDJSONParser(BaseParser):
+    """Parses newline delimited JSON into a list of items"""
+    media_type = 'application/x-ndjson'
+    renderer_class = NDJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Decode the stream one line at a time"""
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+
+        items = []
+        for number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                items.append(loads(line.decode(encoding)))
+            except ValueError as exc:
+                raise ParseError(
+                    f'NDJSON parse error on line {number} - {exc}'
+                )
+
+        return items
@@ -0,0 +1,205 @@
+import csv
+import itertools
+import json
+import re
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+ORJSON_OPTIONS = 0
+if orjson is not None:
+    # Hand datetimes and non string keys to the same conversions as DRF's
+    # encoder, so both encoders produce the same bytes
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+_encoder = encoders.JSONEncoder()
+
+LINE_SEPARATOR = '\u2028'
+PARAGRAPH_SEPARATOR = '\u2029'
+
+
+def dumps(data):
+    """Encode data as compact UTF-8 JSON, with orjson when installed
+
+    Decimals become numbers like with DRF's encoder, the serializers
+    already render prices as strings.
+    """
+    if orjson is not None:
+        try:
+            content = orjson.dumps(
+                data,
+                default=_encoder.default,
+                option=ORJSON_OPTIONS
+            )
+        except (orjson.JSONEncodeError, TypeError):
+            # e.g. integers beyond 64 bits, which the stdlib handles
+            pass
+        else:
+            # Keep the output a strict javascript subset like DRF does
+            return content.replace(
+                LINE_SEPARATOR.encode(), b'\\u2028'
+            ).replace(
+                PARAGRAPH_SEPARATOR.encode(), b'\\u2029'
+            )
+
+    content = json.dumps(
+        data,
+        cls=encoders.JSONEncoder,
+        ensure_ascii=False,
+        separators=(',', ':')
+    )
+
+    return content.replace(
+        LINE_SEPARATOR, '\\u2028'
+    ).replace(
+        PARAGRAPH_SEPARATOR, '\\u2029'
+    ).encode()
+
+
+def loads(content):
+    """Decode JSON text or UTF-8 bytes, with orjson when installed"""
+    if orjson is not None:
+        return orjson.loads(content)
+    if isinstance(content, bytes):
+        content = content.decode()
+
+    return json.loads(content, parse_constant=_reject_constant)
+
+
+def _reject_constant(value):
+    raise ValueError(f'{value} is not valid JSON')
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSON renderer using orjson for compact output
+
+    Indented output, e.g. for the browsable API, and the ASCII only or
+    spaced variants of the settings fall back to the stdlib encoder.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        return dumps(data)
+
+
+class NDJSONRenderer(JSONRenderer):
+    """Renders lists as newline delimited JSON, one item per line
+
+    Paginated lists render their results, the next page is linked in a
+    Link header.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        if isinstance(data, dict) and 'results' in data:
+            response = renderer_context.get('response')
+            if data.get('next') and response is not None:
+                response['Link'] = f'<{data["next"]}>; rel="next"'
+            data = data['results']
+        if not isinstance(data, list):
+            data = [data]
+
+        return b''.join(ndjson_lines(data))
+
+
+def ndjson_lines(items):
+    """Yield every item encoded as one line of NDJSON"""
+    for item in items:
+        yield dumps(item) + b'\n'
+
+
+class CSVRenderer(BaseRenderer):
+    """Renders a list of flat dicts, or a single one, as CSV with a header
+
+    Values that are lists or dicts are written as JSON.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict) and 'results' in data:
+            data = data['results']
+        if not isinstance(data, list):
+            data = [data]
+
+        return b''.join(csv_lines(data))
+
+
+class Echo:
+    """File like object handing back what csv.writer writes"""
+
+    def write(self, value):
+        return value
+
+
+# Spreadsheet applications evaluate cells starting like a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+NUMBER = re.compile(r'^[-+]?\d+(\.\d+)?$')
+
+
+def is_escaped_formula(value):
+    """Whether a string needs the quote guarding against formulas"""
+    return (
+        value.lstrip("'").startswith(FORMULA_PREFIXES) and
+        not NUMBER.match(value)
+    )
+
+
+def csv_cell(value):
+    """Return a value as written to a CSV cell
+
+    Strings a spreadsheet would run as a formula are prefixed with a
+    quote, which it shows as text instead, csv_value() removes it.
+    """
+    if isinstance(value, (list, dict)):
+        return dumps(value).decode()
+    if isinstance(value, str) and is_escaped_formula(value):
+        return f"'{value}"
+
+    return value
+
+
+def csv_value(cell):
+    """Return the value written to a CSV cell by csv_cell()"""
+    if cell.startswith("'") and is_escaped_formula(cell[1:]):
+        return cell[1:]
+
+    return cell
+
+
+def csv_lines(rows, fieldnames=None):
+    """Yield the header and then every row encoded as a CSV line"""
+    rows = iter(rows)
+    if fieldnames is None:
+        first = next(rows, None)
+        if first is None:
+            return
+        fieldnames = list(first)
+        rows = itertools.chain([first], rows)
+
+    writer = csv.writer(Echo())
+    yield writer.writerow(fieldnames).encode()
+    for row in rows:
+        yield writer.writerow(
+            [csv_cell(row.get(name)) for name in fieldnames]
+        ).encode()
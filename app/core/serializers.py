@@ -0,0 +1,14 @@
+from core.middleware import timed_serialization
+
+
+class TimedSerializerMixin:
+    """Count the time spent building .data in the request's metrics
+
+    Nested and child serializers are rendered with to_representation,
+    so only the outermost serializer of a response is timed.
+    """
+
+    @property
+    def data(self):
+        with timed_serialization(self.context.get('request')):
+            return super().data
@@ -1,23 +1,91 @@
+from io import StringIO
 from unittest.mock import patch
 
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
 from django.test import TestCase
 
 
+CHECK_DATABASE = 'core.management.commands.wait_for_db.Command.check_database'
+
+
 class CommandTest(TestCase):
 
     def test_wait_for_db_ready(self):
         """Test waiting for db when database is available"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 1)
+        out = StringIO()
+        call_command('wait_for_db', stdout=out)
+
+        self.assertIn(
+            "Database 'default' available after 1 attempts",
+            out.getvalue()
+        )
 
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
         """Test waiting for database"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError]*5 + [True]
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 6)
+        with patch(CHECK_DATABASE) as cd:
+            cd.side_effect = [OperationalError]*5 + [None]
+            call_command('wait_for_db', stdout=StringIO())
+
+        self.assertEqual(cd.call_count, 6)
+        self.assertEqual(ts.call_count, 5)
+        # the pauses are jittered below exponentially growing delays
+        for call, delay in zip(ts.call_args_list, (0.1, 0.2, 0.4, 0.8, 1.6)):
+            self.assertLessEqual(call[0][0], delay)
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_timeout(self, ts):
+        """Test giving up once the timeout runs out"""
+        with patch(CHECK_DATABASE, side_effect=OperationalError('down')):
+            with self.assertRaisesMessage(CommandError, 'down'):
+                call_command(
+                    'wait_for_db', '--timeout', '0', stdout=StringIO()
+                )
+
+        ts.assert_not_called()
+
+    def test_wait_for_all_databases(self):
+        """Test every configured database is probed by default"""
+        with patch(CHECK_DATABASE) as cd:
+            call_command('wait_for_db', stdout=StringIO())
+
+        cd.assert_called_once_with('default')
+
+    @patch('os.execv')
+    @patch('importlib.util.find_spec', return_value=True)
+    def test_serve_runs_gunicorn(self, fs, execv):
+        """Test serving execs gunicorn with the worker settings"""
+        call_command(
+            'serve', '--workers', '3', '--threads', '4', stdout=StringIO()
+        )
+
+        args = execv.call_args[0][1]
+        self.assertEqual(args[1:3], ['-m', 'gunicorn'])
+        self.assertIn('gthread', args)
+        self.assertEqual(args[args.index('--workers') + 1], '3')
+        self.assertIn('--preload', args)
+        self.assertEqual(args[-1], 'app.wsgi:application')
+
+    @patch('os.execv')
+    @patch(
+        'importlib.util.find_spec',
+        side_effect=lambda name: None if name == 'uvicorn' else True
+    )
+    def test_serve_asgi_requires_uvicorn(self, fs, execv):
+        """Test serving with ASGI fails without uvicorn installed"""
+        with self.assertRaisesMessage(CommandError, 'uvicorn'):
+            call_command('serve', '--asgi', stdout=StringIO())
+
+        execv.assert_not_called()
+
+    @patch('os.execv')
+    @patch('importlib.util.find_spec', return_value=True)
+    def test_serve_reload(self, fs, execv):
+        """Test reloading serves without preloading the app"""
+        call_command('serve', '--reload', stdout=StringIO())
+
+        args = execv.call_args[0][1]
+        self.assertIn('--reload', args)
+        self.assertNotIn('--preload', args)
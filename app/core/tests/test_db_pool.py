@@ -0,0 +1,131 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from core.db import stats
+from core.db.backends.postgresql.base import DatabaseWrapper
+from core.db.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTest(SimpleTestCase):
+
+    def test_reuses_released_connections(self):
+        """Test a released connection is handed out again"""
+        pool = ConnectionPool(FakeConnection, max_size=2)
+        connection = pool.acquire()
+        pool.release(connection)
+
+        self.assertIs(pool.acquire(), connection)
+        self.assertEqual(pool.stats()['connects'], 1)
+
+    def test_utilization_stats(self):
+        """Test the pool reports connections in use and idle"""
+        pool = ConnectionPool(FakeConnection, max_size=3)
+        first = pool.acquire()
+        pool.acquire()
+        pool.release(first)
+
+        stats = pool.stats()
+        self.assertEqual(stats['size'], 2)
+        self.assertEqual(stats['in_use'], 1)
+        self.assertEqual(stats['idle'], 1)
+
+    def test_timeout_when_exhausted(self):
+        """Test acquiring fails once every connection stays in use"""
+        pool = ConnectionPool(FakeConnection, max_size=1, timeout=0.01)
+        pool.acquire()
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_waits_for_released_connection(self):
+        """Test a waiting thread gets the connection another releases"""
+        pool = ConnectionPool(FakeConnection, max_size=1, timeout=5)
+        connection = pool.acquire()
+        timer = threading.Timer(0.05, pool.release, [connection])
+        timer.start()
+
+        self.assertIs(pool.acquire(), connection)
+        self.assertEqual(pool.stats()['waits'], 1)
+        timer.join()
+
+    def test_replaces_unusable_connections(self):
+        """Test connections failing the health check are discarded"""
+        pool = ConnectionPool(
+            FakeConnection,
+            max_size=1,
+            check=lambda connection: False
+        )
+        connection = pool.acquire()
+        pool.release(connection)
+
+        self.assertIsNot(pool.acquire(), connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_failed_connect_frees_slot(self):
+        """Test a failing connect does not leak pool capacity"""
+        def connect():
+            raise OSError('refused')
+        pool = ConnectionPool(connect, max_size=1)
+
+        with self.assertRaises(OSError):
+            pool.acquire()
+        self.assertEqual(pool.stats()['size'], 0)
+
+
+@patch.object(DatabaseWrapper, 'init_connection_state', lambda self: None)
+@patch('core.db.backends.postgresql.base.base.Database.connect', MagicMock)
+class PooledDatabaseWrapperTest(SimpleTestCase):
+
+    def setUp(self):
+        self.settings = {
+            'ENGINE': 'core.db.backends.postgresql',
+            'NAME': 'pooled',
+            'USER': '',
+            'PASSWORD': '',
+            'HOST': '',
+            'PORT': '',
+            'OPTIONS': {},
+            'AUTOCOMMIT': True,
+            'ATOMIC_REQUESTS': False,
+            'TIME_ZONE': None,
+            'TEST': {},
+            'CONN_MAX_AGE': 60,
+            'POOL': {'MAX_SIZE': 2, 'TIMEOUT': 1},
+        }
+        self.addCleanup(stats.pools.pop, ('pooled', 'pooled'), None)
+
+    def test_more_threads_than_connections(self):
+        """Test connections return to the pool at the end of requests"""
+        errors = []
+
+        def serve_requests():
+            wrapper = DatabaseWrapper(dict(self.settings), 'pooled')
+            try:
+                for _ in range(3):
+                    wrapper.connect()
+                    wrapper.close_if_unusable_or_obsolete()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=serve_requests) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        pool = stats.pools['pooled', 'pooled']
+        self.assertLessEqual(pool.stats()['size'], 2)
@@ -0,0 +1,109 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.metrics import registry
+from core.models import Recipe
+
+
+METRICS_URL = reverse('metrics')
+RECIPE_URL = reverse('recipe:recipe-list')
+TOKEN_URL = reverse('user:token')
+
+METRICS = {
+    'ENABLED': True,
+    'SAMPLE_RATE': 1.0,
+    'SERVER_TIMING': True,
+    'TOKEN': 'secret',
+}
+
+
+@override_settings(PERFORMANCE_METRICS=METRICS)
+class PerformanceMetricsTest(TestCase):
+    """Test the request instrumentation and the metrics endpoint"""
+
+    def setUp(self):
+        registry.reset()
+        self.user = get_user_model().objects.create_user(
+            'test@vikas.com',
+            'test1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_metrics(self):
+        res = self.client.get(
+            METRICS_URL,
+            HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(res.status_code, 200)
+
+        return res.content.decode()
+
+    def test_request_recorded_per_action(self):
+        """Test requests are recorded under their view and action"""
+        res = self.client.get(RECIPE_URL)
+
+        metrics = self.get_metrics()
+        self.assertIn(
+            'app_request_duration_seconds_count{view="RecipeViewSet.list"} 1',
+            metrics
+        )
+        self.assertIn(
+            'app_response_size_bytes_bucket{view="RecipeViewSet.list",'
+            'le="+Inf"} 1',
+            metrics
+        )
+        self.assertIn('app_request_db_queries_sum', metrics)
+        self.assertIn('app_response_cache_misses', metrics)
+        self.assertIn('db;dur=', res['Server-Timing'])
+        self.assertIn('serialize;dur=', res['Server-Timing'])
+
+    @override_settings(RECIPE_FAST_READ=False)
+    def test_serializer_time_recorded(self):
+        """Test the time serializers build the response data is recorded"""
+        Recipe.objects.create(
+            user=self.user,
+            title='Soup',
+            time_in_minutes=10,
+            price=5.00
+        )
+        self.client.get(RECIPE_URL)
+
+        prefix = (
+            'app_request_serializer_duration_seconds_sum'
+            '{view="RecipeViewSet.list"} '
+        )
+        line, = [
+            line for line in self.get_metrics().splitlines()
+            if line.startswith(prefix)
+        ]
+        self.assertGreater(float(line[len(prefix):]), 0)
+
+    def test_api_view_recorded_by_method(self):
+        """Test views that are not viewsets are named by their method"""
+        self.client.post(
+            TOKEN_URL,
+            {'email': 'test@vikas.com', 'password': 'test1234'}
+        )
+
+        self.assertIn(
+            'view="CreateTokenView.post"',
+            self.get_metrics()
+        )
+
+    @override_settings(PERFORMANCE_METRICS={**METRICS, 'SAMPLE_RATE': 0})
+    def test_requests_not_sampled(self):
+        """Test nothing is recorded when sampling is off"""
+        res = self.client.get(RECIPE_URL)
+
+        self.assertNotIn('Server-Timing', res)
+        self.assertNotIn('RecipeViewSet.list', self.get_metrics())
+
+    def test_metrics_require_token(self):
+        """Test the metrics are not public"""
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 403)
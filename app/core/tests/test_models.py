@@ -81,3 +81,11 @@ class ModelTests(TestCase):
         exp_path = f'uploads/recipe/{uuid}.jpg'
 
         self.assertEqual(file_path, exp_path)
+
+    def test_recipe_blob_path_sharded_by_hash(self):
+        """test that content addressed images are sharded by their hash"""
+        digest = 'abcdef0123'
+
+        file_path = models.recipe_image_blob_path(digest, 'jpg')
+
+        self.assertEqual(file_path, f'uploads/recipe/ab/cd/{digest}.jpg')
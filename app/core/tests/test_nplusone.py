@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from core.models import Recipe, Tag
+from core.nplusone import NPlusOneError, NPlusOneMiddleware, fingerprint
+from core.tests.utils import NPlusOneTestMixin
+from recipe.serializers import RecipeSerializer
+
+
+NPLUSONE = {'ENABLED': True, 'THRESHOLD': 3, 'RAISE': True}
+
+
+class NPlusOneDetectionTest(NPlusOneTestMixin, TestCase):
+    """Test repeated lazy relation queries are detected"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@vikas.com',
+            'test1234'
+        )
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        for i in range(3):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_in_minutes=5,
+                price=1
+            )
+            recipe.tags.add(tag)
+
+    def serialize_recipes(self, request=None):
+        RecipeSerializer(Recipe.objects.all(), many=True).data
+        return HttpResponse()
+
+    def test_fingerprint_ignores_values(self):
+        """Test queries differing only in their values share a shape"""
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE a = 1 AND b = 'x''y'"),
+            fingerprint("SELECT * FROM t WHERE a = 22 AND b = 'z'")
+        )
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (1, 2, 3)'),
+            fingerprint('SELECT * FROM t WHERE id IN (%s)')
+        )
+
+    def test_lazy_relations_reported(self):
+        """Test the serializer field loading relations is reported"""
+        with self.assertRaisesMessage(
+            AssertionError,
+            'from RecipeSerializer.ingredients'
+        ):
+            with self.assertNoNPlusOne():
+                self.serialize_recipes()
+
+    def test_prefetched_relations_pass(self):
+        """Test prefetching the relations avoids the report"""
+        with self.assertNoNPlusOne():
+            RecipeSerializer(
+                Recipe.objects.prefetch_related('tags', 'ingredients'),
+                many=True
+            ).data
+
+    @override_settings(NPLUSONE=NPLUSONE)
+    def test_middleware_raises(self):
+        """Test the middleware fails requests in raise mode"""
+        middleware = NPlusOneMiddleware(self.serialize_recipes)
+
+        with self.assertRaisesMessage(NPlusOneError, 'GET /recipes/'):
+            middleware(RequestFactory().get('/recipes/'))
+
+    @override_settings(NPLUSONE={**NPLUSONE, 'RAISE': False})
+    def test_middleware_logs(self):
+        """Test the middleware logs the repeated queries"""
+        middleware = NPlusOneMiddleware(self.serialize_recipes)
+
+        with self.assertLogs('core.nplusone', 'WARNING') as logs:
+            middleware(RequestFactory().get('/recipes/'))
+
+        self.assertIn('RecipeSerializer.tags', logs.output[0])
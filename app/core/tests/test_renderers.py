@@ -0,0 +1,145 @@
+import datetime
+import io
+from collections import OrderedDict
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from core import renderers
+from core.models import Recipe
+from core.parsers import FastJSONParser, NDJSONParser
+
+
+SAMPLE_DATA = [
+    OrderedDict([('id', 1), ('price', '20.00'), ('title', 'Crème brûlée')]),
+    {'price': Decimal('12.50'), 'nested': {'list': [1, 2.5, None, True]}},
+    {'created': timezone.make_aware(datetime.datetime(2020, 1, 2, 3, 4, 5))},
+    {'day': datetime.date(2020, 1, 2), 1: 'int key'},
+    {'separators': 'line\u2028paragraph\u2029', 'big': 2 ** 70},
+]
+
+
+class FastJSONRendererTest(SimpleTestCase):
+
+    def assert_same_as_drf(self):
+        for data in SAMPLE_DATA:
+            self.assertEqual(
+                renderers.FastJSONRenderer().render(data),
+                JSONRenderer().render(data)
+            )
+
+    def test_output_matches_drf(self):
+        """Test the output is byte identical to DRF's renderer"""
+        self.assert_same_as_drf()
+
+    @patch('core.renderers.orjson', None)
+    def test_stdlib_fallback_matches_drf(self):
+        """Test the output is identical without orjson installed"""
+        self.assert_same_as_drf()
+
+    def test_indented_output(self):
+        """Test indented output is left to DRF"""
+        content = renderers.FastJSONRenderer().render(
+            {'id': 1},
+            'application/json; indent=2'
+        )
+
+        self.assertEqual(content, b'{\n  "id": 1\n}')
+
+
+class JSONParserTest(SimpleTestCase):
+
+    def test_parse(self):
+        """Test JSON bodies are decoded"""
+        data = FastJSONParser().parse(io.BytesIO('{"name": "Thé"}'.encode()))
+
+        self.assertEqual(data, {'name': 'Thé'})
+
+    def test_parse_errors(self):
+        """Test invalid JSON and non standard constants are rejected"""
+        for content in (b'{"name": ', b'{"price": NaN}'):
+            with self.assertRaises(ParseError):
+                FastJSONParser().parse(io.BytesIO(content))
+
+    def test_ndjson_round_trip(self):
+        """Test rendered NDJSON parses back into the same items"""
+        items = [{'id': 1, 'name': 'Salt'}, {'id': 2, 'name': 'Pepper'}]
+        content = renderers.NDJSONRenderer().render(items)
+
+        self.assertEqual(content.count(b'\n'), 2)
+        self.assertEqual(NDJSONParser().parse(io.BytesIO(content)), items)
+
+    @patch('core.renderers.orjson', None)
+    def test_ndjson_stdlib_fallback(self):
+        """Test NDJSON bodies are decoded without orjson installed"""
+        content = '{"name": "Thé"}\n{"name": "Salt"}\n'.encode()
+
+        self.assertEqual(
+            NDJSONParser().parse(io.BytesIO(content)),
+            [{'name': 'Thé'}, {'name': 'Salt'}]
+        )
+
+    def test_csv_cells_escape_formulas(self):
+        """Test formula cells are quoted and read back unchanged"""
+        cells = {
+            '=1+1': "'=1+1",
+            '@SUM(A1)': "'@SUM(A1)",
+            "'=quoted": "''=quoted",
+            '-5.00': '-5.00',
+            'Soup': 'Soup',
+        }
+        for value, cell in cells.items():
+            self.assertEqual(renderers.csv_cell(value), cell)
+            self.assertEqual(renderers.csv_value(cell), value)
+
+    def test_ndjson_paginated(self):
+        """Test a page renders its results and links the next page"""
+        response = Response()
+        content = renderers.NDJSONRenderer().render(
+            {'next': 'http://testserver/?cursor=a', 'results': [{'id': 1}]},
+            renderer_context={'response': response}
+        )
+
+        self.assertEqual(content, b'{"id":1}\n')
+        self.assertEqual(
+            response['Link'],
+            '<http://testserver/?cursor=a>; rel="next"'
+        )
+
+
+class RendererApiTest(TestCase):
+
+    def test_list_as_ndjson(self):
+        """Test lists can be requested as NDJSON"""
+        user = get_user_model().objects.create_user(
+            'test@vikas.com',
+            'test1234'
+        )
+        for title in ('Soup', 'Stew'):
+            Recipe.objects.create(
+                user=user,
+                title=title,
+                time_in_minutes=5,
+                price=Decimal('5.00')
+            )
+        client = APIClient()
+        client.force_authenticate(user)
+
+        res = client.get(
+            reverse('recipe:recipe-list'),
+            HTTP_ACCEPT='application/x-ndjson'
+        )
+
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = res.content.decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('"price":"5.00"', lines[0])
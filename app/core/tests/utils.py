@@ -0,0 +1,38 @@
+from contextlib import contextmanager
+
+from django.test.utils import override_settings
+
+from core.nplusone import detect_queries, format_issues
+
+
+class NPlusOneTestMixin:
+    """Fail tests whose requests repeat a query shape too often
+
+    Mix into APIClient based test cases. assertNoNPlusOne checks code
+    that runs outside of requests, like serializers used directly.
+    """
+    nplusone_threshold = 3
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._nplusone_settings = override_settings(NPLUSONE={
+            'ENABLED': True,
+            'THRESHOLD': cls.nplusone_threshold,
+            'RAISE': True,
+        })
+        cls._nplusone_settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._nplusone_settings.disable()
+        super().tearDownClass()
+
+    @contextmanager
+    def assertNoNPlusOne(self, threshold=None):
+        with detect_queries() as recorder:
+            yield
+
+        issues = recorder.issues(threshold or self.nplusone_threshold)
+        if issues:
+            self.fail(format_issues(issues))
@@ -0,0 +1,26 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from core.metrics import registry
+
+
+def metrics(request):
+    """Expose the metrics to Prometheus
+
+    Readable by staff users and by scrapers sending the METRICS_TOKEN as
+    a bearer token.
+    """
+    token = settings.PERFORMANCE_METRICS['TOKEN']
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    allowed = request.user.is_staff or (
+        token and hmac.compare_digest(authorization, f'Bearer {token}')
+    )
+    if not allowed:
+        return HttpResponseForbidden()
+
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -3,3 +3,11 @@ from django.apps import AppConfig
 
 class RecipeConfig(AppConfig):
     name = 'recipe'
+
+    def ready(self):
+        """Connect the stored image clean up signals"""
+        from recipe import signals  # noqa: F401
+        from core.metrics import registry
+        from recipe.cache import collect_metrics
+
+        registry.register_collector(collect_metrics)
@@ -0,0 +1,114 @@
+from django.conf import settings
+from django.db import transaction
+
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from core.parsers import FastJSONParser, NDJSONParser
+
+
+class BulkModelMixin:
+    """Create, update and delete many objects in one request
+
+    The bulk endpoint accepts a JSON array or an NDJSON stream, validates
+    every item before writing anything and persists all of them in a
+    single transaction.
+    """
+
+    @action(
+        methods=['POST', 'PATCH', 'DELETE'],
+        detail=False,
+        parser_classes=(FastJSONParser, NDJSONParser)
+    )
+    def bulk(self, request):
+        """Dispatch to the bulk operation for the request method"""
+        if request.method == 'POST':
+            return self.bulk_create(request)
+        elif request.method == 'PATCH':
+            return self.bulk_update(request)
+
+        return self.bulk_destroy(request)
+
+    def get_bulk_data(self, request):
+        """Return the submitted list of items"""
+        data = request.data
+        if not isinstance(data, list):
+            raise ValidationError({'detail': 'Expected a list of items'})
+        if len(data) > settings.BULK_MAX_ITEMS:
+            raise ValidationError({
+                'detail': f'At most {settings.BULK_MAX_ITEMS} items allowed'
+            })
+
+        return data
+
+    def get_bulk_ids(self, items):
+        """Return the ids of the items, which are ids or objects with one"""
+        ids = []
+        errors = []
+        for item in items:
+            value = item.get('id') if isinstance(item, dict) else item
+            try:
+                ids.append(int(value))
+                errors.append({})
+            except (TypeError, ValueError):
+                errors.append({'id': ['A valid integer is required.']})
+
+        if any(errors):
+            raise ValidationError(errors)
+
+        return ids
+
+    def bulk_create(self, request):
+        """Create every submitted item"""
+        serializer = self.get_serializer(
+            data=self.get_bulk_data(request),
+            many=True
+        )
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            self.perform_create(serializer)
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def bulk_update(self, request):
+        """Partially update every submitted item identified by its id"""
+        data = self.get_bulk_data(request)
+        ids = self.get_bulk_ids(data)
+        instances = self.get_queryset().in_bulk(ids)
+
+        errors = [
+            {} if pk in instances else {'id': ['Not found.']} for pk in ids
+        ]
+        if any(errors):
+            raise ValidationError(errors)
+
+        serializer = self.get_serializer(
+            [instances[pk] for pk in ids],
+            data=data,
+            many=True,
+            partial=True
+        )
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            self.perform_bulk_update(serializer)
+
+        return Response(serializer.data)
+
+    def perform_bulk_update(self, serializer):
+        serializer.save()
+
+    def bulk_destroy(self, request):
+        """Delete every submitted id and report which ones existed"""
+        ids = self.get_bulk_ids(self.get_bulk_data(request))
+        queryset = self.get_queryset().filter(id__in=ids)
+
+        with transaction.atomic():
+            existing = set(queryset.values_list('id', flat=True))
+            # filtered querysets may be distinct, which can't be deleted
+            queryset.model.objects.filter(pk__in=existing).delete()
+
+        return Response([
+            {'id': pk, 'deleted': pk in existing} for pk in ids
+        ])
@@ -0,0 +1,144 @@
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from rest_framework.renderers import BrowsableAPIRenderer
+
+from core.models import SyncState
+from recipe.conditional import conditional_response, make_etag
+
+
+# Headers set while rendering that are cached along with the content,
+# e.g. the Link to the next page of NDJSON lists
+CACHED_HEADERS = ('Content-Type', 'Link')
+
+
+class CacheCounters:
+    """Thread safe hit and miss counters of the response cache"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def stats(self):
+        """Return the counters and the ratio of requests served cached"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / total if total else 0.0,
+            }
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+counters = CacheCounters()
+
+
+def collect_metrics():
+    """Return the response cache counters as metrics"""
+    stats = counters.stats()
+    yield 'app_response_cache_hits', 'counter', \
+        'Responses served from the cache', [({}, stats['hits'])]
+    yield 'app_response_cache_misses', 'counter', \
+        'Responses rendered and cached', [({}, stats['misses'])]
+
+
+def get_response_cache():
+    """Return the cache configured in RESPONSE_CACHE"""
+    return caches[settings.RESPONSE_CACHE['CACHE']]
+
+
+def get_data_version(user_id):
+    """Return the version of a user's data from their change counter
+
+    Every write to the recipes, tags and ingredients of a user records a
+    change in its own transaction, so all processes see the new version
+    as soon as the write commits.
+    """
+    state = SyncState.objects.filter(user_id=user_id).values_list(
+        'epoch', 'sequence'
+    ).first()
+    if state is None:
+        return '0'
+
+    return f'{state[0].hex}.{state[1]}'
+
+
+class CachedListMixin:
+    """Serves list responses from a cache keyed by user and data version
+
+    The rendered bytes are cached, so a hit only queries the version and
+    needs no serialization. The same version yields the ETag of the list,
+    so conditional requests are answered without touching the cache.
+    """
+
+    def get_list_variant(self, request):
+        """Return what identifies the list response or None to skip"""
+        # The browsable API renders per request details like CSRF tokens
+        if isinstance(request.accepted_renderer, BrowsableAPIRenderer):
+            return None
+
+        user_id = request.user.id
+        variant = f'{request.get_full_path()}|{request.accepted_media_type}'
+        digest = hashlib.md5(variant.encode()).hexdigest()
+
+        return f'{user_id}:{get_data_version(user_id)}:{digest}'
+
+    def list(self, request, *args, **kwargs):
+        variant = self.get_list_variant(request)
+        if variant is None:
+            return super().list(request, *args, **kwargs)
+
+        etag = make_etag(variant)
+        response = conditional_response(request, etag)
+        if response is not None:
+            return response
+
+        if not settings.RESPONSE_CACHE['ENABLED']:
+            response = super().list(request, *args, **kwargs)
+            response['ETag'] = etag
+            return response
+
+        key = f'response:{variant}'
+        cache = get_response_cache()
+        cached = cache.get(key)
+        if cached is not None:
+            counters.hit()
+            content, headers = cached
+            response = HttpResponse(content)
+            for name, value in headers.items():
+                response[name] = value
+            response['X-Cache'] = 'HIT'
+            response['ETag'] = etag
+            return response
+
+        counters.miss()
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['X-Cache'] = 'MISS'
+            response['ETag'] = etag
+            response.add_post_render_callback(
+                lambda rendered: cache.set(key, (rendered.content, {
+                    name: rendered[name]
+                    for name in CACHED_HEADERS if rendered.has_header(name)
+                }))
+            )
+
+        return response
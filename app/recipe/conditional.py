@@ -0,0 +1,58 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, quote_etag
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'The resource was modified since it was fetched.'
+    default_code = 'precondition_failed'
+
+
+def make_etag(*parts):
+    """Return a strong ETag hashing the parts"""
+    value = '|'.join(str(part) for part in parts)
+
+    return quote_etag(hashlib.md5(value.encode()).hexdigest())
+
+
+def make_recipe_etag(recipe_id, updated_at, related, media_type):
+    """Return the ETag of a recipe's detail representation
+
+    related holds the (id, updated_at) of every linked tag and ingredient.
+    """
+    return make_etag(
+        recipe_id,
+        updated_at.isoformat(),
+        media_type,
+        *(f'{pk}:{changed.isoformat()}' for pk, changed in related)
+    )
+
+
+def recipe_etag(recipe, media_type):
+    """Return the ETag of a recipe with prefetched relations"""
+    related = [
+        (obj.id, obj.updated_at)
+        for name in ('ingredients', 'tags')
+        for obj in getattr(recipe, name).all()
+    ]
+
+    return make_recipe_etag(recipe.id, recipe.updated_at, related, media_type)
+
+
+def conditional_response(request, etag):
+    """Return a 304 or 412 response if the request's conditions say so"""
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        response['ETag'] = etag
+
+    return response
+
+
+def check_if_match(request, etag):
+    """Reject writes based on a stale copy of the resource"""
+    if get_conditional_response(request, etag=etag) is not None:
+        raise PreconditionFailed()
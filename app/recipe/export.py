@@ -0,0 +1,78 @@
+from collections import defaultdict
+from itertools import islice
+
+from core.models import Recipe
+from core.renderers import csv_lines, ndjson_lines
+
+from recipe.fastpath import price_to_representation
+
+
+EXPORT_FIELDS = (
+    'id', 'title', 'time_in_minutes', 'price', 'link', 'tags', 'ingredients'
+)
+
+
+def related_names(field_name, recipe_ids):
+    """Return recipe id -> names of the linked objects, ordered by id"""
+    field = Recipe._meta.get_field(field_name)
+    source = f'{field.m2m_field_name()}_id'
+    target = field.m2m_reverse_field_name()
+    links = field.remote_field.through.objects.filter(**{
+        f'{source}__in': recipe_ids
+    }).values_list(source, f'{target}__name').order_by(source, f'{target}_id')
+
+    names = defaultdict(list)
+    for recipe_id, name in links:
+        names[recipe_id].append(name)
+
+    return names
+
+
+def export_chunks(user, chunk_size):
+    """Yield the user's recipes as lists of export dicts
+
+    The recipes are read with a server-side cursor where the database
+    supports it and the tag and ingredient names are fetched once per
+    chunk, so memory use does not grow with the catalog.
+    """
+    rows = Recipe.objects.filter(user=user).order_by('id').values(
+        'id', 'title', 'time_in_minutes', 'price', 'link'
+    ).iterator(chunk_size=chunk_size)
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+
+        recipe_ids = [row['id'] for row in chunk]
+        tags = related_names('tags', recipe_ids)
+        ingredients = related_names('ingredients', recipe_ids)
+        for row in chunk:
+            row['price'] = price_to_representation(row['price'])
+            row['tags'] = tags[row['id']]
+            row['ingredients'] = ingredients[row['id']]
+
+        yield chunk
+
+
+def export_ndjson(user, chunk_size):
+    """Yield the export as NDJSON, one chunk of lines at a time"""
+    for chunk in export_chunks(user, chunk_size):
+        yield b''.join(ndjson_lines(chunk))
+
+
+def export_csv(user, chunk_size):
+    """Yield the export as CSV, one chunk of lines at a time
+
+    Tags and ingredients are written as JSON arrays of names.
+    """
+    header = True
+    for chunk in export_chunks(user, chunk_size):
+        lines = csv_lines(chunk, EXPORT_FIELDS)
+        if not header:
+            next(lines)
+        header = False
+        yield b''.join(lines)
+
+    if header:
+        yield next(csv_lines([], EXPORT_FIELDS))
@@ -0,0 +1,173 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import IntegerField, OuterRef, Subquery
+
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+
+from core.middleware import timed_serialization
+from core.models import Ingredient, Recipe, Tag
+
+from recipe.conditional import conditional_response, make_recipe_etag
+from recipe.serializers import RecipeSerializer
+
+
+RECIPE_FIELDS = ('id', 'title', 'time_in_minutes', 'price', 'link')
+RELATED_FIELDS = ('ingredients', 'tags')
+RELATED_MODELS = {'ingredients': Ingredient, 'tags': Tag}
+
+# Converts prices exactly like the serializers, with their rounding and
+# COERCE_DECIMAL_TO_STRING handling
+price_to_representation = RecipeSerializer().fields['price'].to_representation
+
+
+def related_ids_subquery(field_name):
+    """Return a subquery aggregating the ordered ids linked to a recipe"""
+    from django.contrib.postgres.aggregates import ArrayAgg
+    from django.contrib.postgres.fields import ArrayField
+
+    field = Recipe._meta.get_field(field_name)
+    source = f'{field.m2m_field_name()}_id'
+    target = f'{field.m2m_reverse_field_name()}_id'
+    links = field.remote_field.through.objects.filter(**{
+        source: OuterRef('id')
+    }).values(source).annotate(
+        ids=ArrayAgg(target, ordering=target)
+    ).values('ids')
+
+    return Subquery(links, output_field=ArrayField(IntegerField()))
+
+
+def recipe_rows(queryset):
+    """Return the recipe list columns as dicts instead of models
+
+    On Postgres the related ids are aggregated into arrays by the same
+    query, elsewhere recipe_list_data() fetches them.
+    """
+    queryset = queryset.prefetch_related(None)
+    if connection.vendor != 'postgresql':
+        return queryset.values(*RECIPE_FIELDS)
+
+    return queryset.values(*RECIPE_FIELDS, **{
+        f'{name}_ids': related_ids_subquery(name) for name in RELATED_FIELDS
+    })
+
+
+def fetch_related_ids(field_name, recipe_ids):
+    """Return recipe id -> ordered linked ids read from the through table"""
+    field = Recipe._meta.get_field(field_name)
+    source = f'{field.m2m_field_name()}_id'
+    target = f'{field.m2m_reverse_field_name()}_id'
+    links = field.remote_field.through.objects.filter(**{
+        f'{source}__in': recipe_ids
+    }).values_list(source, target).order_by(source, target)
+
+    related = defaultdict(list)
+    for recipe_id, related_id in links:
+        related[recipe_id].append(related_id)
+
+    return related
+
+
+def recipe_list_data(rows):
+    """Build the RecipeSerializer representation of recipe rows"""
+    rows = list(rows)
+    if rows and 'tags_ids' not in rows[0]:
+        recipe_ids = [row['id'] for row in rows]
+        for name in RELATED_FIELDS:
+            related = fetch_related_ids(name, recipe_ids)
+            for row in rows:
+                row[f'{name}_ids'] = related[row['id']]
+
+    return [
+        {
+            'id': row['id'],
+            'title': row['title'],
+            'ingredients': row['ingredients_ids'] or [],
+            'tags': row['tags_ids'] or [],
+            'time_in_minutes': row['time_in_minutes'],
+            'price': price_to_representation(row['price']),
+            'link': row['link'],
+        }
+        for row in rows
+    ]
+
+
+def recipe_detail_data(row):
+    """Build the RecipeDetailSerializer representation and ETag parts"""
+    related = {}
+    versions = []
+    for name in RELATED_FIELDS:
+        objects = RELATED_MODELS[name].objects.filter(
+            recipe=row['id']
+        ).values('id', 'name', 'updated_at').order_by('id')
+        related[name] = []
+        for obj in objects:
+            related[name].append({'id': obj['id'], 'name': obj['name']})
+            versions.append((obj['id'], obj['updated_at']))
+
+    data = {
+        'id': row['id'],
+        'title': row['title'],
+        'ingredients': related['ingredients'],
+        'tags': related['tags'],
+        'time_in_minutes': row['time_in_minutes'],
+        'price': price_to_representation(row['price']),
+        'link': row['link'],
+    }
+
+    return data, versions
+
+
+class FastReadMixin:
+    """Renders recipes from value rows instead of serializer instances
+
+    The output is identical to RecipeSerializer and
+    RecipeDetailSerializer, RECIPE_FAST_READ switches it off.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if not settings.RECIPE_FAST_READ:
+            return super().list(request, *args, **kwargs)
+
+        rows = recipe_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        with timed_serialization(request):
+            data = recipe_list_data(rows if page is None else page)
+        if page is None:
+            return Response(data)
+
+        return self.get_paginated_response(data)
+
+    def fast_retrieve(self, request, pk):
+        """Return the detail response of a recipe or a 304
+
+        Only the rendered columns are loaded, the object permissions are
+        checked on that partial recipe like get_object() does.
+        """
+        recipe = get_object_or_404(
+            self.filter_queryset(self.get_queryset()).prefetch_related(
+                None
+            ).only(*RECIPE_FIELDS, 'updated_at', 'user'),
+            pk=pk
+        )
+        self.check_object_permissions(request, recipe)
+        row = {field: getattr(recipe, field) for field in RECIPE_FIELDS}
+        with timed_serialization(request):
+            data, versions = recipe_detail_data(row)
+        etag = make_recipe_etag(
+            recipe.id,
+            recipe.updated_at,
+            versions,
+            request.accepted_media_type
+        )
+        response = conditional_response(request, etag)
+        if response is not None:
+            return response
+
+        response = Response(data)
+        response['ETag'] = etag
+
+        return response
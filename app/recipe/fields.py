@@ -0,0 +1,92 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, MANY_RELATION_KWARGS
+
+
+class BulkManyRelatedField(ManyRelatedField):
+    """Resolves a list of primary keys with a single query"""
+    preloaded = None
+
+    def preload(self, items):
+        """Resolve the keys of many submitted items with a single query"""
+        pks = set()
+        for item in items:
+            value = item.get(self.field_name) if isinstance(item, dict) \
+                else None
+            if isinstance(value, str) or not hasattr(value, '__iter__'):
+                continue
+            for pk in value:
+                try:
+                    pks.add(self.child_relation.to_pk(pk))
+                except serializers.ValidationError:
+                    pass
+
+        self.preloaded = self.child_relation.get_queryset().in_bulk(pks)
+
+    def get_objects(self, pks):
+        """Return a mapping of the given keys to the objects that exist"""
+        if self.preloaded is not None:
+            return {
+                pk: self.preloaded[pk] for pk in pks if pk in self.preloaded
+            }
+
+        return self.child_relation.get_queryset().in_bulk(pks)
+
+    def to_internal_value(self, data):
+        """Return the objects for all submitted primary keys, in order"""
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        pks = list(dict.fromkeys(
+            self.child_relation.to_pk(item) for item in data
+        ))
+        if not pks:
+            return []
+
+        objects = self.get_objects(pks)
+        missing = [pk for pk in pks if pk not in objects]
+        if missing:
+            message = self.child_relation.error_messages['does_not_exist']
+            raise serializers.ValidationError(
+                [message.format(pk_value=pk) for pk in missing],
+                code='does_not_exist'
+            )
+
+        return [objects[pk] for pk in pks]
+
+
+class UserPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field limited to objects owned by the requesting user"""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        """Use a many field that validates every key in one query"""
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+
+        return BulkManyRelatedField(**list_kwargs)
+
+    def get_queryset(self):
+        """Return only objects that belong to the authenticated user"""
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is not None:
+            queryset = queryset.filter(user=request.user)
+
+        return queryset
+
+    def to_pk(self, data):
+        """Convert the submitted value to a primary key without a query"""
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return self.queryset.model._meta.pk.to_python(data)
+        except (DjangoValidationError, TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
@@ -0,0 +1,102 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection
+from django.db.models import Count, Q
+
+from rest_framework.exceptions import ValidationError
+
+from core.models import Recipe
+
+
+SEARCH_CONFIG = 'english'
+
+
+def params_to_ints(params, name):
+    """Convert a comma separated list of ids to a list of integers"""
+    value = params.get(name)
+    if not value:
+        return []
+    try:
+        return [int(str_id) for str_id in value.split(',')]
+    except ValueError:
+        raise ValidationError({name: 'Expected a comma separated list of ids'})
+
+
+def param_to_number(params, name, convert):
+    """Convert a single numeric query param, None when not given"""
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return convert(value)
+    except (ValueError, InvalidOperation):
+        raise ValidationError({name: 'Expected a number'})
+
+
+def filter_related(queryset, params, field_name):
+    """Filter recipes linked to any or all of the requested ids"""
+    ids = params_to_ints(params, field_name)
+    if not ids:
+        return queryset
+
+    match = params.get(f'{field_name}_match', 'any')
+    if match not in ('any', 'all'):
+        raise ValidationError({f'{field_name}_match': 'Expected any or all'})
+
+    # Querying the through table directly avoids duplicate recipe rows
+    field = Recipe._meta.get_field(field_name)
+    source = f'{field.m2m_field_name()}_id'
+    target = f'{field.m2m_reverse_field_name()}_id'
+    links = field.remote_field.through.objects.filter(**{
+        f'{target}__in': ids
+    })
+    if match == 'all':
+        links = links.values(source).annotate(
+            matched=Count(target, distinct=True)
+        ).filter(matched=len(set(ids)))
+
+    return queryset.filter(id__in=links.values(source))
+
+
+def search_title(queryset, term):
+    """Filter recipes whose title matches the free text search term
+
+    On Postgres the full text match uses the GIN index on the title's
+    search vector and the substring match the pg_trgm index, other
+    databases fall back to a plain substring match.
+    """
+    if connection.vendor != 'postgresql':
+        return queryset.filter(title__icontains=term)
+
+    from django.contrib.postgres.search import SearchQuery, SearchVector
+
+    return queryset.annotate(
+        search=SearchVector('title', config=SEARCH_CONFIG)
+    ).filter(
+        Q(search=SearchQuery(term, config=SEARCH_CONFIG)) |
+        Q(title__icontains=term)
+    )
+
+
+def filter_recipes(queryset, params):
+    """Apply the recipe list filters given in the query params"""
+    queryset = filter_related(queryset, params, 'tags')
+    queryset = filter_related(queryset, params, 'ingredients')
+
+    ranges = (
+        ('price', Decimal),
+        ('time_in_minutes', int),
+    )
+    for field_name, convert in ranges:
+        low = param_to_number(params, f'{field_name}_min', convert)
+        high = param_to_number(params, f'{field_name}_max', convert)
+        if low is not None:
+            queryset = queryset.filter(**{f'{field_name}__gte': low})
+        if high is not None:
+            queryset = queryset.filter(**{f'{field_name}__lte': high})
+
+    term = params.get('search', '').strip()
+    if term:
+        queryset = search_title(queryset, term)
+
+    return queryset
@@ -0,0 +1,183 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps, features
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.dispatch import receiver
+from django.test.signals import setting_changed
+from django.utils.module_loading import import_string
+
+from core.models import Recipe, RecipeImageRendition
+
+
+logger = logging.getLogger(__name__)
+
+# format name -> (Pillow format, file extension), the extension also
+# names the Pillow feature that has to be available
+PILLOW_FORMATS = {
+    'jpeg': ('JPEG', 'jpg'),
+    'webp': ('WEBP', 'webp'),
+}
+
+
+class ImmediateImageQueue:
+    """Runs image jobs in the calling thread, useful in tests"""
+
+    def submit(self, func, *args):
+        func(*args)
+
+
+class ThreadPoolImageQueue:
+    """Runs image jobs on a local pool of worker threads"""
+
+    def __init__(self, workers):
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix='recipe-image'
+        )
+
+    def submit(self, func, *args):
+        self.executor.submit(self.run, func, *args)
+
+    def run(self, func, *args):
+        """Run a job with its own database connection"""
+        close_old_connections()
+        try:
+            func(*args)
+        finally:
+            close_old_connections()
+
+
+_queue = None
+
+
+def get_image_queue():
+    """Return the queue configured in RECIPE_IMAGE_QUEUE"""
+    global _queue
+    if _queue is None:
+        config = settings.RECIPE_IMAGE_QUEUE
+        queue_class = import_string(config['BACKEND'])
+        _queue = queue_class(**config.get('OPTIONS', {}))
+
+    return _queue
+
+
+@receiver(setting_changed)
+def reset_image_queue(setting, **kwargs):
+    """Rebuild the queue when the settings are overridden in tests"""
+    global _queue
+    if setting == 'RECIPE_IMAGE_QUEUE':
+        _queue = None
+
+
+def enqueue_recipe_image(recipe):
+    """Process the recipe image once the upload has been committed"""
+    transaction.on_commit(
+        lambda: get_image_queue().submit(process_recipe_image, recipe.id)
+    )
+
+
+def rendition_path(image_name, name, extension):
+    """Return the storage path of a rendition next to its original"""
+    directory, filename = os.path.split(image_name)
+    stem = os.path.splitext(filename)[0]
+
+    filename = f'{stem}_{name}.{extension}'
+
+    return os.path.join(directory, 'renditions', filename)
+
+
+def render(image, size, pillow_format):
+    """Return a resized copy of the image encoded without any metadata"""
+    rendition = image.copy()
+    rendition.info = {}
+    rendition.thumbnail((size, size), Image.LANCZOS)
+
+    buffer = io.BytesIO()
+    rendition.save(buffer, format=pillow_format, quality=85, optimize=True)
+
+    return rendition.size, buffer.getvalue()
+
+
+def process_recipe_image(recipe_id):
+    """Generate the resized renditions of a recipe's uploaded image"""
+    updated = Recipe.objects.filter(
+        id=recipe_id,
+        image_status=Recipe.IMAGE_PENDING
+    ).update(image_status=Recipe.IMAGE_PROCESSING)
+    if not updated:
+        return
+
+    recipe = Recipe.objects.get(id=recipe_id)
+    try:
+        with recipe.image.open('rb') as original:
+            image = Image.open(original)
+            # Apply the EXIF orientation before the metadata is dropped
+            image = ImageOps.exif_transpose(image).convert('RGB')
+
+        renditions = []
+        for name, size in settings.RECIPE_IMAGE_RENDITIONS.items():
+            for format_name in settings.RECIPE_IMAGE_FORMATS:
+                pillow_format, extension = PILLOW_FORMATS[format_name]
+                if not features.check(extension):
+                    continue
+                path = rendition_path(recipe.image.name, name, extension)
+
+                # Images are stored by content, so another recipe with the
+                # same image may already have this rendition
+                shared = RecipeImageRendition.objects.filter(file=path).first()
+                if shared is not None and default_storage.exists(path):
+                    width, height = shared.width, shared.height
+                else:
+                    (width, height), content = render(
+                        image, size, pillow_format
+                    )
+                    if default_storage.exists(path):
+                        default_storage.delete(path)
+                    path = default_storage.save(path, ContentFile(content))
+
+                renditions.append(RecipeImageRendition(
+                    recipe=recipe,
+                    name=name,
+                    format=format_name,
+                    width=width,
+                    height=height,
+                    file=path
+                ))
+    except Exception:
+        logger.exception('Processing image of recipe %s failed', recipe_id)
+        Recipe.objects.filter(id=recipe_id, image=recipe.image.name).update(
+            image_status=Recipe.IMAGE_FAILED
+        )
+        return
+
+    with transaction.atomic():
+        current = Recipe.objects.select_for_update().filter(
+            id=recipe_id
+        ).values_list('image', flat=True).first()
+        if current != recipe.image.name:
+            # A newer upload replaced the image while this one was processed
+            for rendition in renditions:
+                delete_unused_file(rendition.file.name)
+            return
+
+        # Insert the new rows first, the post_delete signal of the old ones
+        # then only removes files that no rendition uses any more
+        previous = list(recipe.image_renditions.values_list('id', flat=True))
+        RecipeImageRendition.objects.bulk_create(renditions)
+        RecipeImageRendition.objects.filter(id__in=previous).delete()
+        Recipe.objects.filter(id=recipe_id).update(
+            image_status=Recipe.IMAGE_READY
+        )
+
+
+def delete_unused_file(name):
+    """Delete a rendition file once no rendition refers to it"""
+    if not RecipeImageRendition.objects.filter(file=name).exists():
+        transaction.on_commit(lambda: default_storage.delete(name))
@@ -0,0 +1,178 @@
+import csv
+import json
+import os
+import threading
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+
+from core.models import Ingredient, Recipe, Tag
+from core.renderers import csv_value
+
+from recipe.names import ensure_names
+from recipe.sync import record_object_changes
+
+
+RECIPE_FIELDS = ('title', 'time_in_minutes', 'price', 'link')
+RELATED_MODELS = {'tags': Tag, 'ingredients': Ingredient}
+
+
+class RowError(Exception):
+    """Raised for a row that can't be imported, with its position"""
+
+    def __init__(self, path, line, message):
+        super().__init__(f'{path}:{line}: {message}')
+
+
+def file_format(path):
+    """Guess the format of an import file from its extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    elif extension in ('.ndjson', '.jsonl'):
+        return 'ndjson'
+
+    raise ValueError(f'Unknown import format of {path}')
+
+
+def read_ndjson(file):
+    """Yield (line number, encoded item) of an NDJSON file"""
+    for number, line in enumerate(file, start=1):
+        if line.strip():
+            yield number, line
+
+
+def read_csv(file):
+    """Yield (line number, item) of a CSV file in the export format"""
+    reader = csv.DictReader(file)
+    for item in reader:
+        yield reader.line_num, {
+            name: csv_value(value) if isinstance(value, str) else value
+            for name, value in item.items()
+        }
+
+
+def parse_item(item):
+    """Return the validated recipe attributes and related names of an item
+
+    In CSV files tags and ingredients are JSON arrays of names.
+    """
+    if isinstance(item, str):
+        item = json.loads(item)
+    if not isinstance(item, dict):
+        raise ValueError('Expected an object')
+
+    attrs = {}
+    for name in RECIPE_FIELDS:
+        field = Recipe._meta.get_field(name)
+        value = item.get(name)
+        if value is None and field.blank:
+            value = ''
+        try:
+            attrs[name] = field.clean(value, None)
+        except ValidationError as exc:
+            raise ValueError(f'{name}: {" ".join(exc.messages)}')
+
+    related = {}
+    for name in RELATED_MODELS:
+        names = item.get(name) or []
+        if isinstance(names, str):
+            names = json.loads(names)
+        if not isinstance(names, list):
+            raise ValueError(f'{name}: Expected a list of names')
+        related[name] = [str(value) for value in names]
+
+    return attrs, related
+
+
+class RecipeImporter:
+    """Imports recipes of one user in batches of bulk inserts
+
+    Tags and ingredients are matched by name ignoring case and created
+    when missing, the resolved ids are shared by all files imported in
+    parallel.
+    """
+
+    def __init__(self, user, batch_size):
+        self.user = user
+        self.batch_size = batch_size
+        self.related_ids = {name: {} for name in RELATED_MODELS}
+        self._lock = threading.Lock()
+
+    def resolve(self, field_name, names):
+        """Return name -> id of the user's objects, creating missing ones"""
+        known = self.related_ids[field_name]
+        with self._lock:
+            missing = set(names) - set(known)
+            if missing:
+                # Committed right away, later batches may link to them
+                with transaction.atomic():
+                    found = ensure_names(
+                        RELATED_MODELS[field_name],
+                        self.user,
+                        missing
+                    )
+                known.update({name: row.id for name, row in found.items()})
+
+            return {name: known[name] for name in names}
+
+    def import_batch(self, batch):
+        """Insert a batch of parsed items with their through rows"""
+        ids = {
+            name: self.resolve(
+                name,
+                {value for _, related in batch for value in related[name]}
+            )
+            for name in RELATED_MODELS
+        }
+
+        with transaction.atomic():
+            recipes = [Recipe(user=self.user, **attrs) for attrs, _ in batch]
+            if connection.features.can_return_rows_from_bulk_insert:
+                Recipe.objects.bulk_create(
+                    recipes,
+                    batch_size=self.batch_size
+                )
+                record_object_changes(recipes, created=True)
+            else:
+                # Saved one by one the post_save signal records the changes
+                for recipe in recipes:
+                    recipe.save()
+
+            for name in RELATED_MODELS:
+                field = Recipe._meta.get_field(name)
+                through = field.remote_field.through
+                source = f'{field.m2m_field_name()}_id'
+                target = f'{field.m2m_reverse_field_name()}_id'
+                through.objects.bulk_create(
+                    [
+                        through(**{source: recipe.id, target: target_id})
+                        for recipe, (_, related) in zip(recipes, batch)
+                        for target_id in dict.fromkeys(
+                            ids[name][value] for value in related[name]
+                        )
+                    ],
+                    batch_size=self.batch_size
+                )
+
+    def import_file(self, path, file_format):
+        """Stream a file into the database and return the recipe count"""
+        readers = {'csv': read_csv, 'ndjson': read_ndjson}
+        count = 0
+        batch = []
+        with open(path, newline='', encoding='utf-8') as file:
+            for number, item in readers[file_format](file):
+                try:
+                    batch.append(parse_item(item))
+                except ValueError as exc:
+                    raise RowError(path, number, exc)
+                if len(batch) >= self.batch_size:
+                    self.import_batch(batch)
+                    count += len(batch)
+                    batch = []
+
+        if batch:
+            self.import_batch(batch)
+            count += len(batch)
+
+        return count
@@ -0,0 +1,107 @@
+from collections import namedtuple
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from recipe.sync import record_changes
+
+
+# Tag and ingredient names are unique per user ignoring case, enforced by
+# the unique (user_id, lower(name)) indexes of migration 0013
+Named = namedtuple('Named', ('id', 'name', 'created'))
+
+UPSERT = (
+    'INSERT INTO {table} (user_id, name, updated_at) '
+    'SELECT %s, name, %s FROM unnest(%s::text[]) AS name '
+    'ON CONFLICT (user_id, lower(name)) '
+    # a no-op update so existing rows are returned too
+    'DO UPDATE SET name = {table}.name '
+    'RETURNING id, name, xmax = 0'
+)
+
+
+def name_key(name):
+    """Return the key names are compared by"""
+    return name.lower()
+
+
+def taken_names(model, user, names, exclude=()):
+    """Return the keys of the names the user already has"""
+    return set(
+        model.objects.filter(user=user)
+        .exclude(pk__in=exclude)
+        .annotate(key=Lower('name'))
+        .filter(key__in={name_key(name) for name in names})
+        .values_list('key', flat=True)
+    )
+
+
+def upsert_names(model, user, names):
+    """Insert the missing names in one INSERT ... ON CONFLICT on Postgres"""
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            UPSERT.format(table=table),
+            [user.id, timezone.now(), names]
+        )
+        rows = [Named(*row) for row in cursor.fetchall()]
+
+    # Bulk queries send no signals
+    created = [row.id for row in rows if row.created]
+    if created:
+        record_changes(
+            user.id,
+            model._meta.model_name,
+            created,
+            created=True
+        )
+
+    return rows
+
+
+def create_names(model, user, names):
+    """Fetch the existing names and create the others one by one"""
+    existing = {
+        name_key(obj.name): obj
+        for obj in model.objects.filter(user=user).annotate(
+            key=Lower('name')
+        ).filter(key__in=[name_key(name) for name in names])
+    }
+
+    rows = []
+    for name in names:
+        obj = existing.get(name_key(name))
+        created = obj is None
+        if created:
+            try:
+                with transaction.atomic():
+                    obj = model.objects.create(user=user, name=name)
+            except IntegrityError:
+                # Created concurrently since it was looked up
+                obj = model.objects.get(user=user, name__iexact=name)
+                created = False
+        rows.append(Named(obj.id, obj.name, created))
+
+    return rows
+
+
+def ensure_names(model, user, names):
+    """Return {name: Named} of the user's objects matching the names
+
+    Names are matched ignoring case and the missing ones are created.
+    """
+    unique = {}
+    for name in names:
+        unique.setdefault(name_key(name), name)
+    if not unique:
+        return {}
+
+    if connection.vendor == 'postgresql':
+        rows = upsert_names(model, user, list(unique.values()))
+    else:
+        rows = create_names(model, user, list(unique.values()))
+
+    by_key = {name_key(row.name): row for row in rows}
+
+    return {name: by_key[name_key(name)] for name in names}
@@ -0,0 +1,19 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class BaseCursorPagination(CursorPagination):
+    """Keyset pagination, page N costs the same as the first page"""
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class RecipeAttrCursorPagination(BaseCursorPagination):
+    """Paginates tags and ingredients on the (user, -name, id) index"""
+    ordering = ('-name', 'id')
+
+
+class RecipeCursorPagination(BaseCursorPagination):
+    """Paginates recipes on the (user, id) index"""
+    ordering = ('id', )
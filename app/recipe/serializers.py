@@ -1,32 +1,286 @@
+import os
+
+from django.conf import settings
+from django.core.validators import get_available_image_extensions
+from django.db import connection, transaction
+from django.db.models import prefetch_related_objects
+
 from rest_framework import serializers
-from core.models import Tag, Ingredient, Recipe
+from core.models import Tag, Ingredient, Recipe, RecipeImageRendition, \
+                        ImageUploadSession
+from core.serializers import TimedSerializerMixin
+
+from recipe.fields import BulkManyRelatedField, UserPrimaryKeyRelatedField
+from recipe.names import name_key, taken_names
+from recipe.sync import record_object_changes
+from recipe.uploads import store_recipe_image
+
+
+def set_related(field_name, links, clear=True):
+    """Replace the through rows for (recipe, objects) pairs in bulk
+
+    Relations given as None are left untouched.
+    """
+    links = [(recipe, objects) for recipe, objects in links
+             if objects is not None]
+    if not links:
+        return
+
+    field = Recipe._meta.get_field(field_name)
+    through = field.remote_field.through
+    source = field.m2m_field_name()
+    target = field.m2m_reverse_field_name()
+
+    if clear:
+        through.objects.filter(**{
+            f'{source}__in': [recipe for recipe, _ in links]
+        }).delete()
+    through.objects.bulk_create(
+        [
+            through(**{source: recipe, target: obj})
+            for recipe, objects in links
+            for obj in objects
+        ],
+        batch_size=settings.BULK_BATCH_SIZE
+    )
+    # Bulk queries send no m2m_changed signals
+    if clear:
+        record_object_changes(recipe for recipe, _ in links)
+
+    for recipe, objects in links:
+        cache_related(recipe, field_name, objects)
+
+
+def cache_related(instance, field_name, objects):
+    """Cache the objects linked to an instance so rendering does not query
+
+    Stores them the way prefetch_related_objects() does, replacing any
+    relation prefetched before.
+    """
+    queryset = getattr(instance, field_name).all()
+    queryset._result_cache = list(objects)
+    queryset._prefetch_done = True
+    if not hasattr(instance, '_prefetched_objects_cache'):
+        instance._prefetched_objects_cache = {}
+    instance._prefetched_objects_cache[field_name] = queryset
+
+
+class BulkListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    """Creates and updates many objects with a few bulk queries"""
+
+    def create(self, validated_data):
+        """Insert all objects, one by one where primary keys can't return"""
+        model = self.child.Meta.model
+        objects = [model(**attrs) for attrs in validated_data]
+
+        if connection.features.can_return_rows_from_bulk_insert:
+            model.objects.bulk_create(
+                objects,
+                batch_size=settings.BULK_BATCH_SIZE
+            )
+            record_object_changes(objects, created=True)
+        else:
+            for obj in objects:
+                obj.save()
+
+        return objects
+
+    def update(self, instances, validated_data):
+        """Apply the changes of each item to the matching instance"""
+        fields = set()
+        for instance, attrs in zip(instances, validated_data):
+            for attr, value in attrs.items():
+                setattr(instance, attr, value)
+                fields.add(attr)
 
+        if fields:
+            # bulk_update skips pre_save, which sets auto_now fields
+            model = self.child.Meta.model
+            for field in model._meta.concrete_fields:
+                if getattr(field, 'auto_now', False):
+                    for instance in instances:
+                        field.pre_save(instance, add=False)
+                    fields.add(field.name)
 
-class TagSerializer(serializers.ModelSerializer):
+            model.objects.bulk_update(
+                instances,
+                sorted(fields),
+                batch_size=settings.BULK_BATCH_SIZE
+            )
+            record_object_changes(instances)
+
+        return instances
+
+
+class RecipeAttrListSerializer(BulkListSerializer):
+    """Bulk list serializer checking all names with a single query"""
+
+    def to_internal_value(self, data):
+        """Reject names given twice or that the user already has
+
+        Reported per item like the errors of the items' fields.
+        """
+        items = super().to_internal_value(data)
+        instances = self.instance or [None] * len(items)
+        names = [
+            attrs.get('name', getattr(instance, 'name', None))
+            for instance, attrs in zip(instances, items)
+        ]
+        if not items:
+            return items
+        taken = taken_names(
+            self.child.Meta.model,
+            self.child.get_owner(instances[0], self.initial_data[0]),
+            [name for name in names if name is not None],
+            exclude=[instance.pk for instance in self.instance or []]
+        )
+
+        errors = []
+        for name in names:
+            key = name and name_key(name)
+            if key in taken:
+                errors.append({'name': [self.child.duplicate_message]})
+            else:
+                errors.append({})
+                taken.add(key)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        return items
+
+
+class RecipeAttrSerializer(TimedSerializerMixin,
+                           serializers.ModelSerializer):
+    """Base serializer for tags and ingredients, named uniquely per user"""
+    duplicate_message = 'You already have one with this name.'
+
+    def get_owner(self, instance, data):
+        """Return the user whose names must stay unique
+
+        The requesting user, else the owner of the instance or the user
+        given with the data, when used outside of requests.
+        """
+        request = self.context.get('request')
+        if request is not None:
+            return request.user
+        if instance is not None:
+            return instance.user
+
+        return data.get('user') if isinstance(data, dict) else None
+
+    def validate_name(self, value):
+        """Reject names the user already has, ignoring case"""
+        # Lists of items are checked at once by RecipeAttrListSerializer
+        if self.parent is None:
+            exclude = [self.instance.pk] if self.instance else []
+            if taken_names(
+                self.Meta.model,
+                self.get_owner(self.instance, self.initial_data),
+                [value],
+                exclude=exclude
+            ):
+                raise serializers.ValidationError(self.duplicate_message)
+
+        return value
+
+
+class TagSerializer(RecipeAttrSerializer):
     """serializers for tag objects"""
 
     class Meta:
         model = Tag
         fields = ('id', 'name')
         read_only_fields = ('id', )
+        list_serializer_class = RecipeAttrListSerializer
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(RecipeAttrSerializer):
     """Serializer for ingredient objects"""
 
     class Meta:
         model = Ingredient
         fields = ('id', 'name')
         read_only_fields = ('id', )
+        list_serializer_class = RecipeAttrListSerializer
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class EnsureNamesSerializer(serializers.Serializer):
+    """Names of tags or ingredients to look up or create"""
+    names = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        allow_empty=False,
+        max_length=settings.BULK_MAX_ITEMS
+    )
+
+
+class RecipeListSerializer(BulkListSerializer):
+    """Bulk list serializer that also links ingredients and tags"""
+    related_fields = ('ingredients', 'tags')
+
+    def to_internal_value(self, data):
+        """Resolve the related ids of every item up front"""
+        if isinstance(data, list):
+            for field in self.child.fields.values():
+                if isinstance(field, BulkManyRelatedField):
+                    field.preload(data)
+
+        return super().to_internal_value(data)
+
+    def pop_related(self, validated_data):
+        """Remove the relations from each item's validated data"""
+        return [
+            {name: attrs.pop(name, None) for name in self.related_fields}
+            for attrs in validated_data
+        ]
+
+    def create(self, validated_data):
+        """Create the recipes and all of their through rows in bulk"""
+        related = self.pop_related(validated_data)
+        recipes = super().create(validated_data)
+
+        for name in self.related_fields:
+            set_related(
+                name,
+                [
+                    (recipe, relations[name] or [])
+                    for recipe, relations in zip(recipes, related)
+                ],
+                clear=False
+            )
+
+        return recipes
+
+    def update(self, instances, validated_data):
+        """Update the recipes and replace the relations that were given"""
+        related = self.pop_related(validated_data)
+        recipes = super().update(instances, validated_data)
+
+        for name in self.related_fields:
+            set_related(
+                name,
+                [
+                    (recipe, relations[name])
+                    for recipe, relations in zip(recipes, related)
+                ]
+            )
+            prefetch_related_objects(
+                [
+                    recipe for recipe, relations in zip(recipes, related)
+                    if relations[name] is None
+                ],
+                name
+            )
+
+        return recipes
+
+
+class RecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """serializer for recipe objects"""
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Ingredient.objects.all()
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
@@ -38,18 +292,90 @@ class RecipeSerializer(serializers.ModelSerializer):
             'price', 'link'
         )
         read_only_fields = ('id', )
+        list_serializer_class = RecipeListSerializer
+
+    def create(self, validated_data):
+        """Create a recipe and link its ingredients and tags"""
+        ingredients = validated_data.pop('ingredients', None)
+        tags = validated_data.pop('tags', None)
+        # Synced devices must never see the recipe without its relations
+        with transaction.atomic(savepoint=False):
+            recipe = Recipe.objects.create(**validated_data)
+
+            set_related('ingredients', [(recipe, ingredients)], clear=False)
+            set_related('tags', [(recipe, tags)], clear=False)
+
+        return recipe
+
+    def update(self, instance, validated_data):
+        """Update a recipe and replace its ingredients and tags if given"""
+        ingredients = validated_data.pop('ingredients', None)
+        tags = validated_data.pop('tags', None)
+        with transaction.atomic(savepoint=False):
+            recipe = super().update(instance, validated_data)
+
+            set_related('ingredients', [(recipe, ingredients)])
+            set_related('tags', [(recipe, tags)])
+
+        return recipe
 
 
 class RecipeDetailSerializer(RecipeSerializer):
     """Serializes recipe details"""
     ingredients = IngredientSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
-    
+
+
+class RecipeImageRenditionSerializer(serializers.ModelSerializer):
+    """Serializer for the resized copies of a recipe image"""
+    url = serializers.FileField(source='file', read_only=True)
+
+    class Meta:
+        model = RecipeImageRendition
+        fields = ('name', 'format', 'width', 'height', 'url')
+        read_only_fields = fields
+
 
 class RecipeImageSerializer(serializers.ModelSerializer):
     """Serilaizer for uploading images to the recipe"""
+    renditions = RecipeImageRenditionSerializer(
+        source='image_renditions',
+        many=True,
+        read_only=True
+    )
 
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
-        read_only_fields = ('id', )
+        fields = ('id', 'image', 'image_status', 'renditions')
+        read_only_fields = ('id', 'image_status')
+        extra_kwargs = {'image': {'required': True, 'allow_null': False}}
+
+    def update(self, instance, validated_data):
+        """Store the image by content so identical uploads share a file"""
+        return store_recipe_image(instance, validated_data['image'])
+
+
+class ImageUploadSessionSerializer(serializers.ModelSerializer):
+    """Serializer for resumable chunked image uploads"""
+
+    class Meta:
+        model = ImageUploadSession
+        fields = ('id', 'filename', 'size', 'offset')
+        read_only_fields = ('id', 'offset')
+
+    def validate_filename(self, value):
+        """Only accept names of image files"""
+        extension = os.path.splitext(value)[1][1:].lower()
+        if extension not in get_available_image_extensions():
+            raise serializers.ValidationError(
+                'File name must have an image extension'
+            )
+
+        return value
+
+    def validate_size(self, value):
+        """Reject uploads larger than the configured limit up front"""
+        if value is not None and value > settings.RECIPE_IMAGE_MAX_SIZE:
+            raise serializers.ValidationError('Image is too large')
+
+        return value
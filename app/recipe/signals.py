@@ -0,0 +1,89 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, \
+                                     pre_delete
+from django.contrib.auth import get_user_model
+from django.dispatch import receiver
+
+from core.models import Ingredient, Recipe, RecipeImageRendition, Tag
+
+from recipe.images import delete_unused_file
+from recipe.sync import deleting_user_ids, record_changes
+from recipe.uploads import release_image
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    """Release the stored image of a deleted recipe"""
+    release_image(instance.image.name)
+
+
+@receiver(post_delete, sender=RecipeImageRendition)
+def rendition_deleted(sender, instance, **kwargs):
+    """Delete a rendition file unless another recipe shares it"""
+    delete_unused_file(instance.file.name)
+
+
+@receiver(pre_delete, sender=get_user_model())
+def user_deleting(sender, instance, **kwargs):
+    """Skip the sync records of the objects deleted with their owner"""
+    deleting_user_ids.add(instance.id)
+
+
+@receiver(post_delete, sender=get_user_model())
+def user_deleted(sender, instance, **kwargs):
+    deleting_user_ids.discard(instance.id)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def synced_object_saved(sender, instance, created, **kwargs):
+    """Record the change for incremental sync"""
+    record_changes(
+        instance.user_id,
+        sender._meta.model_name,
+        [instance.id],
+        created=created
+    )
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def recipe_attr_deleting(sender, instance, **kwargs):
+    """Remember the recipes that lose the tag or ingredient"""
+    instance._linked_recipe_ids = list(
+        instance.recipe_set.values_list('id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def synced_object_deleted(sender, instance, **kwargs):
+    """Leave a tombstone for incremental sync"""
+    record_changes(
+        instance.user_id,
+        sender._meta.model_name,
+        [instance.id],
+        deleted=True
+    )
+    record_changes(
+        instance.user_id,
+        'recipe',
+        getattr(instance, '_linked_recipe_ids', [])
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def synced_relations_changed(sender, instance, action, reverse, pk_set,
+                             **kwargs):
+    """Record the recipes whose tags or ingredients changed"""
+    if not reverse:
+        if action.startswith('post_'):
+            record_changes(instance.user_id, 'recipe', [instance.id])
+    elif action == 'pre_clear':
+        recipe_attr_deleting(sender, instance)
+    elif action == 'post_clear':
+        record_changes(instance.user_id, 'recipe', instance._linked_recipe_ids)
+    elif action in ('post_add', 'post_remove'):
+        record_changes(instance.user_id, 'recipe', pk_set)
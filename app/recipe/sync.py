@@ -0,0 +1,130 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Prefetch
+
+from core.models import Change, Ingredient, Recipe, SyncState, Tag
+
+
+# name in the change log and the sync response -> model
+SYNCED_MODELS = {
+    'recipe': Recipe,
+    'tag': Tag,
+    'ingredient': Ingredient,
+}
+
+
+# users being deleted, their objects go without leaving tombstones
+deleting_user_ids = set()
+
+
+def next_sequence(user_id):
+    """Increment the change counter of a user and return its value
+
+    The counter row stays locked until the transaction commits, so the
+    changes of a user commit in the order of their sequence numbers.
+    """
+    counter = SyncState.objects.filter(user_id=user_id)
+    if not counter.update(sequence=F('sequence') + 1):
+        try:
+            with transaction.atomic():
+                SyncState.objects.create(user_id=user_id, sequence=1)
+            return 1
+        except IntegrityError:
+            counter.update(sequence=F('sequence') + 1)
+
+    return counter.values_list('sequence', flat=True).get()
+
+
+def record_changes(user_id, model_name, ids, deleted=False, created=False):
+    """Record that objects of a user changed or were deleted"""
+    ids = set(ids)
+    if not ids or user_id in deleting_user_ids:
+        return
+
+    with transaction.atomic(savepoint=False):
+        sequence = next_sequence(user_id)
+
+        existing = set()
+        if not created:
+            changes = Change.objects.filter(
+                model=model_name,
+                object_id__in=ids
+            )
+            updated = changes.update(sequence=sequence, deleted=deleted)
+            if updated == len(ids):
+                return
+            if updated:
+                existing = set(changes.values_list('object_id', flat=True))
+
+        Change.objects.bulk_create(
+            [
+                Change(
+                    user_id=user_id,
+                    model=model_name,
+                    object_id=object_id,
+                    sequence=sequence,
+                    deleted=deleted
+                )
+                for object_id in ids - existing
+            ],
+            batch_size=settings.BULK_BATCH_SIZE
+        )
+
+
+def record_object_changes(objects, created=False):
+    """Record changes of objects written by bulk queries, without signals"""
+    grouped = defaultdict(list)
+    for obj in objects:
+        model_name = obj._meta.model_name
+        if model_name in SYNCED_MODELS:
+            grouped[(obj.user_id, model_name)].append(obj.id)
+
+    for (user_id, model_name), ids in grouped.items():
+        record_changes(user_id, model_name, ids, created=created)
+
+
+def changes_since(user, since, limit):
+    """Return the changes of a user after the since cursor
+
+    At most limit changes are returned unless a single transaction
+    changed more, the changes of one transaction are never split.
+    """
+    changes = list(
+        Change.objects.filter(user=user, sequence__gt=since)
+        .order_by('sequence', 'id')[:limit + 1]
+    )
+    has_more = len(changes) > limit
+    if has_more:
+        boundary = changes[limit].sequence
+        changes = [c for c in changes if c.sequence < boundary]
+        if not changes:
+            changes = list(Change.objects.filter(
+                user=user,
+                sequence=boundary
+            ))
+
+    cursor = changes[-1].sequence if changes else since
+    updated = defaultdict(list)
+    deleted = defaultdict(list)
+    for change in changes:
+        target = deleted if change.deleted else updated
+        target[change.model].append(change.object_id)
+
+    return cursor, has_more, updated, deleted
+
+
+def changed_objects(user, model_name, ids):
+    """Return the current rows of the changed objects"""
+    queryset = SYNCED_MODELS[model_name].objects.filter(user=user, id__in=ids)
+    if model_name == 'recipe':
+        queryset = queryset.prefetch_related(
+            Prefetch(
+                'ingredients',
+                Ingredient.objects.only('id').order_by('id')
+            ),
+            Prefetch('tags', Tag.objects.only('id').order_by('id')),
+        )
+
+    return queryset.order_by('id')
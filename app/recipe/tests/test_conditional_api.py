@@ -0,0 +1,113 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe.sync import record_changes
+from recipe.tests.test_recipe_api import RECIPE_URL, detail_url, sample_recipe
+
+
+class ConditionalRequestTest(TestCase):
+    """Test ETags and conditional requests on the recipe api"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@vikas.com',
+            'test1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.recipe.tags.add(self.tag)
+
+    def test_list_not_modified(self):
+        """Test an unchanged list is answered with 304"""
+        res = self.client.get(RECIPE_URL)
+        etag = res['ETag']
+
+        # only the version of the user's data is read
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(res.content, b'')
+
+    def test_list_etag_changes_with_data(self):
+        """Test the list ETag changes when a recipe changes"""
+        etag = self.client.get(RECIPE_URL)['ETag']
+        sample_recipe(user=self.user, title='Soup')
+
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_list_etag_follows_other_processes(self):
+        """Test the list ETag changes with writes this process didn't see"""
+        etag = self.client.get(RECIPE_URL)['ETag']
+        # a write of another worker, which leaves this one's caches alone
+        Recipe.objects.filter(id=self.recipe.id).update(title='Renamed')
+        record_changes(self.user.id, 'recipe', [self.recipe.id])
+
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['title'], 'Renamed')
+
+    def test_detail_not_modified(self):
+        """Test an unchanged recipe is answered with 304"""
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+
+        res = self.client.get(
+            detail_url(self.recipe.id),
+            HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_etag_covers_related_rows(self):
+        """Test renaming a linked tag changes the recipe ETag"""
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+        self.tag.name = 'Vegetarian'
+        self.tag.save()
+
+        res = self.client.get(
+            detail_url(self.recipe.id),
+            HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], 'Vegetarian')
+
+    def test_update_with_current_etag(self):
+        """Test a write conditional on the current ETag succeeds"""
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+
+        res = self.client.patch(
+            detail_url(self.recipe.id),
+            {'title': 'Stew'},
+            HTTP_IF_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.title, 'Stew')
+
+    def test_update_with_stale_etag(self):
+        """Test a write based on a modified recipe is rejected"""
+        etag = self.client.get(detail_url(self.recipe.id))['ETag']
+        self.client.patch(detail_url(self.recipe.id), {'title': 'Stew'})
+
+        res = self.client.patch(
+            detail_url(self.recipe.id),
+            {'title': 'Soup'},
+            HTTP_IF_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.title, 'Stew')
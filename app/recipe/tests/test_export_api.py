@@ -0,0 +1,107 @@
+import csv
+import io
+import json
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase, override_settings
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.tests.test_recipe_api import sample_recipe
+
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class RecipeExportApiTest(TestCase):
+    """Test streaming exports of the recipe catalog"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@vikas.com',
+            'test1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        salt = Ingredient.objects.create(user=self.user, name='Salt; fine')
+        self.recipes = []
+        for i in range(5):
+            recipe = sample_recipe(user=self.user, title=f'Recipe {i}')
+            if i % 2:
+                recipe.tags.add(vegan)
+                recipe.ingredients.add(salt)
+            self.recipes.append(recipe)
+
+        other = get_user_model().objects.create_user(
+            'other@vikas.com',
+            'test1234'
+        )
+        sample_recipe(user=other, title='Not mine')
+
+    def get_export(self, export_format):
+        res = self.client.get(EXPORT_URL, {'format': export_format})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertIn(
+            f'filename="recipes.{export_format}"',
+            res['Content-Disposition']
+        )
+
+        return b''.join(res.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        """Test every recipe of the user is exported as a JSON line"""
+        lines = self.get_export('ndjson').splitlines()
+        items = [json.loads(line) for line in lines]
+
+        self.assertEqual(
+            [item['id'] for item in items],
+            [recipe.id for recipe in self.recipes]
+        )
+        self.assertEqual(items[1]['tags'], ['Vegan'])
+        self.assertEqual(items[1]['ingredients'], ['Salt; fine'])
+        self.assertEqual(items[0]['tags'], [])
+        self.assertEqual(items[0]['price'], '20.00')
+
+    def test_export_csv(self):
+        """Test the export as CSV with a header row"""
+        rows = list(csv.DictReader(io.StringIO(self.get_export('csv'))))
+
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]['title'], 'Recipe 0')
+        self.assertEqual(json.loads(rows[1]['ingredients']), ['Salt; fine'])
+        self.assertEqual(json.loads(rows[0]['tags']), [])
+
+    def test_export_csv_escapes_formulas(self):
+        """Test titles starting like a formula are exported as text"""
+        sample_recipe(user=self.user, title='=HYPERLINK("http://x")')
+
+        rows = list(csv.DictReader(io.StringIO(self.get_export('csv'))))
+
+        self.assertEqual(rows[-1]['title'], '\'=HYPERLINK("http://x")')
+        self.assertEqual(rows[-1]['price'], '20.00')
+
+    def test_export_empty_catalog_csv(self):
+        """Test an empty catalog exports only the header"""
+        Recipe.objects.filter(user=self.user).delete()
+
+        content = self.get_export('csv')
+
+        self.assertEqual(
+            content.strip(),
+            'id,title,time_in_minutes,price,link,tags,ingredients'
+        )
+
+    def test_queries_per_chunk(self):
+        """Test relations are fetched once per chunk, not per recipe"""
+        res = self.client.get(EXPORT_URL, {'format': 'ndjson'})
+
+        # one recipe query, then two relation queries per chunk of two
+        with self.assertNumQueries(1 + 3 * 2):
+            b''.join(res.streaming_content)
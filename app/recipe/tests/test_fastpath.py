@@ -0,0 +1,135 @@
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
+from django.test import TestCase, override_settings
+
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.fastpath import recipe_list_data, recipe_rows
+from recipe.serializers import RecipeSerializer
+from recipe.tests.test_recipe_api import RECIPE_URL, detail_url
+
+
+NO_RESPONSE_CACHE = {'ENABLED': False, 'CACHE': 'responses'}
+
+
+@override_settings(RESPONSE_CACHE=NO_RESPONSE_CACHE)
+class FastReadParityTest(TestCase):
+    """Test the fast read path renders exactly like the serializers"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@vikas.com',
+            'test1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=f'Ingrédient {i}')
+            for i in range(3)
+        ]
+        prices = [Decimal('0.5'), Decimal('12.00'), Decimal('999.99')]
+        for i, price in enumerate(prices):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Crème brûlée "{i}"',
+                time_in_minutes=i * 15,
+                price=price,
+                link='https://example.com/r' if i else ''
+            )
+            recipe.tags.add(*tags[:i])
+            recipe.ingredients.add(*reversed(ingredients[i:]))
+
+    def get_both(self, url, params=None):
+        """Return the response bodies without and with the fast path"""
+        bodies = []
+        for fast in (False, True):
+            with self.settings(RECIPE_FAST_READ=fast):
+                res = self.client.get(url, params)
+                bodies.append((res.status_code, res.content))
+
+        return bodies
+
+    def test_list_parity(self):
+        """Test the list output is byte identical"""
+        slow, fast = self.get_both(RECIPE_URL)
+
+        self.assertEqual(slow, fast)
+        self.assertEqual(fast[0], 200)
+
+    def test_filtered_page_parity(self):
+        """Test filtered and paginated lists are byte identical"""
+        tag = Tag.objects.get(name='Tag 0')
+        slow, fast = self.get_both(RECIPE_URL, {'tags': tag.id})
+        self.assertEqual(slow, fast)
+
+        slow, fast = self.get_both(RECIPE_URL, {'page_size': 2})
+        self.assertEqual(slow, fast)
+
+    def test_detail_parity(self):
+        """Test the detail output and ETag are identical"""
+        for recipe in Recipe.objects.all():
+            slow, fast = self.get_both(detail_url(recipe.id))
+            self.assertEqual(slow, fast)
+
+            with self.settings(RECIPE_FAST_READ=False):
+                etag = self.client.get(detail_url(recipe.id))['ETag']
+            with self.settings(RECIPE_FAST_READ=True):
+                res = self.client.get(
+                    detail_url(recipe.id),
+                    HTTP_IF_NONE_MATCH=etag
+                )
+            self.assertEqual(res.status_code, 304)
+
+    def test_missing_detail(self):
+        """Test a missing recipe is a 404 on the fast path too"""
+        slow, fast = self.get_both(detail_url(9999))
+
+        self.assertEqual(slow, fast)
+
+    def test_invalid_detail_id(self):
+        """Test an id that is not a number is a 404, not an error"""
+        slow, fast = self.get_both(detail_url('abc'))
+
+        self.assertEqual(slow, fast)
+        self.assertEqual(fast[0], 404)
+
+    @patch.object(IsAuthenticated, 'has_object_permission')
+    def test_detail_object_permissions(self, has_object_permission):
+        """Test the fast path checks the object permissions too"""
+        has_object_permission.return_value = False
+        recipe = Recipe.objects.first()
+
+        slow, fast = self.get_both(detail_url(recipe.id))
+
+        self.assertEqual(slow, fast)
+        self.assertEqual(fast[0], 403)
+        checked = has_object_permission.call_args[0][2]
+        self.assertEqual(checked.pk, recipe.pk)
+        self.assertEqual(checked.user_id, self.user.id)
+
+    def test_rows_render_like_serializer(self):
+        """Test the row builder matches the serializer on its own"""
+        queryset = Recipe.objects.order_by('id')
+
+        serialized = RecipeSerializer(
+            queryset.prefetch_related(
+                Prefetch('ingredients', Ingredient.objects.order_by('id')),
+                Prefetch('tags', Tag.objects.order_by('id')),
+            ),
+            many=True
+        ).data
+        rows = recipe_list_data(recipe_rows(queryset))
+
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(rows), renderer.render(serialized))
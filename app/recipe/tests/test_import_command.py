@@ -0,0 +1,114 @@
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from core.models import Change, Recipe, Tag, Ingredient
+
+
+class ImportRecipesCommandTest(TestCase):
+    """Test bulk importing recipes from files"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@vikas.com',
+            'test1234'
+        )
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_file(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+
+        return path
+
+    def import_recipes(self, *args):
+        out = StringIO()
+        call_command(
+            'import_recipes', *args,
+            '--user', self.user.email,
+            '--batch-size', '2',
+            stdout=out
+        )
+
+        return out.getvalue()
+
+    def test_import_ndjson(self):
+        """Test importing recipes with tags and ingredients by name"""
+        lines = [
+            {
+                'title': f'Recipe {i}',
+                'time_in_minutes': i,
+                'price': '2.50',
+                'tags': ['Vegan', 'Quick'],
+                'ingredients': ['Salt', 'Salt'],
+            }
+            for i in range(5)
+        ]
+        path = self.write_file(
+            'recipes.ndjson',
+            '\n'.join(json.dumps(line) for line in lines) + '\n\n'
+        )
+
+        out = self.import_recipes(path)
+
+        self.assertIn('5 recipes', out)
+        recipes = Recipe.objects.filter(user=self.user).order_by('id')
+        self.assertEqual(recipes.count(), 5)
+        self.assertEqual(recipes[0].price, Decimal('2.50'))
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 1)
+        for recipe in recipes:
+            self.assertIn(self.vegan, recipe.tags.all())
+            self.assertEqual(recipe.ingredients.count(), 1)
+        self.assertEqual(
+            Change.objects.filter(user=self.user, model='recipe').count(),
+            5
+        )
+
+    def test_import_csv_export_format(self):
+        """Test importing a CSV file in the export format"""
+        path = self.write_file(
+            'recipes.csv',
+            'id,title,time_in_minutes,price,link,tags,ingredients\n'
+            '7,"Pie, apple",30,5.00,,"[""Vegan""]","[""Apple""]"\n'
+            '8,Soup,10,1.00,https://example.com,[],[]\n'
+        )
+
+        self.import_recipes(path)
+
+        pie = Recipe.objects.get(user=self.user, title='Pie, apple')
+        self.assertEqual(list(pie.tags.all()), [self.vegan])
+        self.assertEqual(pie.ingredients.get().name, 'Apple')
+        soup = Recipe.objects.get(user=self.user, title='Soup')
+        self.assertEqual(soup.link, 'https://example.com')
+
+    def test_import_invalid_row(self):
+        """Test an invalid row reports its file and line"""
+        path = self.write_file(
+            'recipes.ndjson',
+            '{"title": "Good", "time_in_minutes": 1, "price": "1"}\n'
+            '{"title": "Bad", "time_in_minutes": "soon", "price": "1"}\n'
+        )
+
+        with self.assertRaisesMessage(CommandError, f'{path}:2:'):
+            self.import_recipes(path)
+
+    def test_import_unknown_format(self):
+        """Test files with an unknown extension are rejected"""
+        path = self.write_file('recipes.txt', '')
+
+        with self.assertRaises(CommandError):
+            self.import_recipes(path)
+        self.assertFalse(Recipe.objects.exists())
@@ -10,6 +10,7 @@ from recipe.serializers import IngredientSerializer
 
 
 INGREDIENT_URL = reverse('recipe:ingredient-list')
+INGREDIENT_ENSURE_URL = reverse('recipe:ingredient-ensure')
 
 
 class PublicIngredientAPITest(TestCase):
@@ -47,7 +48,7 @@ class PrivateIngredientAPITest(TestCase):
         serializer = IngredientSerializer(ingredients, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_ingredient_limited_to_user(self):
         """Test that ingredients for the authenticated user is returned"""
@@ -61,8 +62,8 @@ class PrivateIngredientAPITest(TestCase):
         res = self.client.get(INGREDIENT_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], ingredient.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], ingredient.name)
 
     def test_create_ingredient_successful(self):
         """tEst to create a new ingredient"""
@@ -83,3 +84,29 @@ class PrivateIngredientAPITest(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
         # self.assertEqual(len(res.data), 0)
+
+    def test_create_duplicate_ingredient_rejected(self):
+        """Test an ingredient name the user has is rejected ignoring case"""
+        Ingredient.objects.create(user=self.user, name='Salt')
+
+        res = self.client.post(INGREDIENT_URL, {'name': 'salt'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ensure_ingredients(self):
+        """Test ensuring ingredients in one request"""
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+
+        res = self.client.post(
+            INGREDIENT_ENSURE_URL,
+            {'names': ['Pepper', 'SALT']},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[1]['id'], salt.id)
+        self.assertTrue(res.data[0]['created'])
+        self.assertTrue(Ingredient.objects.filter(
+            user=self.user,
+            name='Pepper'
+        ).exists())
@@ -0,0 +1,236 @@
+import os
+import re
+import unittest
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Change, Ingredient, Recipe, SyncState, Tag
+from recipe.filters import search_title
+
+
+FIXTURE_SIZE = int(os.environ.get('QUERY_PLAN_FIXTURE_SIZE', 20000))
+
+# Tables that grow with the catalog and must never be scanned whole
+LARGE_TABLES = {
+    'core_recipe',
+    'core_tag',
+    'core_ingredient',
+    'core_recipe_tags',
+    'core_recipe_ingredients',
+    'core_change',
+}
+SEQ_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+@unittest.skipUnless(
+    connection.vendor == 'postgresql',
+    'Query plans are only checked on Postgres'
+)
+class RecipeSearchPlanTest(TestCase):
+    """Test that recipe title search uses the title indexes
+
+    Set QUERY_PLAN_FIXTURE_SIZE=1000000 to check the plans on a
+    production sized table.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            'test@vikas.com',
+            'test1234'
+        )
+        Recipe.objects.bulk_create(
+            (
+                Recipe(
+                    user=cls.user,
+                    title=f'Recipe {i} with rice',
+                    time_in_minutes=10,
+                    price=5
+                )
+                for i in range(FIXTURE_SIZE)
+            ),
+            batch_size=5000
+        )
+        Recipe.objects.create(
+            user=cls.user,
+            title='Thai green curry',
+            time_in_minutes=30,
+            price=12
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_recipe')
+
+    def test_full_text_search_uses_index(self):
+        """Test the title search is answered from the GIN indexes"""
+        plan = search_title(Recipe.objects.all(), 'curry').explain()
+
+        self.assertIn('core_recipe_title_search_idx', plan)
+        self.assertIn('core_recipe_title_trgm_idx', plan)
+        self.assertNotIn('Seq Scan', plan)
+
+
+@unittest.skipUnless(
+    connection.vendor == 'postgresql',
+    'Query plans are only checked on Postgres'
+)
+@override_settings(RESPONSE_CACHE={'ENABLED': False, 'CACHE': 'responses'})
+class ApiQueryPlanTest(TestCase):
+    """Test that no query of the API scans a large table sequentially
+
+    The catalog is spread over many users like in production, so that
+    the planner prefers the per user indexes.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        user_count = max(FIXTURE_SIZE // 100, 2)
+        users = get_user_model().objects.bulk_create(
+            get_user_model()(email=f'user{i}@vikas.com')
+            for i in range(user_count)
+        )
+        cls.user = users[0]
+
+        tags = Tag.objects.bulk_create(
+            (
+                Tag(user=user, name=f'Tag {i}')
+                for user in users for i in range(20)
+            ),
+            batch_size=5000
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            (
+                Ingredient(user=user, name=f'Ingredient {i}')
+                for user in users for i in range(20)
+            ),
+            batch_size=5000
+        )
+        recipes = Recipe.objects.bulk_create(
+            (
+                Recipe(
+                    user=user,
+                    title=f'Recipe {i}',
+                    time_in_minutes=i % 60,
+                    price=i % 100
+                )
+                for user in users for i in range(100)
+            ),
+            batch_size=5000
+        )
+
+        for field_name, objects in (
+            ('tags', tags),
+            ('ingredients', ingredients),
+        ):
+            field = Recipe._meta.get_field(field_name)
+            through = field.remote_field.through
+            target = f'{field.m2m_reverse_field_name()}_id'
+            through.objects.bulk_create(
+                (
+                    through(**{
+                        'recipe_id': recipe.id,
+                        target: objects[
+                            (index // 100) * 20 + (index + offset) % 20
+                        ].id
+                    })
+                    for index, recipe in enumerate(recipes)
+                    for offset in (0, 7)
+                ),
+                batch_size=5000
+            )
+
+        Change.objects.bulk_create(
+            (
+                Change(
+                    user_id=obj.user_id,
+                    model=obj._meta.model_name,
+                    object_id=obj.id,
+                    sequence=1
+                )
+                for objects in (recipes, tags, ingredients)
+                for obj in objects
+            ),
+            batch_size=5000
+        )
+        SyncState.objects.bulk_create(
+            SyncState(user=user, sequence=1) for user in users
+        )
+
+        cls.tag = tags[0]
+        cls.recipe = recipes[0]
+        with connection.cursor() as cursor:
+            for table in LARGE_TABLES:
+                cursor.execute(f'ANALYZE {table}')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertIndexScans(self, url, params=None):
+        """Assert that the plans of the request's queries use indexes"""
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.get(url, params)
+            if res.streaming:
+                b''.join(res.streaming_content)
+        self.assertLess(res.status_code, 400)
+
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute(f"EXPLAIN {query['sql']}")
+                plan = '\n'.join(row[0] for row in cursor.fetchall())
+                scanned = set(SEQ_SCAN.findall(plan)) & LARGE_TABLES
+                self.assertFalse(
+                    scanned,
+                    f'{url} scans {", ".join(sorted(scanned))}:\n'
+                    f"{query['sql']}\n{plan}"
+                )
+
+    def test_tag_list_plans(self):
+        """Test listing tags uses the (user, name) index"""
+        self.assertIndexScans(reverse('recipe:tag-list'))
+        self.assertIndexScans(
+            reverse('recipe:tag-list'),
+            {'assigned_only': 1}
+        )
+
+    def test_ingredient_list_plans(self):
+        """Test listing ingredients uses the (user, name) index"""
+        self.assertIndexScans(reverse('recipe:ingredient-list'))
+        self.assertIndexScans(
+            reverse('recipe:ingredient-list'),
+            {'assigned_only': 1}
+        )
+
+    def test_recipe_list_plans(self):
+        """Test listing and filtering recipes uses indexes"""
+        url = reverse('recipe:recipe-list')
+        self.assertIndexScans(url)
+        self.assertIndexScans(url, {'tags': self.tag.id})
+        self.assertIndexScans(
+            url,
+            {'tags': self.tag.id, 'tags_match': 'all'}
+        )
+
+    def test_recipe_detail_plans(self):
+        """Test retrieving a recipe uses indexes"""
+        self.assertIndexScans(
+            reverse('recipe:recipe-detail', args=[self.recipe.id])
+        )
+
+    def test_sync_plans(self):
+        """Test syncing reads the change log by its (user, sequence) index"""
+        self.assertIndexScans(reverse('recipe:sync'))
+
+    def test_export_plans(self):
+        """Test exporting reads the user's recipes by index"""
+        self.assertIndexScans(
+            reverse('recipe:recipe-export'),
+            {'format': 'ndjson'}
+        )
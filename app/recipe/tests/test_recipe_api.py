@@ -1,16 +1,28 @@
+import hashlib
+import io
+import json
+import shutil
 import tempfile
 import os
+from datetime import timedelta
+from unittest.mock import patch
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.urls import reverse
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Recipe, Tag, Ingredient
+from core.models import Recipe, Tag, Ingredient, ImageBlob, \
+                        ImageUploadSession
+from core.tests.utils import NPlusOneTestMixin
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 # /api/recipe/recipes
@@ -22,6 +34,33 @@ def image_upload_url(recipe_id):
     return reverse('recipe:recipe-upload-image', args=[recipe_id])
 
 
+def chunked_upload_url(recipe_id, upload_id=None, complete=False):
+    """Return URL for resumable recipe image uploads"""
+    if upload_id is None:
+        return reverse('recipe:recipe-start-image-upload', args=[recipe_id])
+    elif complete:
+        return reverse(
+            'recipe:recipe-complete-image-upload',
+            args=[recipe_id, upload_id]
+        )
+
+    return reverse(
+        'recipe:recipe-image-upload-chunk',
+        args=[recipe_id, upload_id]
+    )
+
+
+def sample_image_bytes(color='red', size=(10, 10)):
+    """Return the bytes of a JPEG image"""
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='JPEG')
+
+    return buffer.getvalue()
+
+
+RECIPE_BULK_URL = reverse('recipe:recipe-bulk')
+
+
 # /api/recipe/recipes/id
 def detail_url(recipe_id):
     """Return recipe detail url"""
@@ -62,7 +101,7 @@ class PublicRecipeApiTest(TestCase):
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
-class PrivateRecipeApiTest(TestCase):
+class PrivateRecipeApiTest(NPlusOneTestMixin, TestCase):
     """Test unauthenticated recipe api access"""
     def setUp(self):
         self.client = APIClient()
@@ -82,7 +121,7 @@ class PrivateRecipeApiTest(TestCase):
         recipes = Recipe.objects.all().order_by('id')
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_retrieve_limited_to_user(self):
         """Test retriving recipes for user"""
@@ -99,8 +138,8 @@ class PrivateRecipeApiTest(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_view_recipe_details(self):
         """TEst viewing a recipe detail"""
@@ -174,6 +213,67 @@ class PrivateRecipeApiTest(TestCase):
         self.assertIn(ingredient1, ingredients)
         self.assertIn(ingredient2, ingredients)
 
+    def test_create_recipe_with_other_users_tag(self):
+        """Test that tags of another user cannot be linked to a recipe"""
+        user2 = get_user_model().objects.create_user(
+            'other@vikas.com',
+            'pass1234'
+        )
+        tag = sample_tag(user=user2)
+        payload = {
+            'title': 'Cake',
+            'time_in_minutes': 45,
+            'tags': [tag.id],
+            'price': 10.00
+        }
+
+        res = self.client.post(RECIPE_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
+    def test_create_recipe_reports_all_missing_ids(self):
+        """Test that every unknown id is reported in one error"""
+        tag = sample_tag(user=self.user)
+        payload = {
+            'title': 'Cake',
+            'time_in_minutes': 45,
+            'tags': [tag.id, 9998, 9999],
+            'price': 10.00
+        }
+
+        res = self.client.post(RECIPE_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(res.data['tags']), 2)
+        self.assertIn('9998', res.data['tags'][0])
+        self.assertIn('9999', res.data['tags'][1])
+
+    def test_create_recipe_relations_query_count(self):
+        """Test that linking relations costs a constant number of queries"""
+        tags = [sample_tag(user=self.user, name=f'Tag {i}') for i in range(10)]
+        ingredients = [
+            sample_ingredient(user=self.user, name=f'Ingredient {i}')
+            for i in range(40)
+        ]
+        payload = {
+            'title': 'Stew',
+            'time_in_minutes': 90,
+            'price': 18.00,
+            'tags': [tag.id for tag in tags],
+            'ingredients': [ingredient.id for ingredient in ingredients],
+        }
+
+        # two lookups, the recipe insert, one insert per relation and
+        # three to record the change for incremental sync
+        with self.assertNumQueries(8):
+            res = self.client.post(RECIPE_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 10)
+        self.assertEqual(recipe.ingredients.count(), 40)
+
     def test_partial_update_recipe(self):
         """Test that updates a recipe using patch"""
         recipe = sample_recipe(user=self.user)
@@ -215,6 +315,285 @@ class PrivateRecipeApiTest(TestCase):
 
         self.assertEqual(len(tags), 0)
 
+    def test_recipes_paginated_by_cursor(self):
+        """Test that recipes are returned in pages linked by a cursor"""
+        recipes = [
+            sample_recipe(user=self.user, title=f'Recipe {i}')
+            for i in range(5)
+        ]
+
+        res = self.client.get(RECIPE_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['id'] for item in res.data['results']],
+            [recipe.id for recipe in recipes[:2]]
+        )
+        self.assertIsNone(res.data['previous'])
+
+        seen = []
+        url = RECIPE_URL + '?page_size=2'
+        while url:
+            # the first page is served from the response cache
+            data = self.client.get(url).json()
+            seen.extend(item['id'] for item in data['results'])
+            url = data['next']
+
+        self.assertEqual(seen, [recipe.id for recipe in recipes])
+
+
+class RecipeFilterApiTest(NPlusOneTestMixin, TestCase):
+    """Test filtering the recipe list"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@vikas.com',
+            'test1234'
+        )
+        self.client.force_authenticate(self.user)
+
+    def get_ids(self, params):
+        """Return the ids of the recipes listed for the query params"""
+        res = self.client.get(RECIPE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return {item['id'] for item in res.data['results']}
+
+    def test_filter_recipes_by_tags(self):
+        """Test returning recipes with any or all of the given tags"""
+        vegan = sample_tag(user=self.user, name='Vegan')
+        spicy = sample_tag(user=self.user, name='Spicy')
+        recipe1 = sample_recipe(user=self.user, title='Curry')
+        recipe1.tags.add(vegan, spicy)
+        recipe2 = sample_recipe(user=self.user, title='Salad')
+        recipe2.tags.add(vegan)
+        sample_recipe(user=self.user, title='Steak')
+
+        tags = f'{vegan.id},{spicy.id}'
+
+        self.assertEqual(
+            self.get_ids({'tags': tags}), {recipe1.id, recipe2.id}
+        )
+        self.assertEqual(
+            self.get_ids({'tags': tags, 'tags_match': 'all'}), {recipe1.id}
+        )
+
+    def test_filter_recipes_by_ingredients(self):
+        """Test returning recipes with any or all of the given ingredients"""
+        rice = sample_ingredient(user=self.user, name='Rice')
+        egg = sample_ingredient(user=self.user, name='Egg')
+        recipe1 = sample_recipe(user=self.user, title='Fried rice')
+        recipe1.ingredients.add(rice, egg)
+        recipe2 = sample_recipe(user=self.user, title='Omelette')
+        recipe2.ingredients.add(egg)
+
+        ingredients = f'{rice.id},{egg.id}'
+
+        self.assertEqual(
+            self.get_ids({'ingredients': ingredients}),
+            {recipe1.id, recipe2.id}
+        )
+        self.assertEqual(
+            self.get_ids({
+                'ingredients': ingredients,
+                'ingredients_match': 'all'
+            }),
+            {recipe1.id}
+        )
+
+    def test_filter_recipes_by_ranges(self):
+        """Test filtering recipes by price and preparation time"""
+        cheap = sample_recipe(user=self.user, price=5, time_in_minutes=10)
+        sample_recipe(user=self.user, price=50, time_in_minutes=10)
+        slow = sample_recipe(user=self.user, price=8, time_in_minutes=120)
+
+        self.assertEqual(
+            self.get_ids({'price_max': '10.00'}), {cheap.id, slow.id}
+        )
+        self.assertEqual(
+            self.get_ids({'price_max': '10', 'time_in_minutes_min': 60}),
+            {slow.id}
+        )
+
+    def test_search_recipes_by_title(self):
+        """Test free text search on the recipe title"""
+        recipe = sample_recipe(user=self.user, title='Thai green curry')
+        sample_recipe(user=self.user, title='Pancakes')
+
+        self.assertEqual(self.get_ids({'search': 'Curry'}), {recipe.id})
+
+    def test_invalid_filter_rejected(self):
+        """Test that malformed filter values return a bad request"""
+        res = self.client.get(RECIPE_URL, {'tags': 'one,two'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(RECIPE_URL, {'price_min': 'cheap'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeBulkApiTest(NPlusOneTestMixin, TestCase):
+    """Test the bulk recipe endpoint"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@vikas.com',
+            'test1234'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_recipes(self):
+        """Test creating many recipes with their relations at once"""
+        tag = sample_tag(user=self.user)
+        ingredient = sample_ingredient(user=self.user)
+        payload = [
+            {
+                'title': f'Recipe {i}',
+                'time_in_minutes': 10,
+                'price': '5.00',
+                'tags': [tag.id],
+                'ingredients': [ingredient.id],
+            }
+            for i in range(20)
+        ]
+
+        res = self.client.post(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 20)
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 20)
+        for recipe in recipes:
+            self.assertEqual(list(recipe.tags.all()), [tag])
+            self.assertEqual(list(recipe.ingredients.all()), [ingredient])
+
+    def test_bulk_create_validates_related_ids_once(self):
+        """Test related ids of all items are resolved in one query each"""
+        tags = [sample_tag(user=self.user, name=f'Tag {i}') for i in range(5)]
+        payload = [
+            {
+                'title': f'Recipe {i}',
+                'time_in_minutes': 10,
+                'price': '5.00',
+                'tags': [tag.id for tag in tags],
+                'ingredients': [],
+            }
+            for i in range(10)
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.post(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        tag_lookups = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('SELECT') and
+            'FROM "core_tag"' in query['sql'] and
+            'JOIN' not in query['sql']
+        ]
+        self.assertEqual(len(tag_lookups), 1)
+
+    def test_bulk_create_from_ndjson(self):
+        """Test creating recipes from a newline delimited JSON stream"""
+        lines = [
+            json.dumps({
+                'title': title,
+                'time_in_minutes': 5,
+                'price': 1,
+                'tags': [],
+                'ingredients': [],
+            })
+            for title in ('Soup', 'Bread')
+        ]
+
+        res = self.client.post(
+            RECIPE_BULK_URL,
+            '\n'.join(lines),
+            content_type='application/x-ndjson'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            sorted(Recipe.objects.values_list('title', flat=True)),
+            ['Bread', 'Soup']
+        )
+
+    def test_bulk_create_invalid_items_creates_nothing(self):
+        """Test that one invalid item rejects the whole batch"""
+        payload = [
+            {'title': title, 'time_in_minutes': 5, 'price': 1,
+             'tags': [], 'ingredients': []}
+            for title in ('Soup', '')
+        ]
+
+        res = self.client.post(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('title', res.data[1])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_update_recipes(self):
+        """Test partially updating many recipes at once"""
+        recipe1 = sample_recipe(user=self.user, title='Soup')
+        recipe2 = sample_recipe(user=self.user, title='Bread')
+        recipe2.tags.add(sample_tag(user=self.user, name='Old'))
+        tag = sample_tag(user=self.user, name='New')
+        payload = [
+            {'id': recipe1.id, 'price': '9.50'},
+            {'id': recipe2.id, 'title': 'Rye bread', 'tags': [tag.id]},
+        ]
+
+        res = self.client.patch(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe1.refresh_from_db()
+        recipe2.refresh_from_db()
+        self.assertEqual(str(recipe1.price), '9.50')
+        self.assertEqual(recipe1.title, 'Soup')
+        self.assertEqual(recipe2.title, 'Rye bread')
+        self.assertEqual(list(recipe2.tags.all()), [tag])
+        self.assertEqual(res.data[1]['tags'], [tag.id])
+
+    def test_bulk_update_other_users_recipe(self):
+        """Test that recipes of another user can't be bulk updated"""
+        user2 = get_user_model().objects.create_user(
+            'other@vikas.com',
+            'pass1234'
+        )
+        recipe = sample_recipe(user=user2)
+
+        res = self.client.patch(
+            RECIPE_BULK_URL,
+            [{'id': recipe.id, 'title': 'Mine'}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Sample Recipe')
+
+    def test_bulk_delete_recipes(self):
+        """Test deleting many recipes and reporting missing ones"""
+        recipe1 = sample_recipe(user=self.user)
+        recipe2 = sample_recipe(user=self.user)
+        kept = sample_recipe(user=self.user)
+
+        res = self.client.delete(
+            RECIPE_BULK_URL,
+            [recipe1.id, recipe2.id, 9999],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [
+            {'id': recipe1.id, 'deleted': True},
+            {'id': recipe2.id, 'deleted': True},
+            {'id': 9999, 'deleted': False},
+        ])
+        self.assertEqual(list(Recipe.objects.all()), [kept])
+
 
 class RecipeImageUploadTest(TestCase):
     """Test upload recipe image"""
@@ -242,8 +621,9 @@ class RecipeImageUploadTest(TestCase):
             res = self.client.post(url, {'image': ntf}, format='multipart')
 
         self.recipe.refresh_from_db()
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
         self.assertIn('image', res.data)
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_PENDING)
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
     def test_upload_invalid_image(self):
@@ -252,3 +632,402 @@ class RecipeImageUploadTest(TestCase):
         res = self.client.post(url, {'image': 'notimage'}, format='multipart')
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upload_without_image(self):
+        """Test uploading without an image is rejected"""
+        url = image_upload_url(self.recipe.id)
+        res = self.client.post(url, {}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
+
+
+class RecipeQueryCountTest(NPlusOneTestMixin, TestCase):
+    """Test that recipe endpoints run a constant number of queries"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@vikas.com',
+            'test1234'
+        )
+        self.client.force_authenticate(self.user)
+
+    def create_recipes(self, count, start=0):
+        """Creates recipes that each have a tag and an ingredient"""
+        recipes = []
+        for i in range(start, start + count):
+            recipe = sample_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(sample_tag(user=self.user, name=f'Tag {i}'))
+            recipe.ingredients.add(
+                sample_ingredient(user=self.user, name=f'Ingredient {i}')
+            )
+            recipes.append(recipe)
+
+        return recipes
+
+    def test_list_query_count_is_constant(self):
+        """Test listing recipes does not query relations per recipe"""
+        # the data version, Postgres aggregates the related ids in the
+        # recipe query
+        queries = 2 if connection.vendor == 'postgresql' else 4
+        self.create_recipes(2)
+        with self.assertNumQueries(queries):
+            self.client.get(RECIPE_URL)
+
+        self.create_recipes(10, start=2)
+        with self.assertNumQueries(queries):
+            res = self.client.get(RECIPE_URL)
+
+        recipes = Recipe.objects.all().order_by('id')
+        serializer = RecipeSerializer(recipes, many=True)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_retrieve_query_count(self):
+        """Test retrieving a recipe fetches its relations in bulk"""
+        recipe = self.create_recipes(1)[0]
+        recipe.tags.add(sample_tag(user=self.user, name='Vegan'))
+        recipe.ingredients.add(sample_ingredient(user=self.user, name='Salt'))
+
+        with self.assertNumQueries(3):
+            res = self.client.get(detail_url(recipe.id))
+
+        serializer = RecipeDetailSerializer(recipe)
+        self.assertEqual(res.data, serializer.data)
+
+
+@override_settings(
+    RECIPE_IMAGE_QUEUE={'BACKEND': 'recipe.images.ImmediateImageQueue'}
+)
+class RecipeImageProcessingTest(TransactionTestCase):
+    """Test generating the renditions of an uploaded image"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@vikas.com',
+            'test1234'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def upload(self, img):
+        """Upload the PIL image as a JPEG with camera metadata"""
+        exif = Image.Exif()
+        exif[0x010f] = 'Camera maker'
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            img.save(ntf, format='JPEG', exif=exif)
+            ntf.seek(0)
+            return self.client.post(url, {'image': ntf}, format='multipart')
+
+    def test_renditions_generated(self):
+        """Test resized renditions are stored without metadata"""
+        res = self.upload(Image.new('RGB', (1600, 800)))
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+
+        renditions = {
+            (rendition.name, rendition.format): rendition
+            for rendition in self.recipe.image_renditions.all()
+        }
+        self.assertIn(('thumbnail', 'jpeg'), renditions)
+        thumbnail = renditions[('thumbnail', 'jpeg')]
+        self.assertEqual((thumbnail.width, thumbnail.height), (150, 75))
+        with Image.open(thumbnail.file.path) as img:
+            self.assertEqual(img.size, (150, 75))
+            self.assertFalse(img.getexif())
+
+    def test_process_pending_images(self):
+        """Test images whose jobs were lost are processed again"""
+        with patch('recipe.images.get_image_queue'):
+            self.upload(Image.new('RGB', (100, 100)))
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_PENDING)
+        stuck = sample_recipe(user=self.user)
+        stuck.image = self.recipe.image.name
+        stuck.image_status = Recipe.IMAGE_PROCESSING
+        stuck.save()
+        out = io.StringIO()
+
+        call_command('process_pending_images', stdout=out)
+
+        self.assertIn('Queued 1 pending images', out.getvalue())
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+        self.assertTrue(self.recipe.image_renditions.exists())
+
+        call_command('process_pending_images', '--stuck', stdout=out)
+
+        stuck.refresh_from_db()
+        self.assertEqual(stuck.image_status, Recipe.IMAGE_READY)
+
+    def test_renditions_replaced_on_new_upload(self):
+        """Test that uploading again replaces the previous renditions"""
+        self.upload(Image.new('RGB', (100, 100)))
+        first = set(
+            self.recipe.image_renditions.values_list('file', flat=True)
+        )
+
+        self.upload(Image.new('RGB', (200, 200)))
+
+        second = set(
+            self.recipe.image_renditions.values_list('file', flat=True)
+        )
+        self.assertTrue(second)
+        self.assertFalse(first & second)
+        for name in first:
+            self.assertFalse(
+                os.path.exists(os.path.join(self.media_root, name))
+            )
+
+
+@override_settings(
+    RECIPE_IMAGE_QUEUE={'BACKEND': 'recipe.images.ImmediateImageQueue'}
+)
+class RecipeImageStorageTest(TransactionTestCase):
+    """Test content addressed storage and resumable image uploads"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.upload_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            RECIPE_IMAGE_UPLOAD_DIR=self.upload_dir
+        )
+        self.settings_override.enable()
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@vikas.com',
+            'test1234'
+        )
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+        shutil.rmtree(self.upload_dir)
+
+    def upload(self, recipe, content):
+        """Upload the image bytes to the recipe"""
+        upload = io.BytesIO(content)
+        upload.name = 'photo.jpg'
+
+        return self.client.post(
+            image_upload_url(recipe.id),
+            {'image': upload},
+            format='multipart'
+        )
+
+    def test_identical_images_stored_once(self):
+        """Test that the same image uploaded twice shares one file"""
+        recipe1 = sample_recipe(user=self.user)
+        recipe2 = sample_recipe(user=self.user)
+        content = sample_image_bytes()
+        digest = hashlib.sha256(content).hexdigest()
+
+        self.upload(recipe1, content)
+        self.upload(recipe2, content)
+
+        recipe1.refresh_from_db()
+        recipe2.refresh_from_db()
+        self.assertEqual(recipe1.image.name, recipe2.image.name)
+        self.assertEqual(
+            recipe1.image.name,
+            f'uploads/recipe/{digest[:2]}/{digest[2:4]}/{digest}.jpg'
+        )
+        self.assertEqual(ImageBlob.objects.get(digest=digest).ref_count, 2)
+
+        path = recipe1.image.path
+        recipe1.delete()
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(ImageBlob.objects.get(digest=digest).ref_count, 1)
+        self.assertTrue(recipe2.image_renditions.exists())
+        for rendition in recipe2.image_renditions.all():
+            self.assertTrue(os.path.exists(rendition.file.path))
+
+        recipe2.delete()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(ImageBlob.objects.exists())
+
+    def test_replaced_image_released(self):
+        """Test that replacing an image deletes the unused file"""
+        recipe = sample_recipe(user=self.user)
+        self.upload(recipe, sample_image_bytes('red'))
+        recipe.refresh_from_db()
+        path = recipe.image.path
+
+        self.upload(recipe, sample_image_bytes('blue'))
+
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(ImageBlob.objects.count(), 1)
+
+    def test_resumable_chunked_upload(self):
+        """Test uploading an image in chunks and resuming at the offset"""
+        recipe = sample_recipe(user=self.user)
+        content = sample_image_bytes(size=(200, 200))
+        middle = len(content) // 2
+
+        res = self.client.post(
+            chunked_upload_url(recipe.id),
+            {'filename': 'photo.jpg', 'size': len(content)},
+            format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        upload_id = res.data['id']
+        url = chunked_upload_url(recipe.id, upload_id)
+
+        res = self.client.put(
+            url,
+            content[:middle],
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes 0-{middle - 1}/{len(content)}'
+        )
+        self.assertEqual(res.data['offset'], middle)
+
+        # A chunk that does not continue at the offset is rejected
+        res = self.client.put(
+            url,
+            content[1:],
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes 1-{len(content) - 1}/{len(content)}'
+        )
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+        res = self.client.get(url)
+        self.assertEqual(res.data['offset'], middle)
+
+        self.client.put(
+            url,
+            content[middle:],
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=(
+                f'bytes {middle}-{len(content) - 1}/{len(content)}'
+            )
+        )
+        res = self.client.post(chunked_upload_url(recipe.id, upload_id, True))
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        recipe.refresh_from_db()
+        digest = hashlib.sha256(content).hexdigest()
+        self.assertTrue(recipe.image.name.endswith(f'{digest}.jpg'))
+        self.assertEqual(recipe.image_status, Recipe.IMAGE_READY)
+        self.assertEqual(os.listdir(self.upload_dir), [])
+
+    def test_chunked_upload_extension_from_content(self):
+        """Test the stored extension is the detected format, not the name"""
+        recipe = sample_recipe(user=self.user)
+        res = self.client.post(
+            chunked_upload_url(recipe.id),
+            {'filename': 'evil.html'},
+            format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('filename', res.data)
+
+        content = sample_image_bytes()
+        res = self.client.post(
+            chunked_upload_url(recipe.id),
+            {'filename': 'photo.png'},
+            format='json'
+        )
+        upload_id = res.data['id']
+        self.client.put(
+            chunked_upload_url(recipe.id, upload_id),
+            content,
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes 0-{len(content) - 1}/{len(content)}'
+        )
+        res = self.client.post(chunked_upload_url(recipe.id, upload_id, True))
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        recipe.refresh_from_db()
+        self.assertTrue(recipe.image.name.endswith('.jpg'))
+
+    def test_chunked_upload_total_must_match_size(self):
+        """Test chunks announcing another total size are rejected"""
+        recipe = sample_recipe(user=self.user)
+        res = self.client.post(
+            chunked_upload_url(recipe.id),
+            {'filename': 'photo.jpg', 'size': 100},
+            format='json'
+        )
+        url = chunked_upload_url(recipe.id, res.data['id'])
+
+        res = self.client.put(
+            url,
+            b'12345678',
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE='bytes 0-7/50'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url).data['offset'], 0)
+
+    def test_prune_abandoned_uploads(self):
+        """Test expired uploads are deleted with their chunks"""
+        recipe = sample_recipe(user=self.user)
+        upload_ids = []
+        for _ in range(2):
+            res = self.client.post(
+                chunked_upload_url(recipe.id),
+                {'filename': 'photo.jpg'},
+                format='json'
+            )
+            upload_ids.append(res.data['id'])
+            self.client.put(
+                chunked_upload_url(recipe.id, res.data['id']),
+                b'12345678',
+                content_type='application/octet-stream',
+                HTTP_CONTENT_RANGE='bytes 0-7/*'
+            )
+        expired, active = upload_ids
+        ImageUploadSession.objects.filter(id=expired).update(
+            created_at=timezone.now() - timedelta(days=2)
+        )
+
+        res = self.client.get(chunked_upload_url(recipe.id, expired))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+        out = io.StringIO()
+        call_command('prune_uploads', stdout=out)
+
+        self.assertIn('Deleted 1 abandoned uploads', out.getvalue())
+        self.assertEqual(
+            [str(session.id) for session in ImageUploadSession.objects.all()],
+            [active]
+        )
+        self.assertEqual(os.listdir(self.upload_dir), [f'{active}.part'])
+
+    def test_chunked_upload_rejects_non_image(self):
+        """Test completing an upload that is not an image fails"""
+        recipe = sample_recipe(user=self.user)
+        res = self.client.post(
+            chunked_upload_url(recipe.id),
+            {'filename': 'photo.jpg'},
+            format='json'
+        )
+        upload_id = res.data['id']
+        self.client.put(
+            chunked_upload_url(recipe.id, upload_id),
+            b'notimage',
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE='bytes 0-7/*'
+        )
+
+        res = self.client.post(chunked_upload_url(recipe.id, upload_id, True))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        recipe.refresh_from_db()
+        self.assertFalse(recipe.image)
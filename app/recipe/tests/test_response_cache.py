@@ -0,0 +1,141 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase, override_settings
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+from recipe.cache import counters
+from recipe.tests.test_recipe_api import RECIPE_URL, sample_recipe
+
+
+RECIPE_BULK_URL = reverse('recipe:recipe-bulk')
+TAG_URL = reverse('recipe:tag-list')
+INGREDIENT_URL = reverse('recipe:ingredient-list')
+
+
+class ResponseCacheTest(TestCase):
+    """Test the cached list responses of the recipe api"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@vikas.com',
+            'test1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        counters.reset()
+
+    def test_repeated_list_served_from_cache(self):
+        """Test an unchanged list is served only querying its version"""
+        sample_recipe(user=self.user)
+        first = self.client.get(RECIPE_URL)
+
+        with self.assertNumQueries(1):
+            second = self.client.get(RECIPE_URL)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(counters.stats()['hits'], 1)
+        self.assertEqual(counters.stats()['misses'], 1)
+
+    def test_changes_invalidate_cached_list(self):
+        """Test saving, linking and deleting invalidate the list"""
+        recipe = sample_recipe(user=self.user)
+        self.client.get(RECIPE_URL)
+
+        recipe.title = 'Renamed'
+        recipe.save()
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['results'][0]['title'], 'Renamed')
+
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.data['results'][0]['tags'], [tag.id])
+
+        recipe.delete()
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.data['results'], [])
+
+    def test_bulk_changes_invalidate_cached_list(self):
+        """Test bulk writes, which send no signals, invalidate the list"""
+        self.client.get(RECIPE_URL)
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        self.client.get(INGREDIENT_URL)
+
+        res = self.client.post(RECIPE_BULK_URL, [{
+            'title': 'Soup',
+            'time_in_minutes': 20,
+            'price': 5.00,
+            'tags': [],
+            'ingredients': [ingredient.id],
+        }], format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(
+            res.data['results'][0]['ingredients'],
+            [ingredient.id]
+        )
+
+    def test_cache_is_per_user(self):
+        """Test users never get each other's cached lists"""
+        other = get_user_model().objects.create_user(
+            'other@vikas.com',
+            'test1234'
+        )
+        Tag.objects.create(user=other, name='Other')
+        Tag.objects.create(user=self.user, name='Mine')
+        self.client.get(TAG_URL)
+
+        client = APIClient()
+        client.force_authenticate(other)
+        res = client.get(TAG_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['results'][0]['name'], 'Other')
+
+    def test_query_params_cached_separately(self):
+        """Test filtered lists do not share a cache entry"""
+        sample_recipe(user=self.user, title='Soup', price=5.00)
+        sample_recipe(user=self.user, title='Steak', price=30.00)
+        self.client.get(RECIPE_URL)
+
+        res = self.client.get(RECIPE_URL, {'price_max': 10})
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_ndjson_next_link_cached(self):
+        """Test cached NDJSON pages keep the link to the next page"""
+        for title in ('Soup', 'Steak', 'Salad'):
+            sample_recipe(user=self.user, title=title)
+        params = {'page_size': 2, 'format': 'ndjson'}
+        first = self.client.get(RECIPE_URL, params)
+
+        res = self.client.get(RECIPE_URL, params)
+
+        self.assertEqual(res['X-Cache'], 'HIT')
+        self.assertEqual(res['Link'], first['Link'])
+        self.assertIn('rel="next"', res['Link'])
+        self.assertEqual(res['Content-Type'], first['Content-Type'])
+
+    def test_browsable_api_not_cached(self):
+        """Test the html rendering is never cached"""
+        self.client.get(RECIPE_URL, HTTP_ACCEPT='text/html')
+        res = self.client.get(RECIPE_URL, HTTP_ACCEPT='text/html')
+
+        self.assertFalse(res.has_header('X-Cache'))
+
+    @override_settings(RESPONSE_CACHE={'ENABLED': False, 'CACHE': 'responses'})
+    def test_cache_disabled(self):
+        """Test lists are always rendered when the cache is disabled"""
+        self.client.get(TAG_URL)
+        res = self.client.get(TAG_URL)
+
+        self.assertFalse(res.has_header('X-Cache'))
@@ -0,0 +1,153 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.urls import reverse
+from django.test import TestCase, override_settings
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Change, Ingredient, SyncState, Tag
+from recipe.tests.test_recipe_api import sample_recipe
+
+
+SYNC_URL = reverse('recipe:sync')
+TAG_BULK_URL = reverse('recipe:tag-bulk')
+
+
+class PublicSyncApiTest(TestCase):
+    """Test unauthenticated sync access"""
+
+    def test_auth_required(self):
+        """Test that authentication is required"""
+        res = APIClient().get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateSyncApiTest(TestCase):
+    """Test incremental sync of recipes, tags and ingredients"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@vikas.com',
+            'test1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sync(self, since=None):
+        params = {} if since is None else {'since': since}
+        res = self.client.get(SYNC_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return res.data
+
+    def test_full_sync(self):
+        """Test a sync without cursor returns every object of the user"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(tag)
+        other = get_user_model().objects.create_user(
+            'other@vikas.com',
+            'test1234'
+        )
+        Tag.objects.create(user=other, name='Other')
+
+        data = self.sync()
+
+        self.assertEqual([r['id'] for r in data['recipes']], [recipe.id])
+        self.assertEqual(data['recipes'][0]['tags'], [tag.id])
+        self.assertEqual([t['name'] for t in data['tags']], ['Vegan'])
+        self.assertEqual([i['id'] for i in data['ingredients']],
+                         [ingredient.id])
+        self.assertFalse(data['has_more'])
+
+    def test_only_changes_since_cursor(self):
+        """Test a sync returns only what changed after the cursor"""
+        sample_recipe(user=self.user, title='Old')
+        cursor = self.sync()['cursor']
+        changed = sample_recipe(user=self.user, title='New')
+
+        data = self.sync(cursor)
+
+        self.assertEqual([r['id'] for r in data['recipes']], [changed.id])
+        self.assertEqual(data['tags'], [])
+        self.assertEqual(self.sync(data['cursor'])['recipes'], [])
+
+    def test_deletes_returned_as_tombstones(self):
+        """Test deleted objects are reported by id"""
+        recipe = sample_recipe(user=self.user)
+        cursor = self.sync()['cursor']
+        recipe_id = recipe.id
+        recipe.delete()
+
+        data = self.sync(cursor)
+
+        self.assertEqual(data['recipes'], [])
+        self.assertEqual(data['deleted']['recipes'], [recipe_id])
+
+    def test_deleted_tag_updates_linked_recipes(self):
+        """Test recipes losing a deleted tag are synced again"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(tag)
+        cursor = self.sync()['cursor']
+        tag_id = tag.id
+        tag.delete()
+
+        data = self.sync(cursor)
+
+        self.assertEqual(data['deleted']['tags'], [tag_id])
+        self.assertEqual(data['recipes'][0]['tags'], [])
+
+    def test_bulk_changes_synced(self):
+        """Test objects written by bulk queries are synced"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        cursor = self.sync()['cursor']
+
+        res = self.client.patch(
+            TAG_BULK_URL,
+            [{'id': tag.id, 'name': 'Vegetarian'}],
+            format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        data = self.sync(cursor)
+        self.assertEqual(data['tags'][0]['name'], 'Vegetarian')
+
+    @override_settings(SYNC_PAGE_SIZE=2)
+    def test_sync_in_pages(self):
+        """Test large syncs are split without losing changes"""
+        recipes = [sample_recipe(user=self.user) for _ in range(5)]
+
+        seen = []
+        cursor = None
+        while True:
+            data = self.sync(cursor)
+            seen.extend(r['id'] for r in data['recipes'])
+            cursor = data['cursor']
+            if not data['has_more']:
+                break
+
+        self.assertEqual(sorted(seen), [recipe.id for recipe in recipes])
+
+    def test_invalid_cursor(self):
+        """Test an invalid cursor is rejected"""
+        res = self.client.get(SYNC_URL, {'since': 'abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_delete_user_with_objects(self):
+        """Test deleting a user doesn't record tombstones for it"""
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Salt')
+        )
+
+        self.user.delete()
+
+        connection.check_constraints()
+        self.assertFalse(Change.objects.exists())
+        self.assertFalse(SyncState.objects.exists())
@@ -5,11 +5,13 @@ from django.test import TestCase
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Tag
+from core.models import Tag, Recipe
 from recipe.serializers import TagSerializer
 
 
 TAG_URL = reverse('recipe:tag-list')
+TAG_BULK_URL = reverse('recipe:tag-bulk')
+TAG_ENSURE_URL = reverse('recipe:tag-ensure')
 
 
 class PublicTagAPITest(TestCase):
@@ -47,7 +49,7 @@ class PrivateTagAPITest(TestCase):
         serializer = TagSerializer(tags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         """Test that tags returnsed are for authenticated user"""
@@ -61,8 +63,8 @@ class PrivateTagAPITest(TestCase):
         res = self.client.get(TAG_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
 
     def test_create_tag_successful(self):
         """Test creating a new tag"""
@@ -81,3 +83,203 @@ class PrivateTagAPITest(TestCase):
         res = self.client.post(TAG_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_tags_paginated_by_cursor(self):
+        """Test that tags are paged in descending name order"""
+        names = ['Apple', 'Banana', 'Cherry', 'Date', 'Elderberry']
+        for name in names:
+            Tag.objects.create(user=self.user, name=name)
+
+        seen = []
+        url = TAG_URL + '?page_size=2'
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(res.data['results']), 2)
+            seen.extend(item['name'] for item in res.data['results'])
+            url = res.data['next']
+
+        self.assertEqual(seen, sorted(names, reverse=True))
+
+    def test_retrieve_tags_assigned_to_recipes(self):
+        """Test filtering tags by those assigned to recipes"""
+        tag1 = Tag.objects.create(user=self.user, name='Breakfast')
+        Tag.objects.create(user=self.user, name='Lunch')
+        recipe = Recipe.objects.create(
+            title='Eggs on toast',
+            time_in_minutes=10,
+            price=5.00,
+            user=self.user
+        )
+        recipe.tags.add(tag1)
+
+        res = self.client.get(TAG_URL, {'assigned_only': 1})
+
+        serializer = TagSerializer([tag1], many=True)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_bulk_create_tags(self):
+        """Test creating many tags in one request"""
+        payload = [{'name': name} for name in ('Vegan', 'Spicy', 'Sweet')]
+
+        res = self.client.post(TAG_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            sorted(item['name'] for item in res.data),
+            ['Spicy', 'Sweet', 'Vegan']
+        )
+        self.assertTrue(all(item['id'] for item in res.data))
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 3)
+
+    def test_bulk_update_tags(self):
+        """Test renaming many tags in one request"""
+        tag1 = Tag.objects.create(user=self.user, name='Vegen')
+        tag2 = Tag.objects.create(user=self.user, name='Spicey')
+        payload = [
+            {'id': tag1.id, 'name': 'Vegan'},
+            {'id': tag2.id, 'name': 'Spicy'},
+        ]
+
+        res = self.client.patch(TAG_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        tag1.refresh_from_db()
+        tag2.refresh_from_db()
+        self.assertEqual(tag1.name, 'Vegan')
+        self.assertEqual(tag2.name, 'Spicy')
+
+    def test_bulk_delete_tags(self):
+        """Test deleting many tags in one request"""
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Spicy')
+
+        res = self.client.delete(
+            TAG_BULK_URL,
+            [{'id': tag1.id}, {'id': tag2.id}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(Tag.objects.exists())
+
+    def test_bulk_delete_assigned_only(self):
+        """Test bulk deletes through the distinct assigned only filter"""
+        assigned = Tag.objects.create(user=self.user, name='Vegan')
+        unassigned = Tag.objects.create(user=self.user, name='Spicy')
+        for title in ('Soup', 'Stew'):
+            recipe = Recipe.objects.create(
+                title=title,
+                time_in_minutes=10,
+                price=5.00,
+                user=self.user
+            )
+            recipe.tags.add(assigned)
+
+        res = self.client.delete(
+            f'{TAG_BULK_URL}?assigned_only=1',
+            [{'id': assigned.id}, {'id': unassigned.id}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['deleted'] for item in res.data],
+            [True, False]
+        )
+        self.assertEqual(list(Tag.objects.all()), [unassigned])
+
+    def test_bulk_requires_list(self):
+        """Test that the bulk endpoint rejects a single object"""
+        res = self.client.post(TAG_BULK_URL, {'name': 'Vegan'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_duplicate_tag_rejected(self):
+        """Test a tag name the user has is rejected ignoring case"""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.post(TAG_URL, {'name': 'VEGAN'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', res.data)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_same_tag_name_for_other_user(self):
+        """Test names only have to be unique per user"""
+        other = get_user_model().objects.create_user(
+            'other@vikas.com',
+            'test1234'
+        )
+        Tag.objects.create(user=other, name='Vegan')
+
+        res = self.client.post(TAG_URL, {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_duplicate_tag_rejected_without_request(self):
+        """Test names are checked outside of requests, e.g. in a shell"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        Tag.objects.create(user=self.user, name='Spicy')
+
+        serializer = TagSerializer(tag, data={'name': 'SPICY'})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('name', serializer.errors)
+
+        serializer = TagSerializer(data={'name': 'vegan', 'user': self.user})
+        self.assertFalse(serializer.is_valid())
+
+        serializer = TagSerializer(data=[{'name': 'Soup'}], many=True)
+        self.assertTrue(serializer.is_valid())
+
+    def test_bulk_create_duplicate_tags_rejected(self):
+        """Test names repeated in a bulk request are reported per item"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        payload = [{'name': 'Spicy'}, {'name': 'spicy'}, {'name': 'vegan'}]
+
+        res = self.client.post(TAG_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('name', res.data[1])
+        self.assertIn('name', res.data[2])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_bulk_update_swaps_case(self):
+        """Test renaming a tag to its own name in another case"""
+        tag = Tag.objects.create(user=self.user, name='vegan')
+
+        res = self.client.patch(
+            TAG_BULK_URL,
+            [{'id': tag.id, 'name': 'Vegan'}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Vegan')
+
+    def test_ensure_tags(self):
+        """Test ensuring tags returns existing ones and creates the rest"""
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.post(
+            TAG_ENSURE_URL,
+            {'names': ['vegan', 'Spicy', 'SPICY']},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        spicy = Tag.objects.get(user=self.user, name='Spicy')
+        self.assertEqual(res.data, [
+            {'id': vegan.id, 'name': 'Vegan', 'created': False},
+            {'id': spicy.id, 'name': 'Spicy', 'created': True},
+            {'id': spicy.id, 'name': 'Spicy', 'created': True},
+        ])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_ensure_tags_requires_names(self):
+        """Test ensuring tags rejects an empty list"""
+        res = self.client.post(TAG_ENSURE_URL, {'names': []}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,190 @@
+import hashlib
+import os
+import re
+from datetime import timedelta
+
+from PIL import Image
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import ImageBlob, Recipe, recipe_image_blob_path
+
+
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+# Pillow format -> stored extension, other formats use their lowercase name
+FORMAT_EXTENSIONS = {'JPEG': 'jpg', 'MPO': 'jpg', 'TIFF': 'tif'}
+
+
+class HashingFileUploadHandler(TemporaryFileUploadHandler):
+    """Streams uploads to a temporary file and hashes them on the way"""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.hasher = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.content_hash = self.hasher.hexdigest()
+
+        return file
+
+
+def file_digest(file):
+    """Return the sha256 of a file that was not hashed while uploaded"""
+    hasher = hashlib.sha256()
+    for chunk in file.chunks():
+        hasher.update(chunk)
+
+    return hasher.hexdigest()
+
+
+def image_extension(file):
+    """Return the file extension of the format Pillow detects in a file"""
+    file.seek(0)
+    with Image.open(file) as image:
+        image_format = image.format
+
+    return FORMAT_EXTENSIONS.get(image_format, image_format.lower())
+
+
+def store_recipe_image(recipe, file):
+    """Attach an image to a recipe, reusing an identical stored file"""
+    digest = getattr(file, 'content_hash', None) or file_digest(file)
+
+    with transaction.atomic():
+        blob, created = ImageBlob.objects.select_for_update().get_or_create(
+            digest=digest,
+            defaults={
+                'name': recipe_image_blob_path(digest, image_extension(file))
+            }
+        )
+        if created or not default_storage.exists(blob.name):
+            file.seek(0)
+            name = default_storage.save(blob.name, file)
+            if name != blob.name:
+                blob.name = name
+                blob.save(update_fields=['name'])
+        ImageBlob.objects.filter(digest=digest).update(
+            ref_count=F('ref_count') + 1
+        )
+
+        previous = recipe.image.name
+        recipe.image.name = blob.name
+        recipe.image_status = Recipe.IMAGE_PENDING
+        recipe.save(update_fields=['image', 'image_status'])
+        release_image(previous)
+
+    return recipe
+
+
+def release_image(name):
+    """Drop a reference to a stored image, deleting it once unused
+
+    Images uploaded before content addressing have no blob and are kept.
+    """
+    if not name:
+        return
+
+    with transaction.atomic():
+        blob = ImageBlob.objects.select_for_update().filter(name=name).first()
+        if blob is None:
+            return
+        if blob.ref_count > 1:
+            ImageBlob.objects.filter(pk=blob.pk).update(
+                ref_count=F('ref_count') - 1
+            )
+            return
+
+        blob.delete()
+        transaction.on_commit(lambda: default_storage.delete(name))
+
+
+def chunk_path(session):
+    """Return where the received chunks of an upload are collected"""
+    filename = f'{session.id}.part'
+
+    return os.path.join(settings.RECIPE_IMAGE_UPLOAD_DIR, filename)
+
+
+def upload_expiry():
+    """Return the creation time before which uploads count as abandoned"""
+    return timezone.now() - timedelta(
+        seconds=settings.RECIPE_IMAGE_UPLOAD_TTL
+    )
+
+
+def parse_content_range(header):
+    """Return (start, end, total) of a Content-Range header or None
+
+    The total is None when the client does not know it yet.
+    """
+    match = CONTENT_RANGE.match(header or '')
+    if match is None:
+        return None
+    start, end, total = match.groups()
+    if int(end) < int(start):
+        return None
+
+    return int(start), int(end), None if total == '*' else int(total)
+
+
+def append_chunk(session, stream, length):
+    """Append the chunk read from the stream to the partial upload"""
+    os.makedirs(settings.RECIPE_IMAGE_UPLOAD_DIR, exist_ok=True)
+    remaining = length
+    with open(chunk_path(session), 'ab') as part:
+        part.seek(session.offset)
+        part.truncate()
+        while remaining > 0:
+            data = stream.read(min(remaining, 64 * 1024))
+            if not data:
+                break
+            part.write(data)
+            remaining -= len(data)
+
+    session.offset += length - remaining
+    session.save(update_fields=['offset'])
+
+    return remaining == 0
+
+
+def is_image(path):
+    """Check that the file is an image Pillow can read"""
+    try:
+        with Image.open(path) as image:
+            image.verify()
+    except Exception:
+        return False
+
+    return True
+
+
+def complete_upload(session):
+    """Attach the assembled upload to the recipe and clean up"""
+    path = chunk_path(session)
+    with open(path, 'rb') as part:
+        store_recipe_image(session.recipe, File(part, name=session.filename))
+
+    session.delete()
+    os.remove(path)
+
+    return session.recipe
+
+
+def discard_upload(session):
+    """Remove an upload session and its received chunks"""
+    # deleting the session clears its id
+    path = chunk_path(session)
+    session.delete()
+    if os.path.exists(path):
+        os.remove(path)
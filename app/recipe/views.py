@@ -1,34 +1,88 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
 
-from core.models import Tag, Ingredient, Recipe
+from core.models import Tag, Ingredient, Recipe, ImageUploadSession
+from core.renderers import CSVRenderer, NDJSONRenderer
 
 from recipe import serializers
+from recipe.bulk import BulkModelMixin
+from recipe.cache import CachedListMixin
+from recipe.conditional import check_if_match, conditional_response, \
+                               recipe_etag
+from recipe.export import export_csv, export_ndjson
+from recipe.fastpath import FastReadMixin
+from recipe.filters import filter_recipes
+from recipe.images import enqueue_recipe_image
+from recipe.names import ensure_names
+from recipe.uploads import HashingFileUploadHandler, append_chunk, \
+                           chunk_path, complete_upload, discard_upload, \
+                           is_image, parse_content_range, upload_expiry
+from recipe.sync import changed_objects, changes_since
+from recipe.pagination import RecipeAttrCursorPagination, \
+                              RecipeCursorPagination
+from user.authentication import CachedTokenAuthentication
 
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+class BaseRecipeAttrViewSet(CachedListMixin,
+                            viewsets.GenericViewSet,
                             mixins.CreateModelMixin,
-                            mixins.ListModelMixin):
+                            mixins.ListModelMixin,
+                            BulkModelMixin):
     """Base viewset for user owned recipe attributes"""
-    authentication_classes = (TokenAuthentication, )
+    authentication_classes = (CachedTokenAuthentication, )
     permission_classes = (IsAuthenticated, )
+    pagination_class = RecipeAttrCursorPagination
 
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
-        # assigned_only = bool(
-        #     int(self.request.query_params.get('assigned_only'))
-        # )
-        # queryset = self.queryset
-        # if assigned_only:
-        #     queryset = queryset.filter(recipe__isnull=False)
-        return self.queryset.filter(user=self.request.user).order_by('-name')
+        assigned_only = self.request.query_params.get('assigned_only')
+        queryset = self.queryset
+        if assigned_only in ('1', 'true'):
+            queryset = queryset.filter(recipe__isnull=False).distinct()
+
+        return queryset.filter(user=self.request.user).order_by('-name')
+
+    def save_unique(self, serializer, **kwargs):
+        """Save, reporting a name taken concurrently as a validation error"""
+        try:
+            with transaction.atomic():
+                serializer.save(**kwargs)
+        except IntegrityError:
+            child = getattr(serializer, 'child', serializer)
+            raise ValidationError({'name': [child.duplicate_message]})
 
     def perform_create(self, serializer):
         """Create a new object """
-        serializer.save(user=self.request.user)
+        self.save_unique(serializer, user=self.request.user)
+
+    def perform_bulk_update(self, serializer):
+        self.save_unique(serializer)
+
+    @action(methods=['POST'], detail=False)
+    def ensure(self, request):
+        """Return the objects with the given names, creating missing ones
+
+        Names are matched ignoring case, the response lists one object per
+        submitted name in the same order.
+        """
+        serializer = serializers.EnsureNamesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        names = serializer.validated_data['names']
+
+        with transaction.atomic():
+            found = ensure_names(self.queryset.model, request.user, names)
+
+        return Response([found[name]._asdict() for name in names])
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
@@ -43,16 +97,78 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
     serializer_class = serializers.IngredientSerializer
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(CachedListMixin,
+                    FastReadMixin,
+                    viewsets.ModelViewSet,
+                    BulkModelMixin):
     """Manage recipes in the database"""
     serializer_class = serializers.RecipeSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication, )
+    authentication_classes = (CachedTokenAuthentication, )
     permission_classes = (IsAuthenticated, )
+    pagination_class = RecipeCursorPagination
 
     def get_queryset(self):
         """Retrieve the recipe for the auhthenticated user"""
-        return self.queryset.filter(user=self.request.user)
+        queryset = self.queryset.filter(user=self.request.user)
+        if self.action == 'list':
+            queryset = filter_recipes(queryset, self.request.query_params)
+
+        return self.prefetch_for_action(queryset)
+
+    def prefetch_for_action(self, queryset):
+        """Prefetch only the relations rendered by the action's serializer"""
+        if self.action == 'list':
+            # RecipeSerializer only renders primary keys of the relations
+            return queryset.prefetch_related(
+                Prefetch(
+                    'ingredients',
+                    Ingredient.objects.only('id').order_by('id')
+                ),
+                Prefetch('tags', Tag.objects.only('id').order_by('id')),
+            )
+        elif self.action == 'retrieve' or self.checks_if_match():
+            return queryset.prefetch_related(
+                Prefetch('ingredients', Ingredient.objects.order_by('id')),
+                Prefetch('tags', Tag.objects.order_by('id')),
+            )
+
+        return queryset
+
+    def checks_if_match(self):
+        """Whether the write is conditional on the client's ETag"""
+        return (
+            self.action in ('update', 'partial_update', 'destroy') and
+            'HTTP_IF_MATCH' in self.request.META
+        )
+
+    def get_object(self):
+        """Return the recipe, rejecting writes to a modified one"""
+        recipe = super().get_object()
+        if self.checks_if_match():
+            check_if_match(
+                self.request,
+                recipe_etag(recipe, self.request.accepted_media_type)
+            )
+
+        return recipe
+
+    def retrieve(self, request, *args, **kwargs):
+        """Return the recipe or 304 when the client's copy is current"""
+        if settings.RECIPE_FAST_READ:
+            return self.fast_retrieve(request, kwargs['pk'])
+
+        recipe = self.get_object()
+        etag = recipe_etag(recipe, request.accepted_media_type)
+        response = conditional_response(request, etag)
+        if response is not None:
+            return response
+
+        serializer = self.get_serializer(recipe)
+        response = Response(serializer.data)
+        response['ETag'] = etag
+
+        return response
 
     def get_serializer_class(self):
         """Return appropriate serializre class"""
@@ -67,9 +183,37 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Create a new recipe"""
         serializer.save(user=self.request.user)
 
+    @action(
+        methods=['GET'],
+        detail=False,
+        renderer_classes=(NDJSONRenderer, CSVRenderer)
+    )
+    def export(self, request):
+        """Stream the user's whole catalog as NDJSON or CSV
+
+        Pick the format with ?format=ndjson|csv or the Accept header.
+        """
+        renderer = request.accepted_renderer
+        export = export_csv if renderer.format == 'csv' else export_ndjson
+        response = StreamingHttpResponse(
+            export(request.user, settings.EXPORT_CHUNK_SIZE),
+            content_type=f'{renderer.media_type}; charset=utf-8'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{renderer.format}"'
+        )
+
+        return response
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
-        """Funtion to upload an image to a recipe"""
+        """Funtion to upload an image to a recipe
+
+        The upload is hashed while it is streamed to disk and stored by
+        content, the resized renditions are generated in the background and
+        the response reports them as pending.
+        """
+        request.upload_handlers = [HashingFileUploadHandler(request)]
         recipe = self.get_object()
         serializer = self.get_serializer(
             recipe,
@@ -78,12 +222,169 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         if serializer.is_valid():
             serializer.save()
+            enqueue_recipe_image(recipe)
             return Response(
                 serializer.data,
-                status=status.HTTP_200_OK
+                status=status.HTTP_202_ACCEPTED
             )
 
         return Response(
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+    @action(methods=['POST'], detail=True, url_path='image-uploads')
+    def start_image_upload(self, request, pk=None):
+        """Start a resumable upload of an image sent in chunks"""
+        recipe = self.get_object()
+        serializer = serializers.ImageUploadSessionSerializer(
+            data=request.data
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save(recipe=recipe)
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(
+        methods=['GET', 'PUT', 'DELETE'],
+        detail=True,
+        url_path=r'image-uploads/(?P<upload_id>[0-9a-f-]+)'
+    )
+    def image_upload_chunk(self, request, pk=None, upload_id=None):
+        """Report the received offset, append a chunk or abort the upload
+
+        Chunks are sent as the raw request body with a Content-Range
+        header and must start at the offset received so far, a client
+        that lost its connection asks for the offset and resumes there.
+        """
+        if request.method == 'PUT':
+            # The session stays locked while the chunk is written, so
+            # concurrent chunks for the same offset can't both pass
+            with transaction.atomic():
+                return self.append_upload_chunk(
+                    request,
+                    self.get_upload_session(upload_id, lock=True)
+                )
+
+        session = self.get_upload_session(upload_id)
+        if request.method == 'DELETE':
+            discard_upload(session)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        return Response(
+            serializers.ImageUploadSessionSerializer(session).data
+        )
+
+    def append_upload_chunk(self, request, session):
+        content_range = parse_content_range(
+            request.META.get('HTTP_CONTENT_RANGE')
+        )
+        if content_range is None:
+            return Response(
+                {'detail': 'A valid Content-Range header is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        start, end, total = content_range
+        if None not in (total, session.size) and total != session.size:
+            return Response(
+                {'detail': 'Content-Range total does not match the size'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if start != session.offset:
+            return Response(
+                serializers.ImageUploadSessionSerializer(session).data,
+                status=status.HTTP_409_CONFLICT
+            )
+        if max(end + 1, total or 0) > settings.RECIPE_IMAGE_MAX_SIZE:
+            return Response(
+                {'detail': 'Image is too large'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+        append_chunk(session, request.stream, end - start + 1)
+
+        return Response(
+            serializers.ImageUploadSessionSerializer(session).data
+        )
+
+    @action(
+        methods=['POST'],
+        detail=True,
+        url_path=r'image-uploads/(?P<upload_id>[0-9a-f-]+)/complete'
+    )
+    def complete_image_upload(self, request, pk=None, upload_id=None):
+        """Attach a fully received chunked upload to the recipe"""
+        session = self.get_upload_session(upload_id)
+        if session.size is not None and session.offset != session.size:
+            return Response(
+                serializers.ImageUploadSessionSerializer(session).data,
+                status=status.HTTP_409_CONFLICT
+            )
+        if not is_image(chunk_path(session)):
+            discard_upload(session)
+            return Response(
+                {'image': ['Upload a valid image.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        recipe = complete_upload(session)
+        enqueue_recipe_image(recipe)
+
+        return Response(
+            serializers.RecipeImageSerializer(
+                recipe,
+                context=self.get_serializer_context()
+            ).data,
+            status=status.HTTP_202_ACCEPTED
+        )
+
+    def get_upload_session(self, upload_id, lock=False):
+        """Return the unexpired upload session of a recipe of the user"""
+        queryset = ImageUploadSession.objects.select_related('recipe')
+        if lock:
+            queryset = queryset.select_for_update(of=('self', ))
+
+        return get_object_or_404(
+            queryset,
+            id=upload_id,
+            recipe=self.get_object(),
+            created_at__gt=upload_expiry()
+        )
+
+
+class SyncView(APIView):
+    """Return the recipes, tags and ingredients changed since a cursor
+
+    Devices pass the cursor of their previous sync as since, or nothing
+    for a full sync, and repeat while has_more is true.
+    """
+    authentication_classes = (CachedTokenAuthentication, )
+    permission_classes = (IsAuthenticated, )
+    serializer_classes = {
+        'recipe': serializers.RecipeSerializer,
+        'tag': serializers.TagSerializer,
+        'ingredient': serializers.IngredientSerializer,
+    }
+
+    def get(self, request):
+        since = request.query_params.get('since') or '0'
+        if not since.isdigit():
+            raise ValidationError({'since': 'Expected a sync cursor'})
+
+        cursor, has_more, updated, deleted = changes_since(
+            request.user,
+            int(since),
+            settings.SYNC_PAGE_SIZE
+        )
+        data = {'cursor': str(cursor), 'has_more': has_more}
+        for name, serializer_class in self.serializer_classes.items():
+            objects = changed_objects(request.user, name, updated[name])
+            data[f'{name}s'] = serializer_class(
+                objects,
+                many=True,
+                context={'request': request}
+            ).data
+        data['deleted'] = {
+            f'{name}s': deleted[name] for name in self.serializer_classes
+        }
+
+        return Response(data)
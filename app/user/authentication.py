@@ -0,0 +1,156 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from core.models import AuthToken
+from user.revocation import get_revocations
+
+
+class TokenCache:
+    """Thread safe in-process LRU cache of pickled tokens with a TTL"""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for the key or None if missing/expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, user_id, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+
+            return value
+
+    def set(self, key, value, user_id):
+        """Store a value, evicting the least recently used entries"""
+        with self._lock:
+            expires = time.monotonic() + self.ttl
+            self._entries[key] = (value, user_id, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """Remove a single key"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_user(self, user_id):
+        """Remove every key that resolves to the given user"""
+        with self._lock:
+            keys = [
+                key for key, (_, entry_user_id, _) in self._entries.items()
+                if entry_user_id == user_id
+            ]
+            for key in keys:
+                del self._entries[key]
+
+    def clear(self):
+        """Remove all keys"""
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache(
+    max_size=settings.TOKEN_AUTH_CACHE['MAX_SIZE'],
+    ttl=settings.TOKEN_AUTH_CACHE['TTL'],
+)
+
+
+def get_shared_cache():
+    """Return the optional cache shared between processes"""
+    alias = settings.TOKEN_AUTH_CACHE['SHARED_CACHE']
+    if alias is None:
+        return None
+
+    return caches[alias]
+
+
+def shared_cache_key(key):
+    """Return the shared cache key for a token key"""
+    return f'auth-token:{key}'
+
+
+def invalidate_token(key):
+    """Forget the cached resolution of a token"""
+    token_cache.delete(key)
+    shared_cache = get_shared_cache()
+    if shared_cache is not None:
+        shared_cache.delete(shared_cache_key(key))
+
+
+def invalidate_user(user):
+    """Forget every cached token that resolves to the user"""
+    token_cache.delete_user(user.pk)
+    shared_cache = get_shared_cache()
+    if shared_cache is not None:
+        keys = AuthToken.objects.filter(user=user).values_list(
+            'key', flat=True
+        )
+        shared_cache.delete_many([shared_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches the token to user lookup
+
+    Keys matching the revocation filter bypass the caches, so revoking a
+    token takes effect in every process within the refresh interval of
+    the filter rather than the TTL of the caches.
+    """
+    model = AuthToken
+
+    def authenticate_credentials(self, key):
+        """Resolve the token from the caches before querying the database"""
+        if get_revocations().might_be_revoked(key):
+            invalidate_token(key)
+            data = None
+        else:
+            data = token_cache.get(key)
+
+        if data is not None:
+            # Every request gets its own copy of the user it may modify
+            token = pickle.loads(data)
+            return (self.check_expiry(token).user, token)
+
+        shared_cache = get_shared_cache()
+        if shared_cache is not None:
+            data = shared_cache.get(shared_cache_key(key))
+
+        if data is not None:
+            token = pickle.loads(data)
+        else:
+            user, token = super().authenticate_credentials(key)
+            data = pickle.dumps(token)
+            if shared_cache is not None:
+                shared_cache.set(
+                    shared_cache_key(key),
+                    data,
+                    settings.TOKEN_AUTH_CACHE['SHARED_TTL']
+                )
+        self.check_expiry(token)
+        token_cache.set(key, data, token.user_id)
+
+        return (token.user, token)
+
+    def check_expiry(self, token):
+        if token.expires_at <= timezone.now():
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+
+        return token
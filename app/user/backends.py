@@ -0,0 +1,19 @@
+from django.contrib.auth.backends import ModelBackend
+
+from core.hashers import hashing_slot
+
+
+class HashLimitedModelBackend(ModelBackend):
+    """Model backend checking passwords within the hashing capacity
+
+    Unknown users are hashed too, to not reveal which emails exist.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        with hashing_slot():
+            return super().authenticate(
+                request,
+                username=username,
+                password=password,
+                **kwargs
+            )
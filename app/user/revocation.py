@@ -0,0 +1,166 @@
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.dispatch import receiver
+from django.test.signals import setting_changed
+from django.utils import timezone
+
+from core.models import RevokedToken
+
+
+class BloomFilter:
+    """Fixed size set of strings answering membership probabilistically
+
+    Lookups of added keys always match, other keys match with about the
+    error rate the filter was sized for, as long as it holds no more than
+    its capacity.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(
+            -capacity * math.log(error_rate) / math.log(2) ** 2
+        ))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(math.ceil(self.size / 8))
+        self.count = 0
+
+    def positions(self, key):
+        """Return the bits of a key, from two halves of a single digest"""
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+
+        return (
+            (first + i * second) % self.size for i in range(self.hashes)
+        )
+
+    def add(self, key):
+        for position in self.positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self.positions(key)
+        )
+
+
+class RevocationList:
+    """In-process filter of the revoked token keys
+
+    The filter is loaded once and then only fetches the revocations
+    recorded since its last refresh, at most every REFRESH_INTERVAL
+    seconds, so authenticating costs no query. The last OVERLAP ids are
+    read again, their transactions may commit after a higher id was
+    loaded. It is rebuilt from the unexpired revocations once it holds
+    more keys than it was sized for, which also drops the expired ones.
+    A match may be a false positive and has to be confirmed against the
+    database.
+    """
+    OVERLAP = 100
+
+    def __init__(self, capacity, error_rate, refresh_interval):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        self._filter = None
+        self._last_id = 0
+        self._recent_ids = set()
+        self._refreshed = 0
+        self._lock = threading.Lock()
+
+    def is_stale(self, now):
+        return self._filter is None or (
+            now - self._refreshed >= self.refresh_interval
+        )
+
+    def refresh(self, force=False):
+        """Load the revocations recorded since the last refresh
+
+        Returns the filter, which stays valid for lookups even when it
+        is replaced by another thread.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and not self.is_stale(now):
+                return self._filter
+            if self._filter is None or (
+                self._filter.count > self._filter.capacity
+            ):
+                rows = list(RevokedToken.objects.filter(
+                    expires_at__gt=timezone.now()
+                ).order_by('id').values_list('id', 'key'))
+                self._filter = BloomFilter(
+                    max(self.capacity, 2 * len(rows)),
+                    self.error_rate
+                )
+                self._recent_ids = set()
+            else:
+                rows = RevokedToken.objects.filter(
+                    id__gt=self._last_id - self.OVERLAP
+                ).order_by('id').values_list('id', 'key')
+
+            for id, key in rows:
+                if id not in self._recent_ids:
+                    self._filter.add(key)
+                    self._recent_ids.add(id)
+                self._last_id = max(self._last_id, id)
+            self._recent_ids = {
+                id for id in self._recent_ids
+                if id > self._last_id - self.OVERLAP
+            }
+            self._refreshed = now
+
+            return self._filter
+
+    def add(self, key):
+        """Reject a key revoked by this process without waiting a refresh"""
+        self.refresh()
+        with self._lock:
+            self._filter.add(key)
+
+    def might_be_revoked(self, key):
+        bloom = self._filter
+        if bloom is None or self.is_stale(time.monotonic()):
+            bloom = self.refresh()
+
+        return key in bloom
+
+    def clear(self):
+        """Drop the filter, it is loaded again on the next lookup"""
+        with self._lock:
+            self._filter = None
+            self._last_id = 0
+            self._recent_ids = set()
+
+
+_revocations = None
+_revocations_lock = threading.Lock()
+
+
+def get_revocations():
+    """Return the revocation list of the process"""
+    global _revocations
+    with _revocations_lock:
+        if _revocations is None:
+            config = settings.TOKEN_REVOCATION
+            _revocations = RevocationList(
+                capacity=config['CAPACITY'],
+                error_rate=config['ERROR_RATE'],
+                refresh_interval=config['REFRESH_INTERVAL'],
+            )
+
+    return _revocations
+
+
+@receiver(setting_changed)
+def reset_revocations(setting, **kwargs):
+    """Resize the filter when the settings are overridden in tests"""
+    global _revocations
+    if setting == 'TOKEN_REVOCATION':
+        _revocations = None
@@ -3,6 +3,9 @@ from django.utils.translation import ugettext_lazy as _
 
 from rest_framework import serializers
 
+from core.hashers import hashing_slot
+from core.models import AuthToken
+
 
 class UserSerializer(serializers.ModelSerializer):
     """serializer for user model"""
@@ -22,7 +25,8 @@ class UserSerializer(serializers.ModelSerializer):
         user = super().update(instance, validated_data)
 
         if password:
-            user.set_password(password)
+            with hashing_slot():
+                user.set_password(password)
             user.save()
 
         return user
@@ -52,3 +56,18 @@ class AuthTokenSerializer(serializers.Serializer):
 
         attrs['user'] = user
         return attrs
+
+
+class TokenSerializer(serializers.ModelSerializer):
+    """serializer for an issued token and the key to refresh it"""
+    token = serializers.CharField(source='key')
+    refresh_token = serializers.CharField(source='refresh_key')
+
+    class Meta:
+        model = AuthToken
+        fields = ('token', 'refresh_token', 'expires_at', 'refresh_expires_at')
+
+
+class RefreshTokenSerializer(serializers.Serializer):
+    """serializer for rotating a token with its refresh key"""
+    refresh_token = serializers.CharField()
@@ -0,0 +1,23 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import AuthToken
+from user.authentication import invalidate_token, invalidate_user
+
+
+@receiver(post_delete, sender=AuthToken)
+def token_deleted(sender, instance, **kwargs):
+    """Stop authenticating with a token once it is deleted"""
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def user_saved(sender, instance, created, **kwargs):
+    """Drop cached copies of a user whenever it changes
+
+    This covers deactivation and password changes made through
+    UserSerializer.update as well as the admin.
+    """
+    if not created:
+        invalidate_user(instance)
@@ -0,0 +1,105 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import AuthToken
+from user.authentication import TokenCache, token_cache
+from user.revocation import get_revocations
+
+
+ME_URL = reverse('user:me')
+
+
+class TokenCacheTest(TestCase):
+    """Test the in-process token cache"""
+
+    def test_evicts_least_recently_used(self):
+        """Test that the oldest unused entry is dropped when full"""
+        cache = TokenCache(max_size=2, ttl=60)
+        cache.set('a', b'1', 1)
+        cache.set('b', b'2', 1)
+        cache.get('a')
+        cache.set('c', b'3', 2)
+
+        self.assertEqual(cache.get('a'), b'1')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), b'3')
+
+    def test_entries_expire(self):
+        """Test that entries are not returned after their TTL"""
+        cache = TokenCache(max_size=2, ttl=-1)
+        cache.set('a', b'1', 1)
+
+        self.assertIsNone(cache.get('a'))
+
+    def test_delete_user(self):
+        """Test that all entries of a user can be dropped"""
+        cache = TokenCache(max_size=10, ttl=60)
+        cache.set('a', b'1', 1)
+        cache.set('b', b'2', 1)
+        cache.set('c', b'3', 2)
+        cache.delete_user(1)
+
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), b'3')
+
+
+class CachedTokenAuthenticationTest(TestCase):
+    """Test authenticating requests with cached tokens"""
+
+    def setUp(self):
+        token_cache.clear()
+        get_revocations().clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@vikas.com',
+            password='test1234',
+            name='name'
+        )
+        self.token = AuthToken.objects.issue(self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_lookup_is_cached(self):
+        """Test that the token is only queried on the first request"""
+        # the revocation filter is loaded along with the first token
+        with self.assertNumQueries(2):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_deleted_token_rejected(self):
+        """Test that a deleted token stops authenticating"""
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test that a deactivated user stops authenticating"""
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_user_update_refreshes_cache(self):
+        """Test that updating the user is visible on the next request"""
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {'name': 'new name', 'password': 'new1234'})
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['name'], 'new name')
@@ -0,0 +1,227 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import AuthToken, RevokedToken
+from user.authentication import token_cache
+from user.revocation import BloomFilter, RevocationList, get_revocations
+
+
+TOKEN_URL = reverse('user:token')
+REFRESH_URL = reverse('user:token-refresh')
+ME_URL = reverse('user:me')
+
+
+class BloomFilterTest(TestCase):
+    """Test the probabilistic set of revoked keys"""
+
+    def test_added_keys_match(self):
+        """Test added keys always match and others rarely do"""
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f'revoked{i}')
+
+        self.assertTrue(all(f'revoked{i}' in bloom for i in range(1000)))
+        false_positives = sum(f'valid{i}' in bloom for i in range(1000))
+        self.assertLess(false_positives, 50)
+
+
+class RevocationListTest(TestCase):
+    """Test the revocation filter follows the revocation table"""
+
+    def setUp(self):
+        self.revocations = RevocationList(
+            capacity=100,
+            error_rate=0.001,
+            refresh_interval=0
+        )
+
+    def revoke(self, key, **fields):
+        RevokedToken.objects.create(
+            **fields,
+            key=key,
+            refresh_key=f'refresh-{key}',
+            family='00000000-0000-0000-0000-000000000000',
+            expires_at=timezone.now() + timedelta(days=1)
+        )
+
+    def test_refresh_loads_new_revocations(self):
+        """Test revocations of other processes are picked up"""
+        self.revoke('first')
+        self.assertTrue(self.revocations.might_be_revoked('first'))
+        self.assertFalse(self.revocations.might_be_revoked('second'))
+
+        self.revoke('second')
+
+        with self.assertNumQueries(1):
+            self.assertTrue(self.revocations.might_be_revoked('second'))
+
+    def test_refresh_loads_late_commits(self):
+        """Test revocations committed after a higher id are picked up"""
+        self.revoke('later', id=10)
+        self.revocations.refresh()
+
+        self.revoke('earlier', id=5)
+
+        self.assertTrue(self.revocations.might_be_revoked('earlier'))
+        self.assertEqual(self.revocations.refresh().count, 2)
+
+    def test_refresh_interval(self):
+        """Test the table is not queried again within the interval"""
+        self.revocations.refresh_interval = 60
+        self.revocations.refresh()
+
+        with self.assertNumQueries(0), \
+                patch.object(self.revocations, '_lock') as lock:
+            self.revocations.might_be_revoked('key')
+
+        lock.__enter__.assert_not_called()
+
+
+class ExpiringTokenTest(TestCase):
+    """Test issuing, refreshing and revoking expiring tokens"""
+
+    def setUp(self):
+        token_cache.clear()
+        get_revocations().clear()
+        self.user = get_user_model().objects.create_user(
+            'test@vikas.com',
+            'test1234'
+        )
+        self.client = APIClient()
+
+    def authenticate(self, key):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+
+        return self.client.get(ME_URL)
+
+    def refresh(self, refresh_key):
+        return APIClient().post(REFRESH_URL, {'refresh_token': refresh_key})
+
+    def test_login_issues_expiring_token(self):
+        """Test logging in returns a token and its refresh key"""
+        res = self.client.post(
+            TOKEN_URL,
+            {'email': 'test@vikas.com', 'password': 'test1234'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        token = AuthToken.objects.get(key=res.data['token'])
+        self.assertEqual(token.refresh_key, res.data['refresh_token'])
+        self.assertGreater(token.expires_at, timezone.now())
+        self.assertEqual(
+            self.authenticate(res.data['token']).status_code,
+            status.HTTP_200_OK
+        )
+
+    def test_expired_token_rejected(self):
+        """Test tokens stop authenticating once expired, even cached"""
+        token = AuthToken.objects.issue(self.user)
+        self.authenticate(token.key)
+        AuthToken.objects.filter(pk=token.pk).update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        token_cache.clear()
+
+        res = self.authenticate(token.key)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_rotates_token(self):
+        """Test refreshing replaces the token and its refresh key"""
+        token = AuthToken.objects.issue(self.user)
+        self.authenticate(token.key)
+
+        res = self.refresh(token.refresh_key)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res.data['token'], token.key)
+        self.assertEqual(
+            self.authenticate(res.data['token']).status_code,
+            status.HTTP_200_OK
+        )
+        self.assertEqual(
+            self.authenticate(token.key).status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+        new_token = AuthToken.objects.get(key=res.data['token'])
+        self.assertEqual(new_token.family, token.family)
+
+    def test_revoked_token_rejected_from_other_process_cache(self):
+        """Test a token revoked elsewhere is not served from the cache"""
+        token = AuthToken.objects.issue(self.user)
+        self.authenticate(token.key)
+        # revoked by another process, this one only sees the table
+        AuthToken.objects.filter(pk=token.pk)._raw_delete('default')
+        self.revoke_row(token)
+
+        with override_settings(TOKEN_REVOCATION={
+            'CAPACITY': 100,
+            'ERROR_RATE': 0.001,
+            'REFRESH_INTERVAL': 0,
+        }):
+            res = self.authenticate(token.key)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def revoke_row(self, token):
+        RevokedToken.objects.create(
+            key=token.key,
+            refresh_key=token.refresh_key,
+            family=token.family,
+            expires_at=token.refresh_expires_at
+        )
+
+    def test_refresh_key_reuse_revokes_family(self):
+        """Test reusing a rotated refresh key revokes its successors"""
+        token = AuthToken.objects.issue(self.user)
+        other = AuthToken.objects.issue(self.user)
+        new_key = self.refresh(token.refresh_key).data['token']
+
+        res = self.refresh(token.refresh_key)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertFalse(AuthToken.objects.filter(key=new_key).exists())
+        self.assertTrue(AuthToken.objects.filter(pk=other.pk).exists())
+
+    def test_expired_refresh_key_rejected(self):
+        """Test refresh keys can't be used once expired"""
+        token = AuthToken.objects.issue(self.user)
+        AuthToken.objects.filter(pk=token.pk).update(
+            refresh_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        res = self.refresh(token.refresh_key)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertFalse(AuthToken.objects.filter(pk=token.pk).exists())
+
+    def test_prune_tokens(self):
+        """Test the command deletes expired tokens and revocations"""
+        expired = AuthToken.objects.issue(self.user)
+        valid = AuthToken.objects.issue(self.user)
+        past = timezone.now() - timedelta(seconds=1)
+        AuthToken.objects.filter(pk=expired.pk).update(
+            refresh_expires_at=past
+        )
+        self.revoke_row(valid)
+        RevokedToken.objects.update(expires_at=past)
+        out = StringIO()
+
+        call_command('prune_tokens', batch_size=1, stdout=out)
+
+        self.assertEqual(
+            list(AuthToken.objects.values_list('pk', flat=True)),
+            [valid.pk]
+        )
+        self.assertFalse(RevokedToken.objects.exists())
+        self.assertIn('1 expired tokens and 1 revocations', out.getvalue())
@@ -1,10 +1,17 @@
+from unittest.mock import patch
+
+from django.conf import settings
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
 
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.hashers import get_hashing_slots
+from user.throttling import LoginAccountRateThrottle, LoginIPRateThrottle
+
 
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
@@ -19,6 +26,8 @@ class PublicUserAPITests(TestCase):
     """these tests would not require authernications"""
 
     def setUp(self):
+        # login throttling counts attempts in the cache
+        cache.clear()
         self.client = APIClient()
 
     def test_create_valid_user_success(self):
@@ -153,3 +162,88 @@ class PrivateUserAPITests(TestCase):
         self.assertEqual(self.user.name, payload['name'])
         self.assertTrue(self.user.check_password(payload['password']))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class LoginProtectionTests(TestCase):
+    """Test the limits protecting the password hashing capacity"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.payload = {'email': 'test@vikas.com', 'password': 'test1234'}
+        create_user(**self.payload)
+
+    @patch.object(
+        LoginAccountRateThrottle,
+        'THROTTLE_RATES',
+        {'login_account': '2/min'}
+    )
+    def test_login_throttled_per_account(self):
+        """Test failed attempts for one account are throttled"""
+        wrong = {**self.payload, 'password': 'wrong'}
+        for _ in range(2):
+            res = self.client.post(TOKEN_URL, wrong)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(TOKEN_URL, self.payload)
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        res = self.client.post(TOKEN_URL, {
+            'email': 'other@vikas.com',
+            'password': 'test1234'
+        })
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch.object(
+        LoginAccountRateThrottle,
+        'THROTTLE_RATES',
+        {'login_account': '2/min'}
+    )
+    def test_login_not_throttled_for_owner(self):
+        """Test successful logins and failures elsewhere don't lock out"""
+        wrong = {**self.payload, 'password': 'wrong'}
+        for _ in range(2):
+            self.client.post(TOKEN_URL, wrong, REMOTE_ADDR='10.0.0.2')
+
+        for _ in range(3):
+            res = self.client.post(TOKEN_URL, self.payload)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @patch.object(LoginIPRateThrottle, 'THROTTLE_RATES', {'login_ip': '1/min'})
+    def test_login_throttled_per_address(self):
+        """Test attempts from one address are throttled for any account"""
+        self.client.post(TOKEN_URL, self.payload)
+
+        res = self.client.post(TOKEN_URL, {
+            'email': 'other@vikas.com',
+            'password': 'test1234'
+        })
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_login_busy_when_hashing_saturated(self):
+        """Test logins fail fast while every hashing slot is taken"""
+        with self.settings(PASSWORD_HASHING={
+            **settings.PASSWORD_HASHING,
+            'WORKERS': 1,
+            'TIMEOUT': 0,
+        }):
+            slots = get_hashing_slots()
+            slots.acquire()
+            try:
+                res = self.client.post(TOKEN_URL, self.payload)
+            finally:
+                slots.release()
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_password_rehashed_with_new_cost(self):
+        """Test logging in upgrades a hash made with another cost"""
+        with self.settings(PASSWORD_HASHING={
+            **settings.PASSWORD_HASHING,
+            'PBKDF2_ITERATIONS': 1000,
+        }):
+            res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user = get_user_model().objects.get(email=self.payload['email'])
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
@@ -0,0 +1,49 @@
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class LoginIPRateThrottle(SimpleRateThrottle):
+    """Limit the login attempts from one client address"""
+    scope = 'login_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': self.get_ident(request),
+        }
+
+
+class LoginAccountRateThrottle(SimpleRateThrottle):
+    """Limit the failed login attempts for one account from one address
+
+    Only rejected passwords count, recorded by the view with
+    record_failure, so guessing from elsewhere can't lock the owner out.
+    """
+    scope = 'login_account'
+
+    def get_cache_key(self, request, view):
+        email = request.data.get('email')
+        if not isinstance(email, str) or not email:
+            return None
+
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': f'{email.strip().lower()}:{self.get_ident(request)}',
+        }
+
+    def throttle_success(self):
+        """Let the attempt through without counting it"""
+        return True
+
+    def record_failure(self, request, view):
+        """Count a rejected password against the account"""
+        key = self.get_cache_key(request, view)
+        if self.rate is None or key is None:
+            return
+
+        now = self.timer()
+        history = [
+            attempt for attempt in self.cache.get(key, [])
+            if attempt > now - self.duration
+        ]
+        history.insert(0, now)
+        self.cache.set(key, history, self.duration)
@@ -0,0 +1,61 @@
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import AuthToken, RevokedToken
+from user.revocation import get_revocations
+
+
+def revoke_tokens(tokens):
+    """Revoke and delete the given tokens, returns how many there were
+
+    The keys are recorded for the revocation filters of all processes,
+    deleting the tokens drops them from the token caches.
+    """
+    tokens = list(tokens)
+    if not tokens:
+        return 0
+
+    RevokedToken.objects.bulk_create(
+        RevokedToken(
+            key=token.key,
+            refresh_key=token.refresh_key,
+            family=token.family,
+            expires_at=token.refresh_expires_at
+        )
+        for token in tokens
+    )
+    revocations = get_revocations()
+    for token in tokens:
+        revocations.add(token.key)
+    for token in tokens:
+        token.delete()
+
+    return len(tokens)
+
+
+@transaction.atomic
+def rotate_token(refresh_key):
+    """Replace the token of a refresh key by a new one of the same family
+
+    Refresh keys are single use: presenting the key of a token that was
+    already rotated means it leaked, so every token of its family is
+    revoked. Returns None for unknown and expired refresh keys.
+    """
+    token = AuthToken.objects.select_for_update().select_related(
+        'user'
+    ).filter(refresh_key=refresh_key).first()
+
+    if token is None:
+        reused = RevokedToken.objects.filter(refresh_key=refresh_key).first()
+        if reused is not None:
+            revoke_tokens(AuthToken.objects.filter(family=reused.family))
+        return None
+
+    if token.refresh_expires_at <= timezone.now() or not token.user.is_active:
+        revoke_tokens([token])
+        return None
+
+    new_token = AuthToken.objects.issue(token.user, family=token.family)
+    revoke_tokens([token])
+
+    return new_token
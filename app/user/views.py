@@ -1,7 +1,14 @@
-from rest_framework import generics, authentication, permissions
+from rest_framework import exceptions, generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
-from user.serializers import UserSerializer, AuthTokenSerializer
+from rest_framework.views import APIView
+from core.models import AuthToken
+from user.authentication import CachedTokenAuthentication
+from user.serializers import UserSerializer, AuthTokenSerializer, \
+                             RefreshTokenSerializer, TokenSerializer
+from user.throttling import LoginAccountRateThrottle, LoginIPRateThrottle
+from user.tokens import rotate_token
 
 
 class CreateUserAPIView(generics.CreateAPIView):
@@ -10,15 +17,59 @@ class CreateUserAPIView(generics.CreateAPIView):
 
 
 class CreateTokenView(ObtainAuthToken):
-    """create a new auth token for the user"""
+    """create a new auth token for the user
+
+    Attempts are throttled per address, and failed ones per account,
+    before any password is hashed.
+    """
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = (LoginIPRateThrottle, LoginAccountRateThrottle)
+
+    def post(self, request, *args, **kwargs):
+        """Issue an expiring token and the key to refresh it"""
+        serializer = self.serializer_class(
+            data=request.data,
+            context={'request': request}
+        )
+        if not serializer.is_valid():
+            LoginAccountRateThrottle().record_failure(request, self)
+            raise exceptions.ValidationError(serializer.errors)
+        token = AuthToken.objects.issue(serializer.validated_data['user'])
+
+        return Response(TokenSerializer(token).data)
+
+
+class RefreshTokenView(APIView):
+    """exchange a refresh key for a new token and refresh key
+
+    The old token stops working, as does its refresh key.
+    """
+    authentication_classes = ()
+    permission_classes = ()
+    throttle_classes = (LoginIPRateThrottle, )
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+
+    def post(self, request, *args, **kwargs):
+        serializer = RefreshTokenSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        token = rotate_token(serializer.validated_data['refresh_token'])
+        if token is None:
+            raise exceptions.AuthenticationFailed(
+                'Invalid or expired refresh token.'
+            )
+
+        return Response(TokenSerializer(token).data)
+
+    def get_authenticate_header(self, request):
+        """Answer rejected refresh keys with 401, clients log in again"""
+        return 'Token'
 
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """manage the authenticated user"""
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication, ]
+    authentication_classes = [CachedTokenAuthentication, ]
     permission_classes = [permissions.IsAuthenticated, ]
 
     def get_object(self):